@@ -47,14 +47,16 @@ class ActorComponent(Component):
         self.state = ActorState.IDLE
         self.target = None
         self.dijkstra_map = None
-        self.last_move_time = 0
-        self.move_delay = 0.5
-        self.last_conversation_time = 0
-        self.conversation_cooldown = 10
+        self.speed = 100  # Ticks of game time between actions are ACTION_COST * 100 / speed
+        self.occupied_penalty = None  # None uses the world's occupancy grid default
+        self.fov_radius = 10
+        self.conversation_cooldown = 1000  # Game ticks between conversations, ten normal actions
+        self.last_conversation_time = -self.conversation_cooldown
         self.dialogue_history = []
         self.current_conversation = None
         self.conversation_partner = None
         self.conversation_turns = 0
+        self.awaiting_reply = False  # An LLM request for this actor's conversation is in flight
         self.aggressor = None
         self.aggressive_targets = set()
         self.last_target_evaluation = 0
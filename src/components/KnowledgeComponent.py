@@ -1,6 +1,8 @@
 from ecs.ecs import Component
 import time
 
+MEMORY_LIMIT = 20  # Memories kept per kind after compaction; summaries only quote the last few
+
 class KnowledgeComponent(Component):
     def __init__(self):
         self.known_actors = {}
@@ -9,6 +11,7 @@ class KnowledgeComponent(Component):
         self.combat_memories = []
         self.relationships = {}
         self.long_term_relationship_memory = {}
+        self.summary = None  # Cached get_summary() text, cleared whenever the knowledge changes
 
     def add_actor(self, actor_name, relationship_type, initial_value, relationship_story, is_aggressive=False, is_targeting=False, last_seen_position=None, proximity=None, direction=None):
         self.known_actors[actor_name] = {
@@ -21,9 +24,16 @@ class KnowledgeComponent(Component):
             "direction": direction,
         }
         self.relationships[actor_name] = {"type": relationship_type, "value": initial_value}
+        self.summary = None
+
+    def set_relationship_story(self, actor_name, relationship_story):
+        if actor_name in self.known_actors:
+            self.known_actors[actor_name]["story"] = relationship_story
+            self.summary = None
 
     def update_relationship(self, actor_name, relationship_type, value):
         self.relationships[actor_name] = {"type": relationship_type, "value": value}
+        self.summary = None
         
         # Update long-term memory
         if actor_name not in self.long_term_relationship_memory:
@@ -58,6 +68,7 @@ class KnowledgeComponent(Component):
             self.known_actors[actor_name] = {}
         
         actor_info = self.known_actors[actor_name]
+        previous = dict(actor_info)
         
         if entity:
             actor_info['entity'] = entity
@@ -76,17 +87,35 @@ class KnowledgeComponent(Component):
 
         # Update the 'alive' status based on 'is_dead'
         actor_info['alive'] = not actor_info.get('is_dead', False)
+        # Called for every visible actor each turn, so only a real change drops the cached summary
+        if actor_info != previous:
+            self.summary = None
 
     def add_location(self, location):
         self.known_locations.add(location)
+        self.summary = None
 
     def add_conversation_memory(self, memory):
         self.conversation_memories.append(memory)
+        self.summary = None
 
     def add_combat_memory(self, memory):
         self.combat_memories.append(memory)
+        self.summary = None
+
+    def compact_memories(self, limit=MEMORY_LIMIT):
+        # Drops the oldest memories; returns whether anything was removed
+        compacted = len(self.conversation_memories) > limit or len(self.combat_memories) > limit
+        self.conversation_memories = self.conversation_memories[-limit:]
+        self.combat_memories = self.combat_memories[-limit:]
+        return compacted
 
     def get_summary(self):
+        if self.summary is None:
+            self.summary = self.build_summary()
+        return self.summary
+
+    def build_summary(self):
         actor_info = ", ".join([f"{name} ({info['relationship']}, {'dead' if info.get('is_dead', False) else 'alive'}, {'aggressive' if info['is_aggressive'] else 'non-aggressive'}, {'targeting' if info['is_targeting'] else 'not targeting'}, last seen at {info['last_seen_position']}, proximity: {info['proximity']}, direction: {info['direction']})" for name, info in self.known_actors.items()])
         location_info = ", ".join(self.known_locations)
         conversation_info = ". ".join(self.conversation_memories[-5:])
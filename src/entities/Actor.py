@@ -4,9 +4,9 @@ from components.KnowledgeComponent import KnowledgeComponent
 from components.PositionComponent import PositionComponent
 from components.RenderComponent import RenderComponent
 from utils.dijkstra_map import DijkstraMap
+from utils.job_queue import PRIORITY_PATH
 from data.character_cards import character_cards
 import random
-import time
 from components.FighterComponent import FighterComponent
 from systems.MessageSystem import MessageChannel
 from entities.Player import Player
@@ -20,6 +20,7 @@ def get_character_card(character_card_key, default=None):
 class Actor(Entity):
     def __init__(self, x, y, name, character_card_key):
         super().__init__()
+        self.character_card_key = character_card_key  # Saved games rebuild actors from their card
         self.character_card = get_character_card(character_card_key)
         if not self.character_card:
             raise ValueError(f"No character card found for key: {character_card_key}")
@@ -133,22 +134,19 @@ class Actor(Entity):
 
     def update(self, game_map, player, game):
         actor_component = self.get_component(ActorComponent)
-        current_time = time.time()
-        if current_time - actor_component.last_move_time < actor_component.move_delay:
-            return
-
+        # Only called when the world's turn scheduler says this actor is due
         if self.aggression_type == "hostile":
-            self.update_aggressive_behavior(game_map, player, game, current_time)
+            self.update_aggressive_behavior(game_map, player, game)
         elif actor_component.state == ActorState.AGGRESSIVE:
             if not actor_component.target or not self.is_valid_target(actor_component.target):
                 actor_component.state = ActorState.IDLE
                 game.logger.info(f"{self.name} returned to IDLE state")
             else:
-                self.update_aggressive_behavior(game_map, player, game, current_time)
+                self.update_aggressive_behavior(game_map, player, game)
         else:
-            self.update_non_aggressive_behavior(game_map, current_time, game.world.entities)
+            self.update_non_aggressive_behavior(game_map, game)
 
-    def update_aggressive_behavior(self, game_map, player, game, current_time):
+    def update_aggressive_behavior(self, game_map, player, game):
         actor_component = self.get_component(ActorComponent)
         
         # If the actor is hostile, always look for a target
@@ -163,7 +161,7 @@ class Actor(Entity):
                 if new_target:
                     actor_component.target = new_target
                 else:
-                    self.update_non_aggressive_behavior(game_map, current_time, game.world.entities)
+                    self.update_non_aggressive_behavior(game_map, game)
                     return
 
         if actor_component.target:
@@ -175,17 +173,15 @@ class Actor(Entity):
             if is_adjacent:  # If adjacent (including diagonals), attack
                 target = actor_component.target
                 game.combat_system.attack(self, target)
-                actor_component.last_move_time = current_time
                 if target:  # Add this check
                     game.logger.debug(f"{self.name} attacked adjacent {target.name}")
                 else:
                     game.logger.debug(f"{self.name} attempted to attack, but the target is no longer valid")
             else:  # If not adjacent, move towards the target
                 self.move_towards_target(game_map, actor_component.target, game)
-                actor_component.last_move_time = current_time
         else:
             # If no target, use Dijkstra map for movement
-            self.move_using_dijkstra(game_map, game, current_time)
+            self.move_using_dijkstra(game_map, game)
 
     def is_valid_target(self, entity):
         return (entity is not None and 
@@ -193,19 +189,20 @@ class Actor(Entity):
                 entity != self and 
                 not entity.get_component(FighterComponent).is_dead())
 
-    def move_using_dijkstra(self, game_map, game, current_time):
+    def move_using_dijkstra(self, game_map, game):
         actor_component = self.get_component(ActorComponent)
         if not actor_component.dijkstra_map:
-            actor_component.dijkstra_map = DijkstraMap(game_map.width, game_map.height)
             # Use player position as the goal for the Dijkstra map
-            actor_component.dijkstra_map.compute([(game.world.player.x, game.world.player.y)], game_map.is_walkable)
+            player = game.world.player
+            self.request_dijkstra_map(game, lambda: (int(player.x), int(player.y)))
+            if not actor_component.dijkstra_map:
+                return
         
-        direction = actor_component.dijkstra_map.get_direction(int(self.x), int(self.y))
+        direction = actor_component.dijkstra_map.get_direction(int(self.x), int(self.y), self.get_occupancy_penalty_func(game))
         if direction:
             new_x, new_y = self.x + direction[0], self.y + direction[1]
-            if game_map.is_walkable(int(new_x), int(new_y)) and not game.world.get_entity_at(new_x, new_y):
-                self.x, self.y = new_x, new_y
-                actor_component.last_move_time = current_time
+            if game_map.is_walkable(int(new_x), int(new_y)) and not game.world.is_occupied(new_x, new_y):
+                game.world.move_entity(self, new_x, new_y)
                 game.logger.debug(f"{self.name} moved to ({new_x}, {new_y}) using Dijkstra map")
             else:
                 game.logger.debug(f"{self.name} couldn't find a direction to move using Dijkstra map")
@@ -215,16 +212,14 @@ class Actor(Entity):
     def find_nearest_target_in_sight(self, game):
         actor_component = self.get_component(ActorComponent)
         
-        potential_targets = [game.world.player] + [
-            entity for entity in game.world.entities 
-            if isinstance(entity, Actor) and entity != self
+        potential_targets = [
+            entity for entity in game.world.visibility.visible_to(self)
+            if isinstance(entity, (Actor, Player))
         ]
         
         valid_targets = []
         for target in potential_targets:
-            if (game.world.game_map.is_in_fov(int(self.x), int(self.y)) and
-                game.world.game_map.is_in_fov(int(target.x), int(target.y)) and
-                self.is_valid_target(target)):
+            if self.is_valid_target(target):
                 
                 relationship_value = self.knowledge.relationships.get(target.name, {"value": 0})["value"]
                 
@@ -235,18 +230,19 @@ class Actor(Entity):
         if valid_targets:
             actor_component.target = min(
                 valid_targets, 
-                key=lambda t: ((t.x - self.x)**2 + (t.y - self.y)**2)**0.5
+                key=lambda t: game.world.visibility.get_distance(self, t)
             )
         else:
             actor_component.target = None
 
-    def find_path_to_target_astar(self, game_map, target):
+    def get_occupancy_penalty_func(self, game):
+        penalty = self.get_component(ActorComponent).occupied_penalty
+        return lambda x, y: game.world.occupancy.penalty_at(x, y, penalty)
+
+    def find_path_to_target_astar(self, game_map, target, cost=None):
         # Create a cost array where 1 is walkable and 0 is blocked
-        cost = np.ones((game_map.height, game_map.width), dtype=np.int8)
-        for y in range(game_map.height):
-            for x in range(game_map.width):
-                if not game_map.is_walkable(x, y):
-                    cost[y, x] = 0
+        if cost is None:
+            cost = game_map.get_cost_array()
 
         # Create a graph from the cost array
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
@@ -263,24 +259,26 @@ class Actor(Entity):
         # Convert the path from (y, x) to (x, y) format
         return [(x, y) for y, x in path]
 
-    def update_non_aggressive_behavior(self, game_map, current_time, entities):
+    def update_non_aggressive_behavior(self, game_map, game):
         actor_component = self.get_component(ActorComponent)
         if actor_component.state == ActorState.IDLE:
             if random.random() < 0.1:
                 actor_component.state = ActorState.PATROL
                 actor_component.target = game_map.get_random_walkable_position()
-                actor_component.dijkstra_map = DijkstraMap(game_map.width, game_map.height)
-                actor_component.dijkstra_map.compute([actor_component.target], game_map.is_walkable)
+                actor_component.dijkstra_map = None
+                self.request_patrol_map(game)
         elif actor_component.state == ActorState.PATROL:
             if actor_component.target:
-                direction = actor_component.dijkstra_map.get_direction(int(self.x), int(self.y))
+                if not actor_component.dijkstra_map:
+                    self.request_patrol_map(game)
+                    if not actor_component.dijkstra_map:
+                        return  # Still waiting for the route
+                direction = actor_component.dijkstra_map.get_direction(int(self.x), int(self.y), self.get_occupancy_penalty_func(game))
                 if direction:
                     new_x = self.x + direction[0]
                     new_y = self.y + direction[1]
-                    if game_map.is_walkable(int(new_x), int(new_y)) and not any(entity.x == new_x and entity.y == new_y for entity in entities):
-                        self.x = new_x
-                        self.y = new_y
-                        actor_component.last_move_time = current_time
+                    if game_map.is_walkable(int(new_x), int(new_y)) and not game.world.is_occupied(new_x, new_y):
+                        game.world.move_entity(self, new_x, new_y)
 
                 if (int(self.x), int(self.y)) == actor_component.target:
                     actor_component.state = ActorState.IDLE
@@ -289,30 +287,60 @@ class Actor(Entity):
             else:
                 actor_component.state = ActorState.IDLE
 
+    def request_patrol_map(self, game):
+        actor_component = self.get_component(ActorComponent)
+        self.request_dijkstra_map(game, lambda: actor_component.target if actor_component.state == ActorState.PATROL else None)
+
+    def request_dijkstra_map(self, game, get_goal):
+        # A full-map search, so it runs as a deferred job; the goal is read when the job runs.
+        # Maps warmed during idle time for the same goal are picked up straight away.
+        world = game.world
+        goal = get_goal()
+        if goal in world.goal_maps:
+            self.get_component(ActorComponent).dijkstra_map = world.goal_maps[goal]
+            return
+        def build():
+            goal = get_goal()
+            if goal is None:
+                return
+            dijkstra_map = world.goal_maps.get(goal)
+            if dijkstra_map is None:
+                game_map = world.game_map
+                dijkstra_map = DijkstraMap(game_map.width, game_map.height)
+                dijkstra_map.compute([goal], game_map.is_walkable)
+                world.store_goal_map(goal, dijkstra_map)
+            self.get_component(ActorComponent).dijkstra_map = dijkstra_map
+        world.jobs.add(build, PRIORITY_PATH, key=("path", self))
+
     def find_nearest_hostile_target(self, game):
         actor_component = self.get_component(ActorComponent)
         hostile_targets = [
-            entity for entity in game.world.entities 
-            if entity in actor_component.hostile_towards and
-            game.world.game_map.is_in_fov(int(self.x), int(self.y)) and
-            game.world.game_map.is_in_fov(int(entity.x), int(entity.y))
+            entity for entity in game.world.visibility.visible_to(self)
+            if entity in actor_component.hostile_towards
         ]
         
         if hostile_targets:
             return min(
                 hostile_targets, 
-                key=lambda t: ((t.x - self.x)**2 + (t.y - self.y)**2)**0.5
+                key=lambda t: game.world.visibility.get_distance(self, t)
             )
         return None
 
     def move_towards_target(self, game_map, target, game):
-        path = self.find_path_to_target_astar(game_map, target)
-        if path and len(path) > 1:
-            next_step = path[1]  # First step is current position
+        # Route around other entities instead of planning through cells they occupy
+        penalty = self.get_component(ActorComponent).occupied_penalty
+        ignore = [(self.x, self.y), (target.x, target.y)]
+        # Long-range routes go through the room/door graph and only refine the first leg
+        next_step = game.world.pathfinder.get_next_step((self.x, self.y), (target.x, target.y), game.world.occupancy, penalty, ignore)
+        if next_step is None:
+            cost = game.world.get_cost_array(penalty=penalty, ignore=ignore)
+            path = self.find_path_to_target_astar(game_map, target, cost)
+            next_step = path[1] if path and len(path) > 1 else None  # First step is current position
+        if next_step:
             if game_map.is_walkable(next_step[0], next_step[1]):
                 entity_at_next_step = game.world.get_entity_at(next_step[0], next_step[1])
                 if not entity_at_next_step:
-                    self.x, self.y = next_step
+                    game.world.move_entity(self, *next_step)
                     game.logger.debug(f"{self.name} moved to {next_step} using A*")
                 else:
                     game.logger.debug(f"{self.name} is blocked by another entity at {next_step}")
@@ -1,62 +1,56 @@
-import anthropic
 import logging
+import time
 import traceback
-from utils.load_api_key import load_api_key
+from collections import deque
+from runtime import Runtime
 from systems.GameInitializationSystem import GameInitializationSystem
-from systems.GameLoopSystem import GameLoopSystem
+from systems.SystemRegistry import SystemRegistry
+from systems.RenderSystem import RenderRegion
 from systems.MessageSystem import MessageChannel
 from entities.Actor import Actor
 import os
-from systems.MainMenuSystem import MainMenuSystem
 from utils.mapgen import MapType
 from world import World
 from entities.Player import Player
-import shelve
-import tcod
-from systems.CombatSystem import CombatSystem
-from systems.PlayerSystem import PlayerSystem
-from systems.dialogue.DialogueSystem import DialogueSystem
-from systems.InputSystem import InputSystem
+from utils.save_format import save_world, load_world
 from data.character_cards import get_character_card
+from utils.pipeline import Pipeline
+from utils.backend import is_input
+
+SAVE_PATH = 'savegame.sav'
+LEGACY_SAVE_PATHS = ('savegame', 'savegame.db')  # Shelve files from before the versioned format
+FRAME_TIME = 1 / 60  # Longest input wait before background work and rendering get another turn
 
 class Game:
-    def __init__(self, world):
+    def __init__(self, world, runtime=None, headless=False, events=()):
         self.logger = logging.getLogger(__name__)
         try:
             self.world = world
             if self.world:
                 self.world.game = self
 
-            self.width = 80
-            self.height = 50
-            self.tile_size = 16
+            # Window, consoles and API clients outlive the session; pass a runtime in to reuse them
+            self.runtime = runtime or Runtime(headless, events)
+            self.width = self.runtime.width
+            self.height = self.runtime.height
+            self.tile_size = self.runtime.tile_size
             self.pixel_width = self.width * self.tile_size
             self.pixel_height = self.height * self.tile_size
-            self.game_area_height = 38
-            self.dialogue_height = 12
-
-            self.context = tcod.context.new_terminal(
-                self.width,
-                self.height,
-                title="Sanguine Host",
-                vsync=True,
-                tileset=tcod.tileset.load_tilesheet(
-                    "assets/tiles/terminal16x16_gs_ro.png", 16, 16, tcod.tileset.CHARMAP_CP437
-                )
-            )
-            self.root_console = tcod.Console(self.width, self.height)
-            self.game_console = tcod.Console(self.width, self.game_area_height)
-            
-            api_key = load_api_key()
-            if not api_key:
-                raise ValueError("No API key provided")
-            self.anthropic_client = anthropic.Anthropic(api_key=api_key)
+            self.game_area_height = self.runtime.game_area_height
+            self.dialogue_height = self.height - self.game_area_height
+
+            self.headless = self.runtime.headless
+            self.context = self.runtime.context
+            self.event_source = self.runtime.event_source
+            self.pending_events = deque()  # Fetched from the backend but not read yet; every reader takes from here first
+            self.root_console = self.runtime.root_console
+            self.game_console = self.runtime.game_console
+            self.perf = self.runtime.perf
             
             self.init_common_game_state()
-            
-            self.main_menu_system = MainMenuSystem(self)
-            self.combat_system = CombatSystem(self)
+
             self.game_over = False
+            self.pipeline = None
             self.disable_actor_dialogue = False
             self.disable_dialogue_system = False
 
@@ -65,16 +59,74 @@ class Game:
             self.logger.debug(traceback.format_exc())
             raise
 
+    @property
+    def anthropic_client(self):
+        # Loaded in the background by the runtime; blocks only if used before it is ready
+        return self.runtime.anthropic_client
+
+    @property
+    def vader(self):
+        return self.runtime.vader
+
+    @property
+    def deterministic(self):
+        # Recorded and replayed sessions avoid anything that depends on wall-clock timing
+        return self.runtime.session is not None
+
+    def pump(self):
+        # Everything that keeps moving while the game waits: setup stages, LLM replies and the frame
+        if self.pipeline:
+            self.pipeline.poll()
+        self.runtime.tasks.poll()
+        if self.world and self.world.player:
+            self.render_system.flush()
+
+    def wait_for_events(self):
+        # Replaces a blocking event wait: polls input at frame rate and pumps in between.
+        # While idle work remains, each frame goes to it instead of sleeping; input stops it at once.
+        # Events are handed out one at a time, so whatever a loop leaves when it returns stays
+        # queued for the next reader, as it did in SDL's queue under tcod.event.wait().
+        while not self.pending_events:
+            self.pump()
+            busy = self.run_idle_work()
+            self.pending_events.extend(self.event_source.wait(0 if busy else FRAME_TIME))
+        while self.pending_events:
+            yield self.pending_events.popleft()
+
+    def has_input(self):
+        # Keypresses already fetched but not handled count as much as the backend's queue
+        return any(is_input(event) for event in self.pending_events) or self.event_source.has_input()
+
+    def run_idle_work(self):
+        # Returns whether idle work is left for the next frame
+        world = self.world
+        if not world or self.deterministic or self.has_input():
+            return False
+        world.run_idle_work(time.perf_counter() + FRAME_TIME, self.has_input)
+        return bool(world.jobs) or bool(len(world.idle))
+
+    def start_task(self, coroutine, on_done=None, on_error=None):
+        # Runs an LLM coroutine in the background; on_done gets its result on the main thread
+        return self.runtime.tasks.submit(coroutine, on_done, on_error)
+
+    def await_task(self, coroutine):
+        # For modal flows that need the answer before continuing; the window stays live meanwhile
+        def pump():
+            self.event_source.pump()
+            self.pump()
+        return self.runtime.tasks.wait(self.runtime.tasks.submit(coroutine), pump)
+
     def init_common_game_state(self):
+        self.systems = SystemRegistry(self)
         self.init_system = GameInitializationSystem(self)
         self.init_system.initialize_all()
-        self.render_system = self.init_system.game.render_system
-        self.message_system = self.init_system.game.message_system
-        self.combat_system = CombatSystem(self)
-        self.loop_system = GameLoopSystem(self)
-        self.player_system = PlayerSystem(self)
-        self.dialogue_system = DialogueSystem(self)
-        self.input_system = InputSystem(self)
+
+    def __getattr__(self, name):
+        # Only reached for missing attributes: systems are built on first access
+        systems = self.__dict__.get('systems')
+        if systems is not None and name in systems:
+            return systems.get(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
 
     def setup_world(self, world):
         self.world = world
@@ -94,10 +146,11 @@ class Game:
         log_level = logging.INFO if channel == MessageChannel.SYSTEM else logging.DEBUG
         self.logger.log(log_level, f"{channel.name}: {text}")
         
-        if hasattr(self, 'render_system') and self.render_system and self.world and self.world.game_map:
-            self.render_system.render()
-        else:
-            self.logger.warning(f"Unable to render message: {text}")
+        # Drawn on the next flush, so a burst of messages costs one frame. Checked without building
+        # the render system, which could wait on a system a setup stage is building; one built
+        # later draws the whole log anyway.
+        if 'render_system' in self.__dict__:
+            self.render_system.mark_dirty(RenderRegion.LOG)
 
     def interact(self):
         return self.player_system.interact()
@@ -108,30 +161,59 @@ class Game:
     def new_game(self, single_room=True):
         # Display loading screen
         self.main_menu_system.show_loading_screen()
-        
-        # Create a new world
-        self.world = World(80, 38, self, MapType.DUNGEON, single_room=single_room)
-        self.world.initialize_systems()
-        self.setup_world(self.world)
-        
-        # Create and add the player
-        player_x, player_y = self.world.game_map.get_random_walkable_position()
-        self.world.player = Player(player_x, player_y)
-        self.world.add_entity(self.world.player)
-        
+
         # Disable dialogue system at game start
         self.disable_dialogue_system = False
-        
-        # Add NPCs and generate relationships
-        self.add_npcs()
-        
-        self.init_system.initialize_all()
-        self.render_system = self.init_system.game.render_system
+
+        # Independent stages run concurrently; play starts once the critical ones are done
+        # and relationship stories are filled in whenever the LLM answers.
+        # Stages build the world off to the side; it becomes self.world on the main thread.
+        pipeline = Pipeline()
+        pipeline.add("world", "Generating map", lambda: self.create_world(single_room), apply=self.publish_world)
+        pipeline.add("services", "Loading dialogue systems", self.load_dialogue_systems, critical=False)
+        pipeline.add("entities", "Placing characters", lambda: self.populate_world(pipeline.results["world"]), after=["world"])
+        pipeline.add(
+            "stories",
+            "Writing relationship stories",
+            lambda: pipeline.results["world"].actor_knowledge_system.fetch_relationship_stories(pipeline.results["entities"]),
+            after=["entities"],
+            critical=False,
+            apply=lambda results: self.world.actor_knowledge_system.apply_relationship_stories(results)
+        )
+        pipeline.start()
+        # Pumping keeps the window responsive; keystrokes are kept for the game
+        pipeline.wait_for_critical(self.main_menu_system.show_loading_progress, self.event_source.pump)
+        self.pipeline = pipeline
+        self.setup_world(self.world)
+
+        # Start the session with an empty log, as before
+        self.message_system.clear_messages()
         self.fov_recompute = True
         
         self.show_message("Welcome to Sanguine Host!", MessageChannel.SYSTEM)
         self.game_over = False
 
+    def create_world(self, single_room):
+        world = World(80, 38, self, MapType.DUNGEON, single_room=single_room)
+        world.initialize_systems()
+        return world
+
+    def publish_world(self, world):
+        self.world = world
+
+    def populate_world(self, world):
+        # Create and add the player
+        player_x, player_y = world.game_map.get_random_walkable_position()
+        world.player = Player(player_x, player_y)
+        world.add_entity(world.player)
+
+        # Add NPCs; their relationships are returned so stories can be written for them
+        return self.add_npcs(world)
+
+    def load_dialogue_systems(self):
+        self.runtime.wait_for_services()
+        return self.dialogue_system
+
     @staticmethod
     def get_unique_walkable_positions(world, count):
         positions = set()
@@ -141,44 +223,50 @@ class Game:
                 positions.add((x, y))
         return list(positions)
 
-    def add_npcs(self):
+    def add_npcs(self, world):
         npc_types = ['wise_old_man', 'mysterious_stranger', 'aggressive_monster']
-        positions = self.get_unique_walkable_positions(self.world, len(npc_types))
+        positions = self.get_unique_walkable_positions(world, len(npc_types))
         for i, npc_type in enumerate(npc_types):
             x, y = positions[i]
             character_card = get_character_card(npc_type)
             name = character_card['name']
             npc = Actor(x, y, name, npc_type)
-            self.world.entities.append(npc)
+            world.add_entity(npc)
 
-        # Generate initial relationships between NPCs
-        self.world.actor_knowledge_system.generate_initial_relationships(self.world.entities)
+        # Initial relationships between NPCs; stories are generated separately
+        if self.disable_dialogue_system:
+            return []
+        return world.actor_knowledge_system.assign_initial_relationships(world.entities)
 
     def save_game(self):
-        with shelve.open('savegame', 'n') as file:
-            file['world'] = self.world.to_picklable()
-            file['player_index'] = self.world.entities.index(self.world.player)
+        save_world(self.world, SAVE_PATH)
         self.show_message("Game saved.", MessageChannel.SYSTEM)
 
     def load_game(self):
-        if os.path.exists('savegame') or os.path.exists('savegame.db'):
-            with shelve.open('savegame', 'r') as file:
-                loaded_world = file['world']
-                player_index = file['player_index']
-                self.world = World(loaded_world.width, loaded_world.height, self, loaded_world.map_type)
-                self.world.game_map = loaded_world.game_map
-                self.world.entities = loaded_world.entities
-                self.world.player = loaded_world.player
-                self.world.entities.insert(player_index, self.world.player)
-            self.setup_world(self.world)
-            self.show_message("Game loaded.", MessageChannel.SYSTEM)
-        else:
+        if not os.path.exists(SAVE_PATH):
             self.new_game()  # Start a new game if no saved game is found
-            self.show_message("No saved game found. Starting a new game.", MessageChannel.SYSTEM)
+            # Old shelve saves hold pickles of classes that have since changed, so they aren't migrated
+            if any(os.path.exists(path) for path in LEGACY_SAVE_PATHS):
+                self.show_message("Saved games from earlier versions are no longer supported. Starting a new game.", MessageChannel.SYSTEM)
+            else:
+                self.show_message("No saved game found. Starting a new game.", MessageChannel.SYSTEM)
+            return
+        try:
+            world = load_world(SAVE_PATH, self)
+        except Exception as e:
+            # Other versions and damaged files land here
+            self.logger.error(f"Error loading saved game: {str(e)}")
+            self.new_game()
+            self.show_message("The saved game could not be read. Starting a new game.", MessageChannel.SYSTEM)
+            return
+        self.world = world
+        self.setup_world(world)
+        self.show_message("Game loaded.", MessageChannel.SYSTEM)
 
     def reset_game_state(self):
         self.game_over = False
         self.world = None
+        self.pipeline = None  # Unfinished background stages of the previous session are dropped
         self.fov_recompute = True
         
         self.init_common_game_state()
@@ -1,14 +1,32 @@
+import argparse
 import logging
 import traceback
+from utils.startup_profile import install_import_timer
+
+# Installed before the game modules are imported so their import times are recorded
+install_import_timer()
+
 from utils.logging import setup_logging
 from game import Game
+from runtime import Runtime
+from utils.session_record import SessionRecorder
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sanguine Host")
+    parser.add_argument("--record", metavar="PATH", help="Record input, seeds and LLM replies for replay.py")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for a recorded session")
+    return parser.parse_args(argv)
 
 def main():
+    args = parse_args()
     setup_logging()
     logger = logging.getLogger(__name__)
+    runtime = None
     try:
+        # The window and API clients are created once and handed to every new session
+        runtime = Runtime(session=SessionRecorder(args.record, args.seed) if args.record else None)
         while True:
-            game = Game(None)
+            game = Game(None, runtime)
             game.main_menu_system.handle_main_menu()
             
             while not game.is_game_over():
@@ -25,6 +43,9 @@ def main():
         logger.error(f"An error occurred: {str(e)}")
         logger.debug(traceback.format_exc())
         print(f"A critical error occurred. Please check the game.log file for details.")
+    finally:
+        if runtime:
+            runtime.close()
 
 if __name__ == "__main__":
     main()
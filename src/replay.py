@@ -0,0 +1,111 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from tcod.event import KeySym
+from game import Game
+from runtime import Runtime
+from simulate import report
+from components.FighterComponent import FighterComponent
+from utils.backend import key_down
+from utils.session_record import SessionRecorder, SessionReplayer
+
+# Replays a session recorded with `python main.py --record PATH` headless and as fast
+# as it will run, checking the world against the digests taken while recording. A real
+# player's session doubles as a realistic benchmark.
+#   python replay.py session.jsonl
+# --self-test records a scripted session first (stub LLM, actor dialogue on) and replays
+# that, failing if any reply goes unapplied or the world diverges.
+#   python replay.py --self-test --turns 2000 --seed 7
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session and report turns per second.")
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--self-test", action="store_true", help="Record a scripted session, then replay it")
+    parser.add_argument("--turns", type=int, default=1000, help="Turns the self-test session plays")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if not args.path and not args.self_test:
+        parser.error("a session path is required unless --self-test is given")
+    return args
+
+def run_session(runtime, setup=None):
+    # Mirrors the session loop in main.py; returns the last game once input runs out.
+    # setup(game) runs once each game has started, identically when recording and replaying.
+    game = None
+    try:
+        while True:
+            game = Game(None, runtime)
+            game.main_menu_system.handle_main_menu()
+            if setup:
+                setup(game)
+            while not game.is_game_over():
+                game.loop_system.run()
+            if not game.main_menu_system.show_play_again_menu():
+                break
+    except SystemExit:
+        pass
+    return game
+
+def setup_scripted(game):
+    # As in simulate.py, but for everyone: a dead player would spend the rest of the script
+    # in the menu, and actors who die stop having the conversations this is meant to test
+    for entity in game.world.entities:
+        fighter = entity.get_component(FighterComponent)
+        fighter.hp = fighter.max_hp = 10 ** 9
+    # The script has no answer to "Do you want to listen?"; it always declines, which sends
+    # the conversation to the summarizer
+    game.dialogue_system.get_player_choice = lambda prompt: False
+
+def record_scripted(path, turns, seed):
+    # The player only waits, so no bump opens an attack prompt; the actors around them
+    # wander, meet and talk, which is what exercises reply delivery
+    events = [key_down(KeySym.RETURN)] + [key_down(KeySym.KP_5) for _ in range(turns)]
+    runtime = Runtime(headless=True, events=events, llm_stub=True, session=SessionRecorder(path, seed))
+    try:
+        run_session(runtime, setup_scripted)
+    finally:
+        runtime.close()
+
+def replay(path, setup=None):
+    replayer = SessionReplayer(path)
+    runtime = Runtime(headless=True, session=replayer)
+    try:
+        start = time.perf_counter()
+        game = run_session(runtime, setup)
+        elapsed = time.perf_counter() - start
+        replayer.close()
+        if game and game.world and replayer.turns:
+            report(replayer.turns, elapsed, game)
+        final = {None: "none recorded", True: "matched", False: "differs"}[replayer.final_matched]
+        print(f"input batches {replayer.batches}/{len(replayer.batches_recorded)}, checkpoints matched {replayer.checkpoints_matched}/{len(replayer.checkpoints)}, final state {final}")
+        print(f"llm replies applied {runtime.tasks.applied}/{len(replayer.deliveries)}")
+        failed = False
+        if replayer.divergence is not None:
+            print(f"replay diverged from the recording by turn {replayer.divergence}")
+            failed = True
+        if runtime.tasks.applied < len(replayer.deliveries):
+            print("replay left recorded llm replies unapplied")
+            failed = True
+        return 1 if failed else 0
+    finally:
+        runtime.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if not args.self_test:
+        return replay(args.path)
+    random.seed(args.seed)
+    handle, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(handle)
+    try:
+        record_scripted(path, args.turns, args.seed)
+        return replay(path, setup_scripted)
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+import logging
+import threading
+import traceback
+import tcod
+from utils.load_api_key import load_api_key
+from utils.perf_monitor import PerfMonitor, InstrumentedClient
+from utils.backend import create_context, load_tileset, ScriptedEventSource, TcodEventSource
+from utils.startup_profile import startup_profile
+from utils.stub_llm import StubClient
+from utils.async_tasks import AsyncTaskRunner
+
+SCREEN_WIDTH = 80
+SCREEN_HEIGHT = 50
+GAME_AREA_HEIGHT = 38
+TILE_SIZE = 16
+TILESET_PATH = "assets/tiles/terminal16x16_gs_ro.png"
+
+# Long-lived resources shared by every Game session in the process: the window,
+# consoles, tileset, the async task loop, the API client (and its connection pool)
+# and the VADER lexicon.
+# The anthropic and VADER stacks are slow to import, so they load on a background
+# thread once the menu is up; the first access waits for them if they are not ready.
+class Runtime:
+    def __init__(self, headless=False, events=(), llm_stub=False, session=None):
+        self.logger = logging.getLogger(__name__)
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
+        self.game_area_height = GAME_AREA_HEIGHT
+        self.tile_size = TILE_SIZE
+
+        # Headless runs draw into the offscreen consoles only and read input from a script
+        self.headless = headless
+        with startup_profile.measure("runtime: window and tileset"):
+            self.tileset = None if headless else load_tileset(TILESET_PATH)
+            self.context = create_context(self.width, self.height, "Sanguine Host", self.tileset, headless)
+        self.event_source = ScriptedEventSource(events) if headless else TcodEventSource()
+
+        # A session recorder or replayer sits between the game and its input, RNG and LLM
+        self.session = session
+        if session:
+            session.seed_random()
+            self.event_source = session.wrap_event_source(self.event_source, self.context)
+        self.root_console = tcod.Console(self.width, self.height)
+        self.game_console = tcod.Console(self.width, self.game_area_height)
+
+        # Asked for up front since it may prompt on the terminal; stubbed and replayed runs never talk to the API
+        self.llm_stub = llm_stub
+        offline = llm_stub or (session is not None and session.offline)
+        self.api_key = None if offline else load_api_key()
+        if not self.api_key and not offline:
+            raise ValueError("No API key provided")
+        self.perf = PerfMonitor()
+
+        # LLM requests run as coroutines on this loop; the client's pool is bound to it
+        self.tasks = session.create_task_runner() if session else AsyncTaskRunner()
+
+        self.services_thread = None
+        self.services_ready = threading.Event()
+        self.services_lock = threading.Lock()
+        self.services_error = None
+        self.client = None
+        self.sentiment_intensity_analyzer = None
+
+    def start_background_loading(self):
+        with self.services_lock:
+            if self.services_thread is None:
+                self.services_thread = threading.Thread(target=self.load_services, name="runtime-services", daemon=True)
+                self.services_thread.start()
+
+    def load_services(self):
+        try:
+            with startup_profile.measure("runtime: anthropic client"):
+                if self.llm_stub:
+                    client = StubClient()
+                elif self.api_key:
+                    import anthropic
+                    client = anthropic.AsyncAnthropic(api_key=self.api_key)
+                else:
+                    client = None  # Replays answer from the recording
+                if self.session:
+                    client = self.session.wrap_client(client)
+                self.client = InstrumentedClient(client, self.perf)
+            with startup_profile.measure("runtime: vader lexicon"):
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                self.sentiment_intensity_analyzer = SentimentIntensityAnalyzer()
+        except Exception as e:
+            self.services_error = e
+            self.logger.error(f"Error loading runtime services: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+        finally:
+            startup_profile.mark("services ready")
+            self.services_ready.set()
+
+    def wait_for_services(self):
+        self.start_background_loading()
+        if not self.services_ready.is_set():
+            with startup_profile.measure("runtime: waited for services"):
+                self.services_ready.wait()
+        if self.services_error:
+            raise self.services_error
+
+    @property
+    def anthropic_client(self):
+        if self.client is None:
+            self.wait_for_services()
+        return self.client
+
+    @property
+    def vader(self):
+        if self.sentiment_intensity_analyzer is None:
+            self.wait_for_services()
+        return self.sentiment_intensity_analyzer
+
+    def close(self):
+        self.tasks.close(self.client.close() if self.client else None)
+        self.context.close()
+        if self.session:
+            self.session.close()
@@ -0,0 +1,150 @@
+import argparse
+import logging
+import random
+import time
+from data.character_cards import character_cards
+from components.FighterComponent import FighterComponent
+from entities.Actor import Actor
+from entities.Player import Player
+from game import Game
+from runtime import Runtime
+from utils.mapgen import MapType
+from world import World
+
+# Headless throughput benchmark: builds a world, drives the player for N turns and
+# runs the same per-turn update as the game loop, with the LLM stubbed and no rendering.
+#   python simulate.py --turns 2000 --npcs 20 --width 120 --height 80
+
+MOVES = {
+    'h': (-1, 0), 'j': (0, 1), 'k': (0, -1), 'l': (1, 0),
+    'y': (-1, -1), 'u': (1, -1), 'b': (-1, 1), 'n': (1, 1),
+    '.': (0, 0),
+}
+SYSTEMS = ["fov", "knowledge", "actors", "interactions", "jobs"]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulation headless and report turns per second.")
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=38)
+    parser.add_argument("--map-type", choices=[map_type.name.lower() for map_type in MapType], default="dungeon")
+    parser.add_argument("--single-room", action="store_true")
+    parser.add_argument("--npcs", type=int, default=3)
+    parser.add_argument("--moves", default=None, help="Scripted player moves in vi-keys (hjklyubn, '.' waits), repeated; random walk if omitted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-dialogue", action="store_true", help="Skip actor conversations entirely")
+    parser.add_argument("--mortal", action="store_true", help="Let the player die, which ends the run early")
+    parser.add_argument("--idle", type=float, default=0.0, help="Seconds of idle work between turns, standing in for the player's think time")
+    return parser.parse_args(argv)
+
+def build_world(game, args):
+    world = World(args.width, args.height, game, MapType[args.map_type.upper()], single_room=args.single_room)
+    game.world = world
+    world.initialize_systems()
+
+    positions = game.get_unique_walkable_positions(world, args.npcs + 1)
+    world.player = Player(*positions[0])
+    world.add_entity(world.player)
+    if not args.mortal:
+        fighter = world.player.get_component(FighterComponent)
+        fighter.hp = fighter.max_hp = 10 ** 9
+
+    # Cycle through the character cards; names stay unique since knowledge is keyed by name
+    card_keys = list(character_cards)
+    for i, (x, y) in enumerate(positions[1:]):
+        card_key = card_keys[i % len(card_keys)]
+        name = character_cards[card_key]['name']
+        if args.npcs > len(card_keys):
+            name = f"{name} {i // len(card_keys) + 1}"
+        world.add_entity(Actor(x, y, name, card_key))
+
+    if not game.disable_dialogue_system:
+        world.actor_knowledge_system.assign_initial_relationships(world.entities)
+    game.setup_world(world)
+    return world
+
+class RandomPlayer:
+    # Wanders into free neighbouring tiles; never bumps into actors, which would open a prompt
+    def __init__(self, rng):
+        self.rng = rng
+
+    def next_move(self, world):
+        player = world.player
+        options = [
+            (dx, dy) for dx, dy in MOVES.values()
+            if (dx, dy) != (0, 0)
+            and world.is_walkable(int(player.x + dx), int(player.y + dy))
+            and not world.is_occupied(player.x + dx, player.y + dy)
+        ]
+        return self.rng.choice(options) if options else (0, 0)
+
+class ScriptedPlayer:
+    def __init__(self, moves):
+        self.moves = [MOVES[key] for key in moves if key in MOVES] or [(0, 0)]
+        self.index = 0
+
+    def next_move(self, world):
+        dx, dy = self.moves[self.index % len(self.moves)]
+        self.index += 1
+        player = world.player
+        if world.is_occupied(player.x + dx, player.y + dy):
+            return 0, 0  # Wait rather than bump into an actor
+        return dx, dy
+
+def play_turn(game, player, idle=0.0):
+    world = game.world
+    dx, dy = player.next_move(world)
+    if (dx, dy) != (0, 0):
+        game.move_player(dx, dy)
+    game.loop_system.process_turn()
+    if idle:
+        with game.perf.measure("idle"):
+            game.world.run_idle_work(time.perf_counter() + idle)
+
+def report(turns, elapsed, game):
+    perf = game.perf
+    world = game.world
+    actors = sum(1 for entity in world.entities if isinstance(entity, Actor))
+    idle = perf.get("idle").total if perf.get("idle") else 0.0
+    busy = elapsed - idle
+    print(f"{turns} turns in {busy:.2f}s (plus {idle:.2f}s idle): {turns / busy:.1f} turns/sec")
+    print(f"map {world.width}x{world.height} {world.map_type.name.lower()}, {actors} actors alive, game time {world.scheduler.time}")
+    turn_total = perf.get("turn").total if perf.get("turn") else 0.0
+    print(f"{'system':<14}{'total ms':>10}{'per turn ms':>13}{'p95 ms':>9}{'share':>8}")
+    for name in SYSTEMS + ["turn"]:
+        stats = perf.get(name)
+        if not stats or not stats.count:
+            continue
+        share = stats.total / turn_total * 100 if turn_total else 0.0
+        print(f"{name:<14}{stats.total * 1000:>10.1f}{stats.total / stats.count * 1000:>13.3f}{stats.percentile(95) * 1000:>9.3f}{share:>7.1f}%")
+    print(f"llm calls {perf.llm_calls} (stubbed), errors {perf.llm_errors}")
+    print(f"deferred jobs run {world.jobs.completed}, still queued {len(world.jobs)}")
+    print(f"idle jobs run {world.idle.completed}, cancelled {world.idle.cancelled}, still queued {len(world.idle)}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(args.seed)
+
+    # Headless runtime: offscreen consoles, no tileset, no API key
+    runtime = Runtime(headless=True, llm_stub=True)
+    try:
+        game = Game(None, runtime)
+        game.disable_actor_dialogue = args.no_dialogue
+        build_world(game, args)
+        player = ScriptedPlayer(args.moves) if args.moves else RandomPlayer(random.Random(args.seed))
+
+        # The player's own FOV is never computed, so conversations always take the
+        # unobserved path instead of asking the player whether to listen.
+        runtime.wait_for_services()
+        turns = 0
+        start = time.perf_counter()
+        while turns < args.turns and not game.game_over:
+            play_turn(game, player, args.idle)
+            turns += 1
+        report(turns, time.perf_counter() - start, game)
+    finally:
+        runtime.close()
+
+if __name__ == "__main__":
+    main()
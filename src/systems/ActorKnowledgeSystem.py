@@ -7,19 +7,20 @@ import logging
 import traceback
 import math
 import asyncio
-from anthropic import AsyncAnthropic
 from entities.Player import Player
+from utils.job_queue import PRIORITY_KNOWLEDGE
+
+KNOWLEDGE_NEAR_RADIUS = 10  # Actors this close to the player never have their knowledge deferred
 
 class ActorKnowledgeSystem(System):
     def __init__(self, game):
         self.game = game
         self.logger = logging.getLogger(__name__)
-        self.relationships_generated = False
-        self.async_client = AsyncAnthropic(api_key=game.anthropic_client.api_key)
+        self.async_client = None  # Looked up on first use so building a world never waits on the anthropic import
         self.defeated_entity_positions = {}  # New attribute
 
-    def initialize(self):
-        self.initialize_relationships(self.game.world.entities)
+    def initialize(self, entities):
+        self.initialize_relationships(entities)
 
     def initialize_relationships(self, entities):
         for entity in entities:
@@ -30,50 +31,55 @@ class ActorKnowledgeSystem(System):
                             entity.knowledge.relationships[other_entity.name] = {"type": "stranger", "value": 0}
 
     def update(self, entities, game_map):
-        self.update_actor_knowledge(entities, game_map)
-        
+        # Actors near the player are brought up to date now; the rest wait in the world's job queue
+        world = self.game.world
+        player = world.player
         for actor in entities:
-            if isinstance(actor, Actor):
-                self.logger.debug(f"Actor directions relative to {actor.name}:")
-                for other_entity in entities:
-                    if isinstance(other_entity, Actor) and other_entity != actor:
-                        direction = self.get_direction(actor, other_entity)
-                        self.logger.debug(f"{other_entity.name} is {direction} of {actor.name}")
-                
-                # Log directions of defeated entities
-                for name, position in self.defeated_entity_positions.items():
-                    direction = self.get_direction(actor, name)
-                    self.logger.debug(f"{name} (defeated) is {direction} of {actor.name}")
-
-    def generate_initial_relationships(self, entities):
-        if not self.relationships_generated and not self.game.disable_dialogue_system:
-            asyncio.run(self.generate_actor_relationships(entities))
-            self.relationships_generated = True
-
-    def update_actor_knowledge(self, entities, game_map):
-        alive_actors = [entity for entity in entities if isinstance(entity, Actor)]
+            if not isinstance(actor, Actor):
+                continue
+            if player is None or max(abs(actor.x - player.x), abs(actor.y - player.y)) <= KNOWLEDGE_NEAR_RADIUS:
+                self.update_knowledge_of(actor, game_map)
+            else:
+                world.jobs.add(lambda actor=actor: self.update_deferred_knowledge(actor), PRIORITY_KNOWLEDGE, key=("knowledge", actor))
+
+    def update_deferred_knowledge(self, actor):
+        # The actor may have been demoted or removed since the job was queued
+        if actor in self.game.world.visibility.index:
+            self.update_knowledge_of(actor, self.game.world.game_map)
+
+    def update_knowledge_of(self, actor, game_map):
+        visibility = self.game.world.visibility
+        for other_actor in visibility.visible_to(actor):
+            if isinstance(other_actor, Actor):
+                self.update_actor_info(actor, other_actor, game_map)
+        
+        # Update knowledge about defeated entities
+        for defeated_name, position in self.defeated_entity_positions.items():
+            direction = self.get_direction(actor, defeated_name)
+            actor.knowledge.update_actor_info(
+                defeated_name,
+                is_dead=True,
+                last_seen_position=position,
+                direction=direction
+            )
+
+        current_room = next((room for room in game_map.rooms if room.x <= actor.x < room.x + room.width and room.y <= actor.y < room.y + room.height), None)
+        if current_room:
+            actor.knowledge.add_location(f"Room at ({current_room.x}, {current_room.y})")
+
+        self.logger.debug(f"Actor directions relative to {actor.name}:")
+        for other_entity in visibility.entities:
+            if isinstance(other_entity, Actor) and other_entity != actor:
+                direction = self.get_direction(actor, other_entity)
+                self.logger.debug(f"{other_entity.name} is {direction} of {actor.name}")
         
-        for actor in alive_actors:
-            for other_actor in entities:
-                if isinstance(other_actor, Actor) and other_actor != actor:
-                    self.update_actor_info(actor, other_actor, game_map)
-            
-            # Update knowledge about defeated entities
-            for defeated_name, position in self.defeated_entity_positions.items():
-                direction = self.get_direction(actor, defeated_name)
-                actor.knowledge.update_actor_info(
-                    defeated_name,
-                    is_dead=True,
-                    last_seen_position=position,
-                    direction=direction
-                )
-
-            current_room = next((room for room in game_map.rooms if room.x <= actor.x < room.x + room.width and room.y <= actor.y < room.y + room.height), None)
-            if current_room:
-                actor.knowledge.add_location(f"Room at ({current_room.x}, {current_room.y})")
+        # Log directions of defeated entities
+        for name, position in self.defeated_entity_positions.items():
+            direction = self.get_direction(actor, name)
+            self.logger.debug(f"{name} (defeated) is {direction} of {actor.name}")
 
     def update_actor_info(self, actor, other_actor, game_map):
-        if game_map.is_in_fov(int(actor.x), int(actor.y)) and game_map.is_in_fov(int(other_actor.x), int(other_actor.y)):
+        if self.game.world.can_see(actor, other_actor):
             is_dead = other_actor.get_component(FighterComponent).is_dead()
             is_aggressive = other_actor.get_component(ActorComponent).state == ActorState.AGGRESSIVE
             is_targeting = other_actor.get_component(ActorComponent).target == actor
@@ -110,25 +116,44 @@ class ActorKnowledgeSystem(System):
         index = round(4 * angle / math.pi) % 8
         return directions[index]
 
-    async def generate_actor_relationships(self, entities):
+    def assign_initial_relationships(self, entities):
+        # Types and values are decided locally and take effect immediately with a placeholder story
         actor_entities = [entity for entity in entities if isinstance(entity, Actor)]
-        tasks = []
+        relationships = []
         for i, actor1 in enumerate(actor_entities):
             for actor2 in actor_entities[i+1:]:
                 relationship_type = self.determine_initial_relationship_type(actor1, actor2)
                 initial_value = self.calculate_initial_relationship_value(relationship_type)
-                tasks.append(self.generate_relationship_story(actor1, actor2, relationship_type, initial_value))
-        
-        results = await asyncio.gather(*tasks)
-        
+                placeholder = f"{actor1.name} and {actor2.name} have a {relationship_type} relationship."
+                actor1.knowledge.add_actor(actor2.name, relationship_type, initial_value, placeholder)
+                actor2.knowledge.add_actor(actor1.name, relationship_type, initial_value, placeholder)
+                relationships.append((actor1, actor2, relationship_type, initial_value))
+        return relationships
+
+    async def generate_relationship_stories(self, relationships):
+        tasks = [self.generate_relationship_story(*relationship) for relationship in relationships]
+        return await asyncio.gather(*tasks)
+
+    def fetch_relationship_stories(self, relationships):
+        # Blocking; meant for a worker thread, with the results handed to apply_relationship_stories
+        if self.game.disable_dialogue_system or not relationships:
+            return []
+        return self.run_on_task_loop(self.generate_relationship_stories(relationships))
+
+    def run_on_task_loop(self, coroutine):
+        # Resolved here rather than on the loop, since the client may still be loading
+        self.async_client = self.game.anthropic_client
+        return self.game.runtime.tasks.submit(coroutine).result()
+
+    def apply_relationship_stories(self, results):
         for result in results:
             actor1, actor2, relationship_type, relationship_value, relationship_story = result
             self.logger.info(f"Generated relationship between {actor1.name} and {actor2.name}:")
             self.logger.info(f"  Type: {relationship_type}")
             self.logger.info(f"  Value: {relationship_value}")
             self.logger.info(f"  Story: {relationship_story}")
-            actor1.knowledge.add_actor(actor2.name, relationship_type, relationship_value, relationship_story)
-            actor2.knowledge.add_actor(actor1.name, relationship_type, relationship_value, relationship_story)
+            actor1.knowledge.set_relationship_story(actor2.name, relationship_story)
+            actor2.knowledge.set_relationship_story(actor1.name, relationship_story)
 
     def determine_initial_relationship_type(self, actor1, actor2):
         # Consider faction compatibility
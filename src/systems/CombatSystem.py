@@ -93,13 +93,10 @@ class CombatSystem(System):
 
     def handle_attack_witnesses(self, attacker, target):
         self.logger.info(f"Checking for witnesses to the attack between {attacker.name} and {target.name}")
-        for entity in self.game.world.entities:
+        for entity in self.game.world.visibility.witnesses_of(attacker, target):
             if (isinstance(entity, Actor) and 
                 entity != attacker and 
-                entity != target and
-                self.game.world.game_map.is_in_fov(int(entity.x), int(entity.y)) and 
-                (self.game.world.game_map.is_in_fov(int(attacker.x), int(attacker.y)) or 
-                 self.game.world.game_map.is_in_fov(int(target.x), int(target.y)))):
+                entity != target):
                 self.handle_witness_reaction(entity, attacker, target)
 
     def handle_witness_reaction(self, witness, attacker, target):
@@ -153,7 +150,7 @@ class CombatSystem(System):
         else:
             self.logger.info(f"Removing defeated entity: {target.name}")
             self.update_defeated_entity_position(target)
-            self.game.world.entities.remove(target)
+            self.game.world.remove_entity(target)
             self.clear_defeated_entity_as_target(target)
             
             # Add combat memory for the defeated entity
@@ -169,7 +166,7 @@ class CombatSystem(System):
             
             # Update knowledge only for actors who can see the target
             for entity in self.game.world.entities:
-                if isinstance(entity, Actor) and self.game.world.game_map.is_in_fov(int(entity.x), int(entity.y)) and self.game.world.game_map.is_in_fov(int(target.x), int(target.y)):
+                if isinstance(entity, Actor) and self.game.world.can_see(entity, target):
                     entity.knowledge.update_actor_info(
                         target.name,
                         is_dead=True,
@@ -1,9 +1,13 @@
-import tcod
 from systems.MessageSystem import MessageSystem
 from systems.RenderSystem import RenderSystem
 from systems.InputSystem import InputSystem
 from systems.dialogue.DialogueSystem import DialogueSystem
+from systems.dialogue.ConversationSummarizer import ConversationSummarizer
 from systems.PlayerSystem import PlayerSystem
+from systems.TravelSystem import TravelSystem
+from systems.CombatSystem import CombatSystem
+from systems.GameLoopSystem import GameLoopSystem
+from systems.MainMenuSystem import MainMenuSystem
 from systems.MessageSystem import MessageChannel
 
 class GameInitializationSystem:
@@ -11,7 +15,6 @@ class GameInitializationSystem:
         self.game = game
 
     def initialize_message_system(self):
-        self.game.message_system = MessageSystem()
         self.game.max_log_messages = 100
         self.game.visible_log_lines = 10
         self.game.visible_channels = set(MessageChannel) - {MessageChannel.MOVEMENT}
@@ -23,22 +26,35 @@ class GameInitializationSystem:
         self.game.fov_recompute = True
 
     def initialize_systems(self):
-        self.game.input_system = InputSystem(self.game)
-        self.game.dialogue_system = DialogueSystem(self.game)
-        self.game.player_system = PlayerSystem(self.game)
+        # Registration is idempotent; systems are only constructed when first used
+        systems = self.game.systems
+        systems.register('message_system', lambda game: MessageSystem())
+        systems.register('render_system', self.create_render_system)
+        systems.register('input_system', InputSystem)
+        systems.register('player_system', PlayerSystem)
+        systems.register('travel_system', TravelSystem)
+        systems.register('combat_system', CombatSystem)
+        systems.register('loop_system', GameLoopSystem)
+        systems.register('main_menu_system', MainMenuSystem)
+        systems.register('dialogue_system', DialogueSystem)
+        systems.register('conversation_summarizer', lambda game: ConversationSummarizer(game, game.anthropic_client))
 
-    def initialize_render_system(self):
-        self.game.render_system = RenderSystem(
-            self.game,
-            self.game.world,
-            self.game.message_system,
-            self.game.root_console,
-            self.game.game_console,
-            self.game.context
+    def create_render_system(self, game):
+        return RenderSystem(
+            game,
+            game.world,
+            game.message_system,
+            game.root_console,
+            game.game_console,
+            game.context
         )
 
+    def initialize_render_system(self):
+        # The render system holds the world, so it is rebuilt lazily whenever the world changes
+        self.game.systems.reset('render_system')
+
     def initialize_all(self):
         self.initialize_message_system()
         self.initialize_camera_and_fov()
         self.initialize_systems()
-        self.initialize_render_system()
\ No newline at end of file
+        self.initialize_render_system()
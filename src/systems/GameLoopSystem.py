@@ -1,8 +1,16 @@
 import random
-import tcod
+import time
 from components.ActorComponent import ActorComponent
+from components.FighterComponent import FighterComponent
 from systems.MessageSystem import MessageChannel
 from entities.Actor import Actor
+from systems.RenderSystem import RenderRegion
+from utils.startup_profile import startup_profile
+from utils.idle_work import IDLE_PRIORITY_PATH, IDLE_PRIORITY_SUMMARY, IDLE_PRIORITY_COMPACT
+from components.KnowledgeComponent import MEMORY_LIMIT
+
+TURN_BUDGET = 0.012  # Seconds of AI work per turn, keeping input latency under a frame
+REST_TURNS = 100  # Length of a rest when no count is typed before the key
 
 class GameLoopSystem:
     def __init__(self, game):
@@ -10,46 +18,153 @@ class GameLoopSystem:
 
     def run(self):
         self.game.logger.info("Starting game loop")
+        self.game.render_system.render()
+        startup_profile.mark("interactive")
+        startup_profile.report()
         while True:
-            self.game.render_system.render()
-            
             if self.game.game_over:
                 self.handle_game_over()
                 break
             
+            # Polls input at frame rate; setup stages, LLM replies and redraws are applied while it waits
             action_taken = self.game.input_system.handle_input()
             
             if action_taken:
-                self.update_game_state()
-                self.handle_actor_interactions()
+                self.game.render_system.mark_dirty(RenderRegion.MAP, RenderRegion.ENTITIES)
+                self.process_turn()
                 self.game.logger.debug("Game loop iteration completed")
 
+    def process_turn(self):
+        # Everything after the player's action shares one time budget; whatever does not fit
+        # (late actors, deferred jobs) carries over to the next turn. Recorded sessions run
+        # every turn to completion so replays match.
+        game = self.game
+        perf = game.perf
+        # Replies that arrived during a rest or a walk are applied here as well as while waiting for input.
+        # Polled before the turn is counted, so a recording never has this poll and the ones after
+        # the turn at the same logical position.
+        game.runtime.tasks.poll()
+        if game.runtime.session:
+            game.runtime.session.next_turn(game.world)
+        deadline = None if game.deterministic else time.perf_counter() + TURN_BUDGET
+        with perf.measure("turn"):
+            self.update_game_state(deadline)
+            with perf.measure("interactions"):
+                self.handle_actor_interactions()
+            with perf.measure("jobs"):
+                self.game.world.jobs.run(deadline, min_jobs=1)
+        self.schedule_idle_work()
+
+    def schedule_idle_work(self):
+        # Speculative work for the next wait on input. Jobs cancelled by a keypress are
+        # queued again from here after the following turn, if they are still wanted.
+        world = self.game.world
+        player = world.player
+        if player is None or self.game.deterministic:
+            return
+        actors = [entity for entity in world.active_entities() if isinstance(entity, Actor)]
+        # Hostile actors without a target head for the player's position
+        goal = (int(player.x), int(player.y))
+        if goal not in world.goal_maps and any(
+                actor.aggression_type == "hostile" and not actor.get_component(ActorComponent).dijkstra_map
+                for actor in actors):
+            world.idle.add(lambda: world.warm_goal_map(goal), IDLE_PRIORITY_PATH, key=("goal map", goal))
+        for actor in actors:
+            knowledge = actor.knowledge
+            # The summary is the bulk of every dialogue and conversation prompt
+            if knowledge.summary is None:
+                world.idle.add(knowledge.get_summary, IDLE_PRIORITY_SUMMARY, key=("summary", actor))
+            if len(knowledge.conversation_memories) > MEMORY_LIMIT or len(knowledge.combat_memories) > MEMORY_LIMIT:
+                world.idle.add(knowledge.compact_memories, IDLE_PRIORITY_COMPACT, key=("compact", actor))
+
     def handle_game_over(self):
         self.game.show_message("Game Over. Press any key to return to main menu.", MessageChannel.SYSTEM)
-        self.game.render_system.render()  # Ensure the message is displayed
+        self.game.render_system.flush()  # Ensure the message is displayed
         while True:
-            for event in tcod.event.wait():
+            for event in self.game.wait_for_events():
                 if event.type == "QUIT":
                     raise SystemExit()
                 elif event.type == "KEYDOWN":
                     self.game.main_menu_system.handle_main_menu()
                     return
 
-    def update_game_state(self):
+    def update_game_state(self, deadline=None):
         self.game.logger.debug("Updating actor knowledge and positions")
-        self.game.world.actor_knowledge_system.update(self.game.world.entities, self.game.world.game_map)
-        self.game.world.update_actors()
+        perf = self.game.perf
+        with perf.measure("fov"):
+            self.game.world.update_fov()
+        with perf.measure("knowledge"):
+            self.game.world.actor_knowledge_system.update(self.game.world.active_entities(), self.game.world.game_map)
+        with perf.measure("actors"):
+            self.game.world.update_actors(deadline=deadline)
 
     def handle_actor_interactions(self):
         self.game.logger.debug("Checking for potential actor interactions")
-        potential_interactions = self.game.world.get_potential_actor_interactions()
-        for actor1, actor2 in potential_interactions:
-            if not self.game.disable_actor_dialogue:  # Add this condition
-                if not actor1.get_component(ActorComponent).current_conversation and random.random() < 0.05:
-                    self.game.dialogue_system.conversation_manager.start_actor_dialogue(actor1, actor2)
-        
-        for actor1, actor2 in potential_interactions:
-            if not self.game.disable_actor_dialogue:  # Add this condition
-                if actor1.get_component(ActorComponent).current_conversation and actor1.get_component(ActorComponent).conversation_turns < 3:
-                    self.game.dialogue_system.conversation_manager.continue_actor_dialogue(actor1, actor2)
-                    break
\ No newline at end of file
+        if self.game.disable_actor_dialogue:
+            return
+        conversation_manager = self.game.dialogue_system.conversation_manager
+        continuing = None
+        for actor1, actor2 in self.game.world.get_potential_actor_interactions():
+            actor_component = actor1.get_component(ActorComponent)
+            # Actors waiting on a model reply sit out until it arrives
+            if actor_component.awaiting_reply or actor2.get_component(ActorComponent).awaiting_reply:
+                continue
+            if not actor_component.current_conversation and random.random() < 0.05:
+                conversation_manager.start_actor_dialogue(actor1, actor2)
+            # Only one ongoing conversation advances per turn
+            if continuing is None and actor_component.current_conversation and actor_component.conversation_turns < 3:
+                continuing = (actor1, actor2)
+        # Ongoing conversations pause while the player rests
+        if continuing and conversation_manager.digest is None:
+            conversation_manager.continue_actor_dialogue(*continuing)
+
+    def rest(self, turns=REST_TURNS):
+        # Fast-forward: every turn is simulated in full, but nothing is drawn and NPC
+        # conversations are batched into one digest when the rest ends. Stops early on danger.
+        game = self.game
+        world = game.world
+        threat = self.find_threat()
+        if threat:
+            game.message_system.add_message(f"You cannot rest with {threat.name} in view.", MessageChannel.SYSTEM)
+            return
+        fighter = world.player.get_component(FighterComponent)
+        hp = fighter.hp
+        conversation_manager = None if game.disable_actor_dialogue else game.dialogue_system.conversation_manager
+        if conversation_manager:
+            conversation_manager.begin_digest()
+        interruption = None
+        rested = 0
+        try:
+            while rested < turns:
+                self.process_turn()
+                rested += 1
+                if game.game_over or fighter.hp < hp:
+                    interruption = "You are attacked!"
+                    break
+                threat = self.find_threat()
+                if threat:
+                    interruption = f"{threat.name} comes into view."
+                    break
+                if game.has_input():
+                    break
+        finally:
+            if conversation_manager:
+                conversation_manager.finish_digest()
+        game.message_system.add_message(f"You rest for {rested} turns.", MessageChannel.SYSTEM)
+        if interruption:
+            game.message_system.add_message(interruption, MessageChannel.SYSTEM, (255, 0, 0))
+        game.render_system.mark_dirty(RenderRegion.MAP, RenderRegion.ENTITIES)
+
+    def find_threat(self):
+        # A hostile actor, or one that has the player as its target, in the player's view.
+        # Checked against the player's own FOV rather than the visibility matrix, which is
+        # built before actors move, so one that steps into view stops a rest or walk at once.
+        world = self.game.world
+        player = world.player
+        self.game.render_system.update_fov()
+        game_map = world.game_map
+        for entity in world.entities:
+            if isinstance(entity, Actor) and game_map.is_in_fov(int(entity.x), int(entity.y)):
+                if entity.aggression_type == "hostile" or entity.get_component(ActorComponent).target is player:
+                    return entity
+        return None
\ No newline at end of file
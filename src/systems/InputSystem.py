@@ -1,62 +1,128 @@
+import time
+from enum import Enum, auto
 import tcod
 from tcod.event import KeySym
 from ecs.ecs import System
 from systems.MessageSystem import MessageChannel
 from utils.mapgen import TileType
+from systems.GameLoopSystem import REST_TURNS
+
+# Built once at import; handle_keydown only does lookups
+MOVE_KEYS = {
+    # Arrow keys
+    KeySym.UP: (0, -1),
+    KeySym.DOWN: (0, 1),
+    KeySym.LEFT: (-1, 0),
+    KeySym.RIGHT: (1, 0),
+    # Numpad
+    KeySym.KP_8: (0, -1),
+    KeySym.KP_2: (0, 1),
+    KeySym.KP_4: (-1, 0),
+    KeySym.KP_6: (1, 0),
+    # Diagonal movement
+    KeySym.KP_7: (-1, -1),
+    KeySym.KP_9: (1, -1),
+    KeySym.KP_1: (-1, 1),
+    KeySym.KP_3: (1, 1),
+}
+
+WAIT_KEYS = frozenset((KeySym.PERIOD, KeySym.KP_5))
+
+class KeyRepeat(Enum):
+    QUEUE = auto()  # Every queued keypress is a separate turn and frame
+    COALESCE = auto()  # Queued repeats of a move run as one batch of turns with a single frame
+    DROP = auto()  # Queued repeats of a move are discarded; one step per frame at most
+
+MAX_REPEAT_STEPS = 8  # Most queued repeats run in one batch
+REPEAT_BUDGET = 0.1  # Seconds a batch may take; repeats beyond it are stale and dropped
 
 class InputSystem(System):
     def __init__(self, game):
         self.game = game
         self.pressed_keys = set()
+        self.count = ""  # Digits typed before a command, e.g. 20r rests for 20 turns
+        self.key_repeat = KeyRepeat.COALESCE
 
     def handle_input(self):
-        for event in tcod.event.wait():
+        # Events after the one handled stay in game.pending_events, where prompts and the
+        # checks that interrupt rests and walks read them
+        for event in self.game.wait_for_events():
             if event.type == "QUIT":
                 raise SystemExit()
             elif event.type == "KEYDOWN":
                 self.pressed_keys.add(event.sym)
+                if event.sym in MOVE_KEYS and self.key_repeat != KeyRepeat.QUEUE:
+                    return self.handle_move_repeats(event)
                 return self.handle_keydown(event)
             elif event.type == "KEYUP":
                 self.pressed_keys.discard(event.sym)
+            elif event.type == "MOUSEBUTTONDOWN" and event.button == tcod.event.MouseButton.LEFT:
+                self.handle_click(event)
+                return False
         return False
 
+    def take_repeats(self, event):
+        # Removes the auto-repeats of this key queued right behind it
+        pending = self.game.pending_events
+        repeats = 0
+        while pending and pending[0].type == "KEYDOWN" and pending[0].sym == event.sym and pending[0].repeat:
+            pending.popleft()
+            repeats += 1
+        return repeats
+
+    def handle_move_repeats(self, event):
+        # A held key queues repeats faster than slow turns can use them. The batch runs back
+        # to back without frames in between; whatever doesn't fit is dropped, so the game
+        # never trails the keyboard.
+        repeats = self.take_repeats(event)
+        if self.key_repeat == KeyRepeat.DROP:
+            return self.handle_keydown(event)
+        start = time.perf_counter()
+        for _ in range(min(repeats, MAX_REPEAT_STEPS - 1)):
+            if not self.handle_keydown(event) or self.game.game_over:
+                return False
+            self.game.loop_system.process_turn()
+            if time.perf_counter() - start > REPEAT_BUDGET and not self.game.deterministic:
+                break
+        # The last step's turn is run by the game loop, followed by the frame
+        return self.handle_keydown(event)
+
+    def discard_text_input(self, text):
+        # A letter key also sends its character as TEXTINPUT; once the key has been taken as a
+        # command, that character must not land in the text prompt the command may open
+        pending = self.game.pending_events
+        for queued in pending:
+            if queued.type == "TEXTINPUT":
+                if queued.text == text:
+                    pending.remove(queued)
+                break
+
+    def handle_click(self, event):
+        # Travel to the clicked tile; the walk runs its own turns
+        x, y = (int(value) for value in self.game.context.convert_event(event).position)
+        target = self.game.render_system.screen_to_map(x, y)
+        if target:
+            self.game.travel_system.travel_to(*target)
+
     def handle_keydown(self, event):
         action_taken = False
-        move_map = {
-            # Arrow keys
-            KeySym.UP: (0, -1),
-            KeySym.DOWN: (0, 1),
-            KeySym.LEFT: (-1, 0),
-            KeySym.RIGHT: (1, 0),
-            # Numpad
-            KeySym.KP_8: (0, -1),
-            KeySym.KP_2: (0, 1),
-            KeySym.KP_4: (-1, 0),
-            KeySym.KP_6: (1, 0),
-            # Diagonal movement
-            KeySym.KP_7: (-1, -1),
-            KeySym.KP_9: (1, -1),
-            KeySym.KP_1: (-1, 1),
-            KeySym.KP_3: (1, 1),
-            # Optional: Add support for diagonal movement with arrow keys + modifiers
-            (KeySym.UP, KeySym.LEFT): (-1, -1),
-            (KeySym.UP, KeySym.RIGHT): (1, -1),
-            (KeySym.DOWN, KeySym.LEFT): (-1, 1),
-            (KeySym.DOWN, KeySym.RIGHT): (1, 1),
-        }
-
-        if event.sym in move_map:
-            dx, dy = move_map[event.sym]
-            self.game.move_player(dx, dy)
-            action_taken = True
-        elif isinstance(event.sym, tuple) and event.sym in move_map:
-            dx, dy = move_map[event.sym]
+        if KeySym.N0 <= event.sym <= KeySym.N9:
+            self.count += str(event.sym - KeySym.N0)
+            return False
+        count, self.count = self.count, ""
+        if event.sym in MOVE_KEYS:
+            dx, dy = MOVE_KEYS[event.sym]
             self.game.move_player(dx, dy)
             action_taken = True
-        elif event.sym in (KeySym.PERIOD, KeySym.KP_5):
+        elif event.sym in WAIT_KEYS:
             self.game.message_system.add_message("You wait for a moment.", MessageChannel.SYSTEM)
             action_taken = True
+        elif event.sym == KeySym.r:
+            self.game.loop_system.rest(int(count) if count else REST_TURNS)
+        elif event.sym == KeySym.x:
+            self.game.travel_system.explore()
         elif event.sym == KeySym.i:
+            self.discard_text_input("i")
             self.game.interact()
         elif event.sym == KeySym.o:
             action_taken = self.handle_open_door()
@@ -66,6 +132,14 @@ class InputSystem(System):
             raise SystemExit()
         elif event.sym == KeySym.s:
             self.game.save_game()
+        elif event.sym == KeySym.PAGEUP:
+            self.game.message_system.scroll(self.game.message_system.visible_log_lines)
+        elif event.sym == KeySym.PAGEDOWN:
+            self.game.message_system.scroll(-self.game.message_system.visible_log_lines)
+        elif event.sym == KeySym.END:
+            self.game.message_system.scroll_to_end()
+        elif event.sym == KeySym.F3:
+            self.game.render_system.toggle_perf_overlay()
         elif event.sym == KeySym.d and (event.mod & tcod.event.KMOD_CTRL):
             self.game.disable_actor_dialogue = not self.game.disable_actor_dialogue
             status = "disabled" if self.game.disable_actor_dialogue else "enabled"
@@ -95,8 +169,7 @@ class InputSystem(System):
             if self.game.world.game_map.tiles[y][x].tile_type == TileType.DOOR:
                 tile = self.game.world.game_map.tiles[y][x]
                 if (action == 'open' and not tile.is_open) or (action == 'close' and tile.is_open):
-                    tile.toggle_door()
-                    self.game.world.game_map.initialize_fov()
+                    self.game.world.toggle_door(x, y)
                     self.game.fov_recompute = True
                     self.game.message_system.add_message(f"You {action} the door.", MessageChannel.SYSTEM)
                     return True
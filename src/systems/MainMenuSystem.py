@@ -1,6 +1,7 @@
 import tcod
 from tcod import libtcodpy
 from tcod.event import KeySym
+from utils.startup_profile import startup_profile
 
 class MainMenuSystem:
     def __init__(self, game):
@@ -17,6 +18,17 @@ class MainMenuSystem:
         )
         self.game.context.present(self.game.root_console)
 
+    def show_loading_progress(self, stage, completed, total):
+        self.show_loading_screen()
+        self.game.root_console.print(
+            self.game.width // 2,
+            self.game.height // 2 + 2,
+            f"{stage.label} ({completed}/{total})",
+            fg=(150, 150, 150),
+            alignment=libtcodpy.CENTER
+        )
+        self.game.context.present(self.game.root_console)
+
     def show_main_menu(self):
         options = ['New Game', 'Load Game', 'Quit']
         selected = 0
@@ -30,8 +42,11 @@ class MainMenuSystem:
                 self.game.root_console.print(self.game.width // 2, self.game.height // 2 + i, option, fg=color, alignment=libtcodpy.CENTER)
 
             self.game.context.present(self.game.root_console)
+            # The menu is up; load the LLM client and sentiment lexicon while the player reads it
+            startup_profile.mark("first frame")
+            self.game.runtime.start_background_loading()
 
-            for event in tcod.event.wait():
+            for event in self.game.event_source.wait():
                 if event.type == "QUIT":
                     raise SystemExit()
                 elif event.type == "KEYDOWN":
@@ -70,7 +85,7 @@ class MainMenuSystem:
 
             self.game.context.present(self.game.root_console)
 
-            for event in tcod.event.wait():
+            for event in self.game.event_source.wait():
                 if event.type == "QUIT":
                     return False
                 elif event.type == "KEYDOWN":
@@ -1,6 +1,12 @@
+import heapq
+import textwrap
+from collections import deque
+from functools import lru_cache
+from itertools import islice
 from enum import Enum, auto
 from typing import List, Tuple
 from ecs.ecs import System
+from utils.scrollback import Scrollback
 
 class MessageChannel(Enum):
     COMBAT = auto()
@@ -10,25 +16,77 @@ class MessageChannel(Enum):
     MOVEMENT = auto()
 
 class Message:
-    def __init__(self, text: str, channel: MessageChannel, color: Tuple[int, int, int]):
+    def __init__(self, text: str, channel: MessageChannel, color: Tuple[int, int, int], seq: int = -1):
         self.text = text
         self.channel = channel
         self.color = color
+        self.seq = seq  # Position in the scrollback
+        self.wrap_width = None
+        self.wrapped_lines = []
+
+    def wrap(self, width: int) -> List[str]:
+        # Wrapping only changes with the panel width, so it is done once per message
+        if width != self.wrap_width:
+            self.wrapped_lines = textwrap.wrap(self.text, width)
+            self.wrap_width = width
+        return self.wrapped_lines
 
 class MessageSystem(System):
     def __init__(self):
-        self.message_log: List[Message] = []
         self.max_log_messages = 100
         self.visible_log_lines = 10
         self.visible_channels = set(MessageChannel) - {MessageChannel.MOVEMENT}
+        self.message_log = deque(maxlen=self.max_log_messages)
+        self.channel_logs = {channel: deque(maxlen=self.max_log_messages) for channel in MessageChannel}
+        self.scrollback = Scrollback()
+        self.scroll_anchor = None  # Newest record shown while scrolled back, None when following the log
+        self.load_message = lru_cache(maxsize=256)(self.read_scrollback)
+        self.version = 0  # Bumped on every change so the renderer knows when the log is stale
 
     def add_message(self, text: str, channel: MessageChannel, color: Tuple[int, int, int] = (255, 255, 255)):
-        self.message_log.append(Message(text, channel, color))
-        if len(self.message_log) > self.max_log_messages:
-            self.message_log.pop(0)
+        seq = self.scrollback.append(text, channel.name, color)
+        message = Message(text, channel, color, seq)
+        self.message_log.append(message)
+        self.channel_logs[channel].append(message)
+        self.version += 1
+
+    def read_scrollback(self, seq: int) -> Message:
+        text, channel_name, color = self.scrollback.read(seq)
+        return Message(text, MessageChannel[channel_name], color, seq)
+
+    def get_visible_messages(self, limit: int = None) -> List[Message]:
+        # Newest first. Recent messages come from the per-channel buffers; scrolled views page in from disk.
+        if limit is None:
+            limit = self.visible_log_lines
+        if self.scroll_anchor is not None:
+            records = self.scrollback.newest_records(self.visible_channel_names(), limit, self.scroll_anchor)
+            return [self.load_message(seq) for seq in records]
+        tails = [reversed(self.channel_logs[channel]) for channel in self.visible_channels]
+        merged = heapq.merge(*tails, key=lambda message: message.seq, reverse=True)
+        return list(islice(merged, limit))
+
+    def visible_channel_names(self) -> List[str]:
+        return [channel.name for channel in self.visible_channels]
+
+    def scroll(self, delta: int):
+        # Positive deltas move back in history, negative ones towards the newest message
+        channel_names = self.visible_channel_names()
+        if delta > 0:
+            records = self.scrollback.newest_records(channel_names, delta + 1, self.scroll_anchor)
+            anchor = records[-1] if records else None
+        elif delta < 0 and self.scroll_anchor is not None:
+            records = self.scrollback.records_after(channel_names, -delta + 1, self.scroll_anchor)
+            anchor = records[-delta - 1] if len(records) > -delta else None
+        else:
+            return
+        if anchor != self.scroll_anchor:
+            self.scroll_anchor = anchor
+            self.version += 1
 
-    def get_visible_messages(self) -> List[Message]:
-        return [msg for msg in reversed(self.message_log) if msg.channel in self.visible_channels][:self.visible_log_lines]
+    def scroll_to_end(self):
+        if self.scroll_anchor is not None:
+            self.scroll_anchor = None
+            self.version += 1
 
     def update(self, entities):
         # This method is required by the System class, but we don't need to update anything here
@@ -36,3 +94,10 @@ class MessageSystem(System):
 
     def clear_messages(self):
         self.message_log.clear()
+        for channel_log in self.channel_logs.values():
+            channel_log.clear()
+        self.scrollback.close()
+        self.scrollback = Scrollback()
+        self.load_message.cache_clear()
+        self.scroll_anchor = None
+        self.version += 1
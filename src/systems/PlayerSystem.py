@@ -1,5 +1,4 @@
 from ecs.ecs import System
-from components.PositionComponent import PositionComponent
 from systems.MessageSystem import MessageChannel
 from entities.Actor import Actor
 from utils.mapgen import TileType
@@ -37,8 +36,7 @@ class PlayerSystem(System):
                 self.game.dialogue_system.start_dialogue(target)
                 return True
         elif self.game.world.game_map.is_walkable(new_x, new_y):
-            player.get_component(PositionComponent).x = new_x
-            player.get_component(PositionComponent).y = new_y
+            self.game.world.move_entity(player, new_x, new_y)
             self.game.fov_recompute = True
             return True
         return False
@@ -46,7 +44,7 @@ class PlayerSystem(System):
     def confirm_attack(self, target):
         self.game.show_message(f"Do you want to attack {target.name}? (Y/N)", MessageChannel.SYSTEM, (255, 255, 0))
         while True:
-            for event in tcod.event.wait():
+            for event in self.game.wait_for_events():
                 if event.type == "QUIT":
                     raise SystemExit()
                 elif event.type == "KEYDOWN":
@@ -54,7 +52,6 @@ class PlayerSystem(System):
                         return True
                     elif event.sym == tcod.event.KeySym.n:
                         return False
-            self.game.render_system.render()
 
     def interact(self):
         player = self.game.world.player
@@ -64,7 +61,8 @@ class PlayerSystem(System):
             x, y = player_x + dx, player_y + dy
             tile = self.game.world.game_map.tiles[y][x]
             if tile.tile_type == TileType.DOOR:
-                tile.toggle_door()
+                self.game.world.toggle_door(x, y)
+                self.game.fov_recompute = True
                 action = "open" if tile.is_open else "close"
                 self.game.show_message(f"You {action} the door.", MessageChannel.SYSTEM, (255, 255, 0))
                 return True
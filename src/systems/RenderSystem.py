@@ -1,7 +1,31 @@
+import time
 import tcod
-import textwrap
+import numpy as np
+from enum import Enum, auto
 from ecs.ecs import System
-from utils.mapgen import TileType
+from utils.mapgen import TILE_INDEX_WALL, TILE_INDEX_FLOOR, TILE_INDEX_DOOR_CLOSED, TILE_INDEX_DOOR_OPEN
+
+# Lookup tables indexed by Map.tile_index
+TILE_GLYPHS = np.zeros(4, dtype=np.int32)
+TILE_GLYPHS[[TILE_INDEX_WALL, TILE_INDEX_FLOOR, TILE_INDEX_DOOR_CLOSED, TILE_INDEX_DOOR_OPEN]] = [ord('#'), ord('.'), ord('+'), ord('/')]
+
+VISIBLE_COLORS = np.zeros((4, 3), dtype=np.uint8)
+VISIBLE_COLORS[TILE_INDEX_WALL] = (130, 110, 50)
+VISIBLE_COLORS[TILE_INDEX_FLOOR] = (200, 180, 50)
+VISIBLE_COLORS[TILE_INDEX_DOOR_CLOSED] = (130, 110, 50)
+VISIBLE_COLORS[TILE_INDEX_DOOR_OPEN] = (0, 255, 255)
+
+EXPLORED_COLORS = np.zeros((4, 3), dtype=np.uint8)
+EXPLORED_COLORS[TILE_INDEX_WALL] = (0, 0, 100)
+EXPLORED_COLORS[TILE_INDEX_FLOOR] = (50, 50, 150)
+EXPLORED_COLORS[TILE_INDEX_DOOR_CLOSED] = (0, 0, 100)
+EXPLORED_COLORS[TILE_INDEX_DOOR_OPEN] = (0, 100, 100)
+
+class RenderRegion(Enum):
+    MAP = auto()
+    ENTITIES = auto()
+    LOG = auto()
+    INPUT = auto()
 
 class RenderSystem(System):
     def __init__(self, game, world, message_system, root_console, game_console, context):
@@ -17,6 +41,11 @@ class RenderSystem(System):
         self.dialogue_height = game.dialogue_height
         self.camera_x = 0
         self.camera_y = 0
+        self.dirty = set(RenderRegion)
+        self.log_version = None
+        self.show_perf_overlay = False
+        self.line_editor = None
+        self.frames_presented = 0
 
     def update_camera(self):
         self.camera_x = int(self.world.player.x - self.width // 2)
@@ -24,87 +53,182 @@ class RenderSystem(System):
 
     def render_message_log(self):
         y = self.height - 2  # Start one line higher
+        if self.line_editor:
+            y -= self.line_editor.max_lines  # The editor keeps the bottom rows
+        wrap_width = self.width - 4  # Reduce width by 2 on each side
         for message in self.message_system.get_visible_messages():
-            wrapped_text = textwrap.wrap(message.text, self.width - 4)  # Reduce width by 2 on each side
-            for line in reversed(wrapped_text):
+            for line in reversed(message.wrap(wrap_width)):
                 if y <= self.game_area_height:
                     break
                 self.root_console.print(1, y, line, message.color)  # Move text 1 character to the right
                 y -= 1
             if y <= self.game_area_height:
                 break
+        if self.message_system.scroll_anchor is not None:
+            label = f" Scrollback {self.message_system.scroll_anchor + 1}/{len(self.message_system.scrollback)} "
+            self.root_console.print(self.width - len(label) - 1, self.game_area_height, label, (255, 255, 0))
+
+    def render_line_editor(self, full=False):
+        editor = self.line_editor
+        top = self.height - 1 - editor.max_lines
+        lines = range(editor.max_lines) if full else editor.take_dirty_lines()
+        for line in lines:
+            self.root_console.draw_rect(1, top + line, self.width - 2, 1, ord(' '), fg=(255, 255, 255), bg=(0, 0, 0))
+            self.root_console.print(1, top + line, editor.line_text(line), fg=editor.color)
+        if full:
+            editor.dirty_lines.clear()
+        cursor_x, cursor_y = editor.cursor_cell()
+        self.root_console.print(1 + cursor_x, top + cursor_y, editor.cursor_char(), fg=(0, 0, 0), bg=editor.color)
+
+    def open_line_editor(self, editor):
+        self.line_editor = editor
+        self.mark_dirty(RenderRegion.LOG)
+
+    def close_line_editor(self):
+        self.line_editor = None
+        self.mark_dirty(RenderRegion.LOG)
+
+    def mark_dirty(self, *regions):
+        self.dirty.update(regions or RenderRegion)
 
     def render(self):
-        if self.game.fov_recompute:
-            self.world.game_map.compute_fov(
-                int(self.world.player.x),
-                int(self.world.player.y),
-                self.game.fov_radius
-            )
-            self.game.fov_recompute = False
-
-        self.update_camera()
-        self.root_console.clear()
-        self.game_console.clear()
-        
-        # Render game area
-        self.game_console.draw_frame(0, 0, self.width, self.game_area_height, ' ')
-        self.game_console.draw_rect(1, 0, self.width - 2, 1, ord('─'))
-        self.game_console.put_char(self.width - 1, 0, ord('┐'))
-        
-        # Render map
-        self.render_map()
-        
-        # Render entities
-        self.render_entities()
-        
-        # Blit game console to root console
-        self.game_console.blit(self.root_console, 0, 0)
-        
-        # Render dialogue area
-        self.root_console.draw_frame(0, self.game_area_height, self.width, self.dialogue_height, ' ')
-        self.root_console.draw_rect(1, self.game_area_height, self.width - 2, 1, ord('─'))
-        self.root_console.put_char(0, self.game_area_height, ord('┌'))
-        self.root_console.put_char(self.width - 1, self.game_area_height, ord('┐'))
-        self.render_message_log()
-        
+        # Full redraw, e.g. after a menu has drawn over the root console
+        self.mark_dirty()
+        self.flush()
+
+    def flush(self):
+        # Present at most one frame for everything marked since the last flush
+        self.update_fov()
+        if self.message_system.version != self.log_version:
+            self.dirty.add(RenderRegion.LOG)
+        if self.line_editor and self.line_editor.dirty_lines:
+            self.dirty.add(RenderRegion.INPUT)
+
+        if not self.dirty:
+            return
+
+        start = time.perf_counter()
+        # Entities are drawn over the map, so either region redraws the whole game area
+        if RenderRegion.MAP in self.dirty or RenderRegion.ENTITIES in self.dirty:
+            self.update_camera()
+            self.game_console.clear()
+
+            # Render game area
+            self.game_console.draw_frame(0, 0, self.width, self.game_area_height, ' ')
+            self.game_console.draw_rect(1, 0, self.width - 2, 1, ord('─'))
+            self.game_console.put_char(self.width - 1, 0, ord('┐'))
+
+            # Render map
+            self.render_map()
+
+            # Render entities
+            self.render_entities()
+
+            # Blit game console to root console
+            self.game_console.blit(self.root_console, 0, 0)
+
+        if RenderRegion.LOG in self.dirty:
+            # Render dialogue area; the frame clears its interior
+            self.root_console.draw_frame(0, self.game_area_height, self.width, self.dialogue_height, ' ')
+            self.root_console.draw_rect(1, self.game_area_height, self.width - 2, 1, ord('─'))
+            self.root_console.put_char(0, self.game_area_height, ord('┌'))
+            self.root_console.put_char(self.width - 1, self.game_area_height, ord('┐'))
+            self.render_message_log()
+            self.log_version = self.message_system.version
+            if self.line_editor:
+                self.render_line_editor(full=True)
+        elif RenderRegion.INPUT in self.dirty and self.line_editor:
+            # Typing only touches the editor rows
+            self.render_line_editor()
+
+        if self.show_perf_overlay:
+            self.render_perf_overlay()
+
+        self.dirty.clear()
+        drawn = time.perf_counter()
         self.context.present(self.root_console)
+        self.frames_presented += 1
+        self.game.perf.record("render", drawn - start)
+        self.game.perf.record("frame", time.perf_counter() - start)
+
+    def update_fov(self):
+        # The player's view and explored area; multi-step commands call this on turns they don't draw
+        if not self.game.fov_recompute:
+            return
+        game_map = self.world.game_map
+        game_map.compute_fov(
+            int(self.world.player.x),
+            int(self.world.player.y),
+            self.game.fov_radius
+        )
+        game_map.explored |= game_map.fov_map.fov
+        self.game.fov_recompute = False
+        self.dirty.add(RenderRegion.MAP)
+
+    def screen_to_map(self, x, y):
+        # Console cell to map cell, or None outside the map view
+        if not (1 <= x < self.width - 1 and 1 <= y < self.game_area_height - 1):
+            return None
+        return x - 1 + self.camera_x, y - 1 + self.camera_y
+
+    def toggle_perf_overlay(self):
+        self.show_perf_overlay = not self.show_perf_overlay
+        self.mark_dirty()
+
+    def render_perf_overlay(self):
+        perf = self.game.perf
+        lines = []
+        for name, label in [("frame", "Frame"), ("render", " render"), ("turn", "Turn"), ("fov", " fov"),
+                            ("knowledge", " knowledge"), ("actors", " actors"), ("interactions", " interact")]:
+            stats = perf.get(name)
+            if stats:
+                lines.append(f"{label:<11}{stats.percentile(50) * 1000:7.1f}{stats.percentile(95) * 1000:8.1f}")
+        lines.append(f"LLM {perf.llm_in_flight} busy {perf.llm_calls} calls {perf.llm_errors} err")
+        if len(perf.llm_latency):
+            lines.append(f"{' latency':<11}{perf.llm_latency.percentile(50) * 1000:7.0f}{perf.llm_latency.percentile(95) * 1000:8.0f}")
+        lines.append(f"Entities {len(self.world.entities)}")
+        game_map = self.world.game_map
+        for label, hits, misses in [("FOV cache", self.world.fov_cache.hits, self.world.fov_cache.misses),
+                                    ("Cost cache", game_map.cost_cache_hits, game_map.cost_cache_misses),
+                                    ("Region path", self.world.pathfinder.hits, self.world.pathfinder.misses)]:
+            total = hits + misses
+            lines.append(f"{label:<12}{hits / total * 100 if total else 0:5.1f}% of {total}")
+
+        # Top-right corner of the game area, inside the border
+        width = 30
+        height = len(lines) + 2
+        x = self.width - width - 1
+        self.root_console.draw_frame(x, 1, width, height, "Perf (ms p50/p95)", fg=(255, 255, 0), bg=(0, 0, 0))
+        for i, line in enumerate(lines):
+            self.root_console.print(x + 1, 2 + i, line[:width - 2], fg=(255, 255, 255), bg=(0, 0, 0))
 
     def render_map(self):
-        for y in range(self.game_area_height - 2):
-            for x in range(self.width - 2):
-                map_x = x + self.camera_x
-                map_y = y + self.camera_y
-                if 0 <= map_x < self.world.width and 0 <= map_y < self.world.height:
-                    tile = self.world.game_map.tiles[map_y][map_x]
-                    visible = self.world.game_map.is_in_fov(map_x, map_y)
-                    if visible:
-                        tile.explored = True
-                        if tile.tile_type == TileType.WALL:
-                            color = (130, 110, 50)
-                        elif tile.tile_type == TileType.FLOOR:
-                            color = (200, 180, 50)
-                        elif tile.tile_type == TileType.DOOR:
-                            color = (0, 255, 255) if tile.is_open else (130, 110, 50)
-                    elif tile.explored:
-                        if tile.tile_type == TileType.WALL:
-                            color = (0, 0, 100)
-                        elif tile.tile_type == TileType.FLOOR:
-                            color = (50, 50, 150)
-                        elif tile.tile_type == TileType.DOOR:
-                            color = (0, 100, 100) if tile.is_open else (0, 0, 100)
-                    else:
-                        color = (0, 0, 0)  # Unexplored and not visible
-                    
-                    if tile.tile_type == TileType.DOOR:
-                        char = '/' if tile.is_open else '+'
-                    else:
-                        char = tile.tile_type.value
-                    
-                    if visible or tile.explored:
-                        self.game_console.print(x + 1, y + 1, char, color)
-                    else:
-                        self.game_console.print(x + 1, y + 1, ' ', (0, 0, 0))
+        game_map = self.world.game_map
+        visible = game_map.fov_map.fov
+
+        # Intersect the viewport with the map; cells outside it stay blank
+        view_width = self.width - 2
+        view_height = self.game_area_height - 2
+        x0 = max(self.camera_x, 0)
+        y0 = max(self.camera_y, 0)
+        x1 = min(self.camera_x + view_width, self.world.width)
+        y1 = min(self.camera_y + view_height, self.world.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        tile_index = game_map.tile_index[y0:y1, x0:x1]
+        visible = visible[y0:y1, x0:x1]
+        explored = game_map.explored[y0:y1, x0:x1]
+
+        console_x = x0 - self.camera_x + 1
+        console_y = y0 - self.camera_y + 1
+        cells = self.game_console.rgb[console_y:console_y + (y1 - y0), console_x:console_x + (x1 - x0)]
+        cells["ch"] = np.where(explored, TILE_GLYPHS[tile_index], ord(' '))
+        cells["fg"] = np.select(
+            [visible[..., None], explored[..., None]],
+            [VISIBLE_COLORS[tile_index], EXPLORED_COLORS[tile_index]],
+            default=0
+        )
 
     def render_entities(self):
         for entity in self.world.entities:
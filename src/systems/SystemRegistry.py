@@ -0,0 +1,47 @@
+import logging
+import threading
+import time
+from utils.startup_profile import startup_profile
+
+# Builds each system once, on first access, and publishes it as an attribute of
+# the game so later lookups are plain attribute reads.
+class SystemRegistry:
+    def __init__(self, game):
+        self.game = game
+        self.logger = logging.getLogger(__name__)
+        self.factories = {}
+        self.instances = {}
+        self.init_times = {}  # name -> seconds spent in the factory
+        self.lock = threading.Lock()  # Guards locks; held only long enough to look one up
+        self.locks = {}  # name -> lock held while that system is built
+
+    def __contains__(self, name):
+        return name in self.factories
+
+    def register(self, name, factory):
+        if name not in self.factories:
+            self.factories[name] = factory
+
+    def lock_for(self, name):
+        # One lock per system: a setup stage building a slow system on a worker thread
+        # doesn't hold up lookups of any other system on the main thread
+        with self.lock:
+            return self.locks.setdefault(name, threading.RLock())
+
+    def get(self, name):
+        with self.lock_for(name):
+            if name not in self.instances:
+                start = time.perf_counter()
+                self.instances[name] = self.factories[name](self.game)
+                self.init_times[name] = time.perf_counter() - start
+                startup_profile.record(f"system: {name}", self.init_times[name])
+                self.game.__dict__[name] = self.instances[name]
+                self.logger.debug(f"Built {name} in {self.init_times[name] * 1000:.1f}ms")
+            return self.instances[name]
+
+    def reset(self, *names):
+        # Forget the given systems so they are rebuilt against the current state on next access
+        for name in names:
+            with self.lock_for(name):
+                self.instances.pop(name, None)
+                self.game.__dict__.pop(name, None)
@@ -0,0 +1,142 @@
+import time
+import numpy as np
+from ecs.ecs import System
+from systems.MessageSystem import MessageChannel
+from systems.RenderSystem import RenderRegion
+from components.FighterComponent import FighterComponent
+from utils.dijkstra_map import DijkstraMap
+from utils.mapgen import TILE_INDEX_WALL, TILE_INDEX_DOOR_CLOSED
+
+TRAVEL_FRAME_TIME = 0.05  # Seconds between redraws while travelling; steps in between are not drawn
+MAX_TRAVEL_STEPS = 500
+
+# Multi-step movement: travel to a clicked tile, or auto-explore towards the nearest
+# unexplored edge. One Dijkstra map over the known part of the map plans the whole
+# walk; each step is still a full game turn, but redraws are throttled and the walk
+# stops as soon as anything needs the player's attention.
+class TravelSystem(System):
+    def __init__(self, game):
+        self.game = game
+        self.logger = game.logger
+
+    def travel_to(self, x, y):
+        game_map = self.game.world.game_map
+        if not (0 <= x < game_map.width and 0 <= y < game_map.height) or not self.known_cells()[y, x]:
+            self.game.show_message("You don't know a way there.", MessageChannel.SYSTEM, (255, 255, 0))
+            return
+        if not self.can_start():
+            return
+        dijkstra_map = self.plan([(x, y)])
+        if not self.is_reachable(dijkstra_map):
+            self.game.show_message("You don't know a way there.", MessageChannel.SYSTEM, (255, 255, 0))
+            return
+        self.walk(dijkstra_map, MAX_TRAVEL_STEPS)
+
+    def explore(self):
+        if not self.can_start():
+            return
+        self.game.render_system.update_fov()
+        steps = 0
+        # The frontier moves as the view reveals more, so the map is replanned at each edge reached
+        while steps < MAX_TRAVEL_STEPS:
+            goals = self.frontier()
+            dijkstra_map = self.plan(goals) if goals else None
+            if dijkstra_map is None or not self.is_reachable(dijkstra_map):
+                self.game.show_message("There is nothing left to explore that you can reach.", MessageChannel.SYSTEM, (255, 255, 0))
+                return
+            taken, interrupted = self.walk(dijkstra_map, MAX_TRAVEL_STEPS - steps)
+            steps += taken
+            if interrupted or not taken:
+                return
+
+    def can_start(self):
+        threat = self.game.loop_system.find_threat()
+        if threat:
+            self.game.show_message(f"Not with {threat.name} in view.", MessageChannel.SYSTEM, (255, 255, 0))
+            return False
+        return True
+
+    def known_cells(self):
+        # Closed doors count as passable; the walk opens them on the way
+        game_map = self.game.world.game_map
+        return game_map.explored & (game_map.tile_index != TILE_INDEX_WALL)
+
+    def frontier(self):
+        # Known walkable cells next to unexplored ones, other than the one the player stands on:
+        # standing there revealed nothing more, and as a goal it would end the walk before a step
+        world = self.game.world
+        explored = world.game_map.explored
+        unexplored = ~explored
+        edge = np.zeros_like(unexplored)
+        edge[1:, :] |= unexplored[:-1, :]
+        edge[:-1, :] |= unexplored[1:, :]
+        edge[:, 1:] |= unexplored[:, :-1]
+        edge[:, :-1] |= unexplored[:, 1:]
+        edge[int(world.player.y), int(world.player.x)] = False
+        ys, xs = np.nonzero(self.known_cells() & edge)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def plan(self, goals):
+        # Paths only cross cells the player has seen
+        game_map = self.game.world.game_map
+        known = self.known_cells().tolist()
+        dijkstra_map = DijkstraMap(game_map.width, game_map.height)
+        dijkstra_map.compute(goals, lambda x, y: known[y][x])
+        return dijkstra_map
+
+    def is_reachable(self, dijkstra_map):
+        player = self.game.world.player
+        return dijkstra_map.map[int(player.y)][int(player.x)] != float('inf')
+
+    def walk(self, dijkstra_map, max_steps):
+        # Returns (steps taken, whether the walk was interrupted before reaching a goal)
+        game = self.game
+        world = game.world
+        player = world.player
+        fighter = player.get_component(FighterComponent)
+        hp = fighter.hp
+        last_frame = time.perf_counter()
+        interruption = None
+        steps = 0
+        while steps < max_steps:
+            x, y = int(player.x), int(player.y)
+            if dijkstra_map.map[y][x] == 0:
+                break
+            direction = dijkstra_map.get_direction(x, y)
+            if direction is None:
+                interruption = "The way is blocked."
+                break
+            blocker = world.get_entity_at(x + direction[0], y + direction[1])
+            if blocker:
+                interruption = f"{blocker.name} is in the way."
+                break
+            next_x, next_y = x + direction[0], y + direction[1]
+            if world.game_map.tile_index[next_y, next_x] == TILE_INDEX_DOOR_CLOSED:
+                world.toggle_door(next_x, next_y)
+                game.fov_recompute = True
+                game.message_system.add_message("You open the door.", MessageChannel.SYSTEM)
+            else:
+                game.move_player(*direction)
+            game.render_system.update_fov()
+            game.loop_system.process_turn()
+            steps += 1
+            if game.game_over or fighter.hp < hp:
+                interruption = "You are attacked!"
+                break
+            threat = game.loop_system.find_threat()
+            if threat:
+                interruption = f"You see {threat.name}."
+                break
+            if game.has_input():
+                interruption = "You stop."
+                break
+            if time.perf_counter() - last_frame >= TRAVEL_FRAME_TIME:
+                game.render_system.mark_dirty(RenderRegion.MAP, RenderRegion.ENTITIES)
+                game.render_system.flush()
+                last_frame = time.perf_counter()
+        else:
+            interruption = "You stop to get your bearings."
+        if interruption:
+            game.show_message(interruption, MessageChannel.SYSTEM, (255, 255, 0))
+        game.render_system.mark_dirty(RenderRegion.MAP, RenderRegion.ENTITIES)
+        return steps, interruption is not None
@@ -0,0 +1,94 @@
+import numpy as np
+from ecs.ecs import System
+from components.ActorComponent import ActorComponent
+
+class VisibilitySystem(System):
+    def __init__(self, world):
+        self.world = world
+        self.entities = []
+        self.index = {}
+        self.visible = np.zeros((0, 0), dtype=bool)  # visible[i, j]: entity i can see entity j
+        self.distance = np.zeros((0, 0))
+        self.xs = np.zeros(0, dtype=np.intp)
+        self.ys = np.zeros(0, dtype=np.intp)
+        self.live = np.zeros(0, dtype=bool)  # False for entities removed since the last update
+
+    def update(self, entities):
+        self.entities = [entity for entity in entities if entity.has_component(ActorComponent)]
+        self.index = {entity: i for i, entity in enumerate(self.entities)}
+        count = len(self.entities)
+        self.xs = xs = np.array([int(entity.x) for entity in self.entities], dtype=np.intp)
+        self.ys = ys = np.array([int(entity.y) for entity in self.entities], dtype=np.intp)
+        self.live = np.ones(count, dtype=bool)
+
+        # One gather per viewer over everyone's position instead of a lookup per pair
+        self.visible = np.zeros((count, count), dtype=bool)
+        for i, entity in enumerate(self.entities):
+            self.visible[i] = self.world.fov_cache.get(entity)[ys, xs]
+        np.fill_diagonal(self.visible, False)
+
+        self.distance = np.hypot(xs[None, :] - xs[:, None], ys[None, :] - ys[:, None])
+
+    def discard(self, entity):
+        # Removed entities stay indexed until the next update but no longer see or get seen
+        i = self.index.pop(entity, None)
+        if i is not None:
+            self.visible[i, :] = False
+            self.visible[:, i] = False
+            self.live[i] = False
+
+    def moved(self, entity):
+        # Actors move after the turn's update; refreshing the mover's row and column keeps
+        # witnesses, targeting and interaction pairs on current positions for the rest of the turn
+        i = self.index.get(entity)
+        if i is None:
+            return
+        x, y = int(entity.x), int(entity.y)
+        self.xs[i], self.ys[i] = x, y
+        fov_cache = self.world.fov_cache
+        self.visible[i] = fov_cache.get(entity)[self.ys, self.xs] & self.live
+        self.visible[:, i] = [bool(live and fov_cache.get(viewer)[y, x]) for viewer, live in zip(self.entities, self.live)]
+        self.visible[i, i] = False
+        self.distance[i] = self.distance[:, i] = np.hypot(self.xs - x, self.ys - y)
+
+    def can_see(self, viewer, target):
+        i = self.index.get(viewer)
+        j = self.index.get(target)
+        if i is None or j is None:
+            return self.world.fov_cache.can_see(viewer, target.x, target.y)
+        return bool(self.visible[i, j])
+
+    def visible_to(self, viewer):
+        i = self.index.get(viewer)
+        if i is None:
+            return []
+        return [self.entities[j] for j in np.flatnonzero(self.visible[i])]
+
+    def witnesses_of(self, *entities):
+        columns = [self.index[entity] for entity in entities if entity in self.index]
+        if not columns:
+            return []
+        seen_any = self.visible[:, columns].any(axis=1)
+        return [self.entities[i] for i in np.flatnonzero(seen_any)]
+
+    def within(self, viewer, radius):
+        i = self.index.get(viewer)
+        if i is None:
+            return []
+        close = (self.distance[i] <= radius) & (np.arange(len(self.entities)) != i)
+        return [self.entities[j] for j in np.flatnonzero(close)]
+
+    def get_distance(self, entity1, entity2):
+        i = self.index.get(entity1)
+        j = self.index.get(entity2)
+        if i is None or j is None:
+            return ((entity1.x - entity2.x) ** 2 + (entity1.y - entity2.y) ** 2) ** 0.5
+        return float(self.distance[i, j])
+
+    def get_pairs(self, entity_type=None):
+        if entity_type is None:
+            mask = self.visible
+        else:
+            is_type = np.array([isinstance(entity, entity_type) for entity in self.entities], dtype=bool)
+            mask = self.visible & is_type[:, None] & is_type[None, :]
+        return [(self.entities[i], self.entities[j]) for i, j in np.argwhere(mask).tolist()]
@@ -1,18 +1,18 @@
 import logging
 import json
-import time
 import random
 import traceback
 from systems.MessageSystem import MessageChannel
 from components.ActorComponent import ActorComponent, ActorState
-from systems.dialogue.ConversationSummarizer import ConversationSummarizer
+from utils.job_queue import PRIORITY_SUMMARY
 
 class ConversationManager:
     def __init__(self, game, anthropic_client):
         self.game = game
         self.logger = logging.getLogger(__name__)
         self.anthropic_client = anthropic_client
-        self.conversation_summarizer = ConversationSummarizer(game, anthropic_client)
+        self.conversation_summarizer = game.conversation_summarizer
+        self.digest = None  # Pairs whose conversations are batched while the player rests
 
     def start_actor_dialogue(self, actor1, actor2):
         if self.game.disable_dialogue_system:
@@ -25,7 +25,7 @@ class ConversationManager:
             if actor1_component.state == ActorState.AGGRESSIVE or actor2_component.state == ActorState.AGGRESSIVE:
                 return  # Skip dialogue if either actor is in combat
             
-            current_time = time.time()
+            current_time = self.game.world.scheduler.time  # Game time, so replays start the same conversations
             if current_time - actor1_component.last_conversation_time < actor1_component.conversation_cooldown or \
                current_time - actor2_component.last_conversation_time < actor2_component.conversation_cooldown:
                 return  # Skip if either actor is on cooldown
@@ -35,6 +35,11 @@ class ConversationManager:
                 actor1_component.last_conversation_time = current_time
                 actor2_component.last_conversation_time = current_time
 
+                if self.digest is not None:
+                    if (actor1, actor2) not in self.digest and (actor2, actor1) not in self.digest:
+                        self.digest.append((actor1, actor2))
+                    return
+
                 player_can_see = self.game.world.game_map.is_in_fov(int(self.game.world.player.x), int(self.game.world.player.y)) and \
                                  (self.game.world.game_map.is_in_fov(int(actor1.x), int(actor1.y)) or 
                                   self.game.world.game_map.is_in_fov(int(actor2.x), int(actor2.y)))
@@ -47,20 +52,10 @@ class ConversationManager:
                     if choice:
                         self.game.show_message(f"{actor1.name} and {actor2.name} have started a conversation.", MessageChannel.DIALOGUE, sender=actor1)
                     else:
-                        summary, conversation_history = self.conversation_summarizer.summarize_conversation(actor1, actor2)
-                        if summary:  # Check if summary is not None
-                            self.game.dialogue_system.add_conversation_memory(actor1, actor2, summary)
-                            self.game.dialogue_system.relationship_manager.adjust_relationship_from_summary(actor1, actor2, conversation_history, summary)
-                        else:
-                            self.logger.error(f"Failed to generate summary for conversation between {actor1.name} and {actor2.name}")
+                        self.conversation_summarizer.summarize_conversation(actor1, actor2, lambda summary, conversation_history: self.record_summary(actor1, actor2, summary, conversation_history))
                         return
                 else:
-                    summary, conversation_history = self.conversation_summarizer.summarize_conversation(actor1, actor2)
-                    if summary:  # Check if summary is not None
-                        self.game.dialogue_system.add_conversation_memory(actor1, actor2, summary)
-                        self.game.dialogue_system.relationship_manager.adjust_relationship_from_summary(actor1, actor2, conversation_history, summary)
-                    else:
-                        self.logger.error(f"Failed to generate summary for conversation between {actor1.name} and {actor2.name}")
+                    self.conversation_summarizer.summarize_conversation(actor1, actor2, lambda summary, conversation_history: self.record_summary(actor1, actor2, summary, conversation_history))
                     return
 
                 relationship_info = actor1.knowledge.get_relationship_story(actor2.name) or ""
@@ -94,31 +89,13 @@ Important: Speak only in dialogue. Do not describe actions, appearances, use ast
                     "temperature": 0.93
                 }
                 
-                response = self.anthropic_client.messages.create(**request_body)
-                
-                self.logger.info(f"API Response for {actor1.name}:")
-                self.logger.info(f"Response: {json.dumps(response.model_dump(), indent=2)}")
-                
-                actor_response = response.content[0].text if response.content else ""
-
-                # Start a new conversation
-                conversation = [
-                    {"role": "user", "content": actor_prompt},
-                    {"role": "assistant", "content": actor_response}
-                ]
-                
-                if player_can_see:
-                    self.game.dialogue_system.show_dialogue(actor1, actor_response)
-
-                # Store the conversation for future reference
-                actor1_component.current_conversation = conversation
-                actor2_component.current_conversation = conversation
-                actor1_component.conversation_partner = actor2
-                actor2_component.conversation_partner = actor1
-                actor1_component.conversation_turns = 1
-                actor2_component.conversation_turns = 0
-
-                self.logger.info(f"Conversation started. Turn counts: {actor1.name} = 1, {actor2.name} = 0")
+                # The game keeps running while the opening line is generated
+                self.set_awaiting_reply(actor1, actor2, True)
+                self.game.start_task(
+                    self.anthropic_client.messages.create(**request_body),
+                    lambda response: self.begin_conversation(actor1, actor2, actor_prompt, response),
+                    lambda error: self.reply_failed(actor1, actor2, error)
+                )
 
         except Exception as e:
             self.logger.error(f"Error in actor dialogue: {str(e)}")
@@ -150,9 +127,7 @@ Important: Speak only in dialogue. Do not describe actions, appearances, use ast
         try:
             actor1_component = actor1.get_component(ActorComponent)
             actor2_component = actor2.get_component(ActorComponent)
-            player_can_see = self.game.world.game_map.is_in_fov(int(self.game.world.player.x), int(self.game.world.player.y)) and \
-                             (self.game.world.game_map.is_in_fov(int(actor1.x), int(actor1.y)) or 
-                              self.game.world.game_map.is_in_fov(int(actor2.x), int(actor2.y)))
+            player_can_see = self.can_player_see(actor1, actor2)
 
             conversation = actor1_component.current_conversation
             self.logger.info(f"Continuing actor dialogue between {actor1.name} and {actor2.name}")
@@ -193,33 +168,12 @@ Important: Speak only in dialogue. Do not describe actions, appearances, use ast
                 "temperature": 0.93
             }
             
-            response = self.anthropic_client.messages.create(**request_body)
-            
-            self.logger.info(f"API Response for {current_actor.name}:")
-            self.logger.info(f"Response: {json.dumps(response.model_dump(), indent=2)}")
-            
-            actor_response = response.content[0].text if response.content else ""
-            
-            if actor_response.strip():  # Only add non-empty responses
-                conversation.append({"role": "assistant", "content": actor_response})
-                
-                if player_can_see:
-                    self.game.dialogue_system.show_dialogue(current_actor, actor_response)
-
-            # Update the conversation for both actors
-            actor1_component.current_conversation = conversation
-            actor2_component.current_conversation = conversation
-
-            # Increment the conversation turn counter for the current actor
-            current_actor.get_component(ActorComponent).conversation_turns += 1
-
-            # Check if the conversation should end
-            if actor1_component.conversation_turns + actor2_component.conversation_turns >= 6:
-                conversation_history = actor1_component.current_conversation
-                summary = self.end_conversation(actor1, actor2, conversation_history)
-                if player_can_see:
-                    self.game.show_message(f"Conversation summary: {summary}", MessageChannel.DIALOGUE)
-                return
+            self.set_awaiting_reply(actor1, actor2, True)
+            self.game.start_task(
+                self.anthropic_client.messages.create(**request_body),
+                lambda response: self.apply_reply(actor1, actor2, current_actor, conversation, response),
+                lambda error: self.reply_failed(actor1, actor2, error)
+            )
 
         except Exception as e:
             self.logger.error(f"Error in continuing actor dialogue: {str(e)}")
@@ -227,13 +181,124 @@ Important: Speak only in dialogue. Do not describe actions, appearances, use ast
             if player_can_see:
                 self.game.show_message(f"An error occurred during actor dialogue", MessageChannel.SYSTEM, (255, 0, 0))
 
+    def begin_conversation(self, actor1, actor2, actor_prompt, response):
+        self.set_awaiting_reply(actor1, actor2, False)
+        actor1_component = actor1.get_component(ActorComponent)
+        actor2_component = actor2.get_component(ActorComponent)
+
+        self.logger.info(f"API Response for {actor1.name}:")
+        self.logger.info(f"Response: {json.dumps(response.model_dump(), indent=2)}")
+        
+        actor_response = response.content[0].text if response.content else ""
+
+        # Start a new conversation
+        conversation = [
+            {"role": "user", "content": actor_prompt},
+            {"role": "assistant", "content": actor_response}
+        ]
+        
+        if self.can_player_see(actor1, actor2):
+            self.game.dialogue_system.show_dialogue(actor1, actor_response)
+
+        # Store the conversation for future reference
+        actor1_component.current_conversation = conversation
+        actor2_component.current_conversation = conversation
+        actor1_component.conversation_partner = actor2
+        actor2_component.conversation_partner = actor1
+        actor1_component.conversation_turns = 1
+        actor2_component.conversation_turns = 0
+
+        self.logger.info(f"Conversation started. Turn counts: {actor1.name} = 1, {actor2.name} = 0")
+
+    def apply_reply(self, actor1, actor2, current_actor, conversation, response):
+        self.set_awaiting_reply(actor1, actor2, False)
+        actor1_component = actor1.get_component(ActorComponent)
+        actor2_component = actor2.get_component(ActorComponent)
+        player_can_see = self.can_player_see(actor1, actor2)
+
+        self.logger.info(f"API Response for {current_actor.name}:")
+        self.logger.info(f"Response: {json.dumps(response.model_dump(), indent=2)}")
+        
+        actor_response = response.content[0].text if response.content else ""
+        
+        if actor_response.strip():  # Only add non-empty responses
+            conversation.append({"role": "assistant", "content": actor_response})
+            
+            if player_can_see:
+                self.game.dialogue_system.show_dialogue(current_actor, actor_response)
+
+        # Update the conversation for both actors
+        actor1_component.current_conversation = conversation
+        actor2_component.current_conversation = conversation
+
+        # Increment the conversation turn counter for the current actor
+        current_actor.get_component(ActorComponent).conversation_turns += 1
+
+        # Check if the conversation should end
+        if actor1_component.conversation_turns + actor2_component.conversation_turns >= 6:
+            self.end_conversation(actor1, actor2, conversation)
+
+    def reply_failed(self, actor1, actor2, error):
+        self.set_awaiting_reply(actor1, actor2, False)
+        self.logger.error(f"Error in actor dialogue: {str(error)}")
+        if self.can_player_see(actor1, actor2):
+            self.game.show_message(f"An error occurred during actor dialogue", MessageChannel.SYSTEM, (255, 0, 0))
+
+    def record_summary(self, actor1, actor2, summary, conversation_history):
+        if summary:  # Check if summary is not None
+            # Memories and sentiment scoring are not urgent; they run within a later turn's budget
+            self.game.world.jobs.add(lambda: self.apply_summary(actor1, actor2, conversation_history, summary), PRIORITY_SUMMARY)
+        else:
+            self.logger.error(f"Failed to generate summary for conversation between {actor1.name} and {actor2.name}")
+
+    def begin_digest(self):
+        # Conversations that start from here on are only collected, not run
+        self.digest = []
+
+    def finish_digest(self):
+        # Summarizes everything collected since begin_digest() in a single request
+        pairs, self.digest = self.digest, None
+        if pairs:
+            self.conversation_summarizer.summarize_conversations(pairs, lambda summaries: self.record_digest(pairs, summaries))
+
+    def record_digest(self, pairs, summaries):
+        for (actor1, actor2), summary in zip(pairs, summaries):
+            if not summary:
+                continue
+            self.game.show_message(f"{actor1.name} and {actor2.name}: {summary}", MessageChannel.DIALOGUE, sender=actor1)
+            conversation_history = [
+                {"role": "system", "content": "A simulated conversation occurred."},
+                {"role": "assistant", "content": summary}
+            ]
+            self.record_summary(actor1, actor2, summary, conversation_history)
+
+    def set_awaiting_reply(self, actor1, actor2, awaiting):
+        actor1.get_component(ActorComponent).awaiting_reply = awaiting
+        actor2.get_component(ActorComponent).awaiting_reply = awaiting
+
+    def can_player_see(self, actor1, actor2):
+        game_map = self.game.world.game_map
+        player = self.game.world.player
+        return game_map.is_in_fov(int(player.x), int(player.y)) and \
+               (game_map.is_in_fov(int(actor1.x), int(actor1.y)) or game_map.is_in_fov(int(actor2.x), int(actor2.y)))
+
     def end_conversation(self, actor1, actor2, conversation_history):
+        # The actors are free right away; memories and relationships update when the summary arrives
         self.end_actor_conversation(actor1, actor2)
-        summary = self.conversation_summarizer.generate_conversation_summary(actor1, actor2, conversation_history)
+        self.conversation_summarizer.request_conversation_summary(
+            actor1, actor2, conversation_history,
+            lambda summary: self.record_conversation_end(actor1, actor2, conversation_history, summary)
+        )
+
+    def apply_summary(self, actor1, actor2, conversation_history, summary):
         self.game.dialogue_system.add_conversation_memory(actor1, actor2, summary)
         self.game.dialogue_system.relationship_manager.adjust_relationship_from_summary(actor1, actor2, conversation_history, summary)
+
+    def record_conversation_end(self, actor1, actor2, conversation_history, summary):
+        self.game.world.jobs.add(lambda: self.apply_summary(actor1, actor2, conversation_history, summary), PRIORITY_SUMMARY)
         self.logger.info(f"Conversation ended between {actor1.name} and {actor2.name}. Summary: {summary}")
-        return summary
+        if self.can_player_see(actor1, actor2):
+            self.game.show_message(f"Conversation summary: {summary}", MessageChannel.DIALOGUE)
 
     def end_actor_conversation(self, actor1, actor2):
         actor1_component = actor1.get_component(ActorComponent)
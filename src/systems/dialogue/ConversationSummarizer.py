@@ -10,7 +10,8 @@ class ConversationSummarizer:
         self.anthropic_client = anthropic_client
         self.logger = logging.getLogger(__name__)
 
-    def summarize_conversation(self, actor1, actor2):
+    def summarize_conversation(self, actor1, actor2, on_done):
+        # The conversation happens off-screen; on_done(summary, conversation_history) runs once the model replies
         try:
             actor1_component = actor1.get_component(ActorComponent)
             actor2_component = actor2.get_component(ActorComponent)
@@ -31,43 +32,95 @@ class ConversationSummarizer:
                 "temperature": 0.97
             }
             
-            response = self.anthropic_client.messages.create(**request_body)
-            summary = response.content[0].text if response.content else None
-
-            if summary:
-                self.game.show_message(summary, MessageChannel.DIALOGUE)
-                conversation_history = [
-                    {"role": "system", "content": "A simulated conversation occurred."},
-                    {"role": "assistant", "content": summary}
-                ]
-                return summary, conversation_history
-            else:
-                self.logger.error("Failed to generate conversation summary: Empty response")
-                return None, None
+            self.game.start_task(
+                self.anthropic_client.messages.create(**request_body),
+                lambda response: on_done(*self.handle_summary(response)),
+                lambda error: self.logger.error(f"Error in summarizing conversation: {str(error)}")
+            )
 
         except Exception as e:
             self.logger.error(f"Error in summarizing conversation: {str(e)}")
             self.logger.debug(traceback.format_exc())
-            return None, None
 
-    def generate_conversation_summary(self, actor1, actor2, conversation_history):
+    def summarize_conversations(self, pairs, on_done):
+        # Batched variant for conversations held while the player rested: one request for all
+        # pairs; on_done(summaries) gets one summary per pair, None where the reply fell short
         try:
-            self.logger.info(f"Generating summary for conversation between {actor1.name} and {actor2.name}")
-            system_prompt = f"""Summarize the conversation between {actor1.name} and {actor2.name} in a dungeon setting.
-            Provide a single sentence summary of their conversation, focusing on the main topic or outcome.
-            Do not include any dialogue or character actions in your summary."""
+            conversations = "\n".join(
+                f"{i}. {actor1.name} and {actor2.name}. Their relationship: {actor1.knowledge.get_relationship_story(actor2.name) or 'none'}"
+                for i, (actor1, actor2) in enumerate(pairs, 1))
+            system_prompt = f"""Summarize brief, unique conversations between pairs of characters in a dungeon setting.
+            Conversations:
+            {conversations}
+            For each conversation give a single sentence summary on its own line, starting with the conversation's number and a period.
+            Focus each summary on a specific topic or outcome."""
 
             request_body = {
                 "model": "claude-3-5-sonnet-20240620",
-                "max_tokens": 100,
-                "messages": conversation_history + [{"role": "user", "content": "Summarize the conversation."}],
+                "max_tokens": 60 * len(pairs),
+                "messages": [{"role": "user", "content": "Summarize the conversations."}],
                 "system": system_prompt,
-                "temperature": 0.93
+                "temperature": 0.97
             }
-            
-            self.logger.debug(f"Conversation summary API request: {json.dumps(request_body, indent=2)}")
-            
-            response = self.anthropic_client.messages.create(**request_body)
+
+            self.logger.info(f"Summarizing {len(pairs)} conversations in one request")
+            self.game.start_task(
+                self.anthropic_client.messages.create(**request_body),
+                lambda response: on_done(self.parse_summaries(response, len(pairs))),
+                lambda error: self.logger.error(f"Error in summarizing conversations: {str(error)}")
+            )
+
+        except Exception as e:
+            self.logger.error(f"Error in summarizing conversations: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+
+    def parse_summaries(self, response, count):
+        text = response.content[0].text if response.content else ""
+        summaries = [None] * count
+        for line in text.splitlines():
+            number, _, summary = line.strip().partition(".")
+            if number.isdigit() and 1 <= int(number) <= count and summary.strip():
+                summaries[int(number) - 1] = summary.strip()
+        if count == 1 and summaries[0] is None and text.strip():
+            summaries[0] = text.strip()
+        return summaries
+
+    def handle_summary(self, response):
+        summary = response.content[0].text if response.content else None
+
+        if summary:
+            self.game.show_message(summary, MessageChannel.DIALOGUE)
+            conversation_history = [
+                {"role": "system", "content": "A simulated conversation occurred."},
+                {"role": "assistant", "content": summary}
+            ]
+            return summary, conversation_history
+        else:
+            self.logger.error("Failed to generate conversation summary: Empty response")
+            return None, None
+
+    def conversation_summary_request(self, actor1, actor2, conversation_history):
+        system_prompt = f"""Summarize the conversation between {actor1.name} and {actor2.name} in a dungeon setting.
+            Provide a single sentence summary of their conversation, focusing on the main topic or outcome.
+            Do not include any dialogue or character actions in your summary."""
+
+        request_body = {
+            "model": "claude-3-5-sonnet-20240620",
+            "max_tokens": 100,
+            "messages": conversation_history + [{"role": "user", "content": "Summarize the conversation."}],
+            "system": system_prompt,
+            "temperature": 0.93
+        }
+        
+        self.logger.debug(f"Conversation summary API request: {json.dumps(request_body, indent=2)}")
+        return request_body
+
+    def generate_conversation_summary(self, actor1, actor2, conversation_history):
+        # Waits for the reply while the game keeps rendering; for flows that need the summary right away
+        try:
+            self.logger.info(f"Generating summary for conversation between {actor1.name} and {actor2.name}")
+            request_body = self.conversation_summary_request(actor1, actor2, conversation_history)
+            response = self.game.await_task(self.anthropic_client.messages.create(**request_body))
             summary = response.content[0].text if response.content else ""
             self.logger.info(f"Generated summary: {summary}")
             return summary
@@ -75,4 +128,19 @@ class ConversationSummarizer:
         except Exception as e:
             self.logger.error(f"Error in generating conversation summary: {str(e)}")
             self.logger.debug(traceback.format_exc())
-            return "The conversation ended without a clear summary."
\ No newline at end of file
+            return "The conversation ended without a clear summary."
+
+    def request_conversation_summary(self, actor1, actor2, conversation_history, on_done):
+        # Background variant: on_done(summary) runs on the main thread once the model replies
+        def handle_response(response):
+            summary = response.content[0].text if response.content else ""
+            self.logger.info(f"Generated summary: {summary}")
+            on_done(summary)
+
+        def handle_error(error):
+            self.logger.error(f"Error in generating conversation summary: {str(error)}")
+            on_done("The conversation ended without a clear summary.")
+
+        self.logger.info(f"Generating summary for conversation between {actor1.name} and {actor2.name}")
+        request_body = self.conversation_summary_request(actor1, actor2, conversation_history)
+        self.game.start_task(self.anthropic_client.messages.create(**request_body), handle_response, handle_error)
@@ -1,17 +1,15 @@
 import logging
-import tcod
 import json
-import textwrap
 import traceback
-from systems.MessageSystem import MessageChannel, Message
+from systems.MessageSystem import MessageChannel
 from components.ActorComponent import ActorComponent
 from tcod.event import KeySym
 from data.character_cards import character_cards, get_character_card
 from .ConversationManager import ConversationManager
 from .SentimentAnalyzer import SentimentAnalyzer
-from .ConversationSummarizer import ConversationSummarizer
 from .RelationshipManager import RelationshipManager
 from entities.Actor import Actor
+from utils.line_editor import LineEditor
 
 class DialogueSystem:
     def __init__(self, game):
@@ -19,8 +17,8 @@ class DialogueSystem:
         self.logger = logging.getLogger(__name__)
         self.anthropic_client = game.anthropic_client
         self.conversation_manager = ConversationManager(game, self.anthropic_client)
-        self.sentiment_analyzer = SentimentAnalyzer()
-        self.conversation_summarizer = ConversationSummarizer(game, self.anthropic_client)
+        self.sentiment_analyzer = SentimentAnalyzer(game.vader)
+        self.conversation_summarizer = game.conversation_summarizer
         self.relationship_manager = RelationshipManager(game)
 
     def start_dialogue(self, actor):
@@ -118,7 +116,8 @@ class DialogueSystem:
                         "stop_sequences": ["\n\nHuman:", "\n\nSystem:", "\n\nAssistant:"]
                     }
                     
-                    response = self.anthropic_client.messages.create(**request_body)
+                    # The window keeps rendering while the reply is on its way
+                    response = self.game.await_task(self.anthropic_client.messages.create(**request_body))
                     
                     self.logger.info(f"API Response for {actor.name}:")
                     self.logger.info(f"Response: {json.dumps(response.model_dump(), indent=2)}")
@@ -191,7 +190,7 @@ class DialogueSystem:
         self.game.show_message("Press Y to listen or N to ignore.", MessageChannel.SYSTEM, (255, 255, 0))
         
         while True:
-            for event in tcod.event.wait():
+            for event in self.game.wait_for_events():
                 if event.type == "QUIT":
                     raise SystemExit()
                 elif event.type == "KEYDOWN":
@@ -199,60 +198,39 @@ class DialogueSystem:
                         return True
                     elif event.sym == KeySym.n:
                         return False
-            
-            self.game.render_system.render()
 
     def get_user_input(self, prompt):
-        user_input = ""
         max_input_length = self.game.width * 3  # Allow for multiple lines
-        input_lines = []
-        cursor_pos = 0
-        ignore_next_i = True  # Add this flag
-
-        while True:
-            # Wrap the current input
-            wrapped_lines = textwrap.wrap(prompt + user_input, width=self.game.width - 2)
-            
-            # Update the message log with the wrapped input
-            self.game.message_system.message_log = self.game.message_system.message_log[:-len(input_lines)] if input_lines else self.game.message_system.message_log
-            input_lines = [Message(line, MessageChannel.SYSTEM, (0, 255, 0)) for line in wrapped_lines]  # Change color to green
-            self.game.message_system.message_log.extend(input_lines)
-
-            # Ensure we don't exceed the visible log lines
-            while len(self.game.message_system.message_log) > self.game.visible_log_lines:
-                self.game.message_system.message_log.pop(0)
-
-            self.game.render_system.render()  # Render the game state
+        editor = LineEditor(prompt, self.game.width - 2, max_input_length)
 
-            for event in tcod.event.wait():
-                if event.type == "QUIT":
-                    raise SystemExit()
-                elif event.type == "KEYDOWN":
-                    if event.sym == KeySym.RETURN and user_input:
-                        # Remove temporary input lines
-                        self.game.message_system.message_log = self.game.message_system.message_log[:-len(input_lines)]
-                        # Don't add the final input as a message here
-                        return user_input
-                    elif event.sym == KeySym.BACKSPACE:
-                        if user_input:
-                            user_input = user_input[:cursor_pos-1] + user_input[cursor_pos:]
-                            cursor_pos = max(0, cursor_pos - 1)
-                    elif event.sym == KeySym.ESCAPE:
-                        self.game.message_system.message_log = self.game.message_system.message_log[:-len(input_lines)]
-                        return None
-                elif event.type == "TEXTINPUT":
-                    if len(user_input) < max_input_length:
-                        if ignore_next_i and event.text == 'i':
-                            ignore_next_i = False  # Reset the flag
-                        else:
-                            user_input = user_input[:cursor_pos] + event.text + user_input[cursor_pos:]
-                            cursor_pos += len(event.text)
-
-            # Add cursor to the end of the last line
-            if input_lines:
-                last_line = input_lines[-1].text
-                cursor_line = last_line[:cursor_pos] + "_" + last_line[cursor_pos:]
-                self.game.message_system.message_log[-1] = Message(cursor_line, MessageChannel.SYSTEM, (0, 255, 0))  # Change color to green
+        self.game.render_system.open_line_editor(editor)
+        try:
+            while True:
+                for event in self.game.wait_for_events():
+                    if event.type == "QUIT":
+                        raise SystemExit()
+                    elif event.type == "KEYDOWN":
+                        if event.sym == KeySym.RETURN and editor.buffer:
+                            # Don't add the final input as a message here
+                            return editor.text
+                        elif event.sym == KeySym.BACKSPACE:
+                            editor.backspace()
+                        elif event.sym == KeySym.DELETE:
+                            editor.delete()
+                        elif event.sym == KeySym.LEFT:
+                            editor.move(-1)
+                        elif event.sym == KeySym.RIGHT:
+                            editor.move(1)
+                        elif event.sym == KeySym.HOME:
+                            editor.move_to(0)
+                        elif event.sym == KeySym.END:
+                            editor.move_to(len(editor.buffer))
+                        elif event.sym == KeySym.ESCAPE:
+                            return None
+                    elif event.type == "TEXTINPUT":
+                        editor.insert(event.text)
+        finally:
+            self.game.render_system.close_line_editor()
 
     def add_conversation_memory(self, actor1, actor2, summary):
         actor1.knowledge.add_conversation_memory(f"Talked with {actor2.name}: {summary}")
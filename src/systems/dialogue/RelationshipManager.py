@@ -8,7 +8,7 @@ class RelationshipManager:
     def __init__(self, game):
         self.game = game
         self.logger = logging.getLogger(__name__)
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.sentiment_analyzer = SentimentAnalyzer(game.vader)
 
     def adjust_relationship_from_summary(self, actor1, actor2, conversation_history, summary):
         # Analyze the sentiment of the summary
@@ -1,10 +1,13 @@
 import logging
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, vader=None):
         self.logger = logging.getLogger(__name__)
-        self.sentiment_analyzer = SentimentIntensityAnalyzer()
+        # Loading the VADER lexicon is slow, so callers normally pass in the runtime's shared analyzer
+        if vader is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            vader = SentimentIntensityAnalyzer()
+        self.sentiment_analyzer = vader
         self.sentiment_history = []
 
     def analyze_sentiment(self, dialogue, neutral_whitelist):
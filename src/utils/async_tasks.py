@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import queue
+import threading
+import traceback
+
+# A persistent asyncio event loop on a background thread for LLM requests. The main
+# thread keeps polling input and rendering while coroutines are in flight; completion
+# callbacks are handed back to it through poll(), so game state is only touched there.
+class AsyncTaskRunner:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.completions = queue.SimpleQueue()
+
+    @property
+    def in_flight(self):
+        return len(self.pending)
+
+    def start(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="async-tasks", daemon=True)
+                self.thread.start()
+
+    def submit(self, coroutine, on_done=None, on_error=None):
+        # Safe from any thread; callbacks run on whichever thread calls poll()
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(lambda future: self.finished(future, on_done, on_error))
+        return future
+
+    def finished(self, future, on_done, on_error):
+        with self.lock:
+            self.pending.discard(future)
+        if on_done or on_error:
+            self.completions.put((future, on_done, on_error))
+
+    def poll(self):
+        while True:
+            try:
+                future, on_done, on_error = self.completions.get_nowait()
+            except queue.Empty:
+                return
+            if future.cancelled():
+                continue
+            error = future.exception()
+            try:
+                if error is None:
+                    if on_done:
+                        on_done(future.result())
+                elif on_error:
+                    on_error(error)
+                else:
+                    self.logger.error(f"Background task failed: {str(error)}")
+            except Exception as e:
+                self.logger.error(f"Error applying background task result: {str(e)}")
+                self.logger.debug(traceback.format_exc())
+
+    def wait(self, future, pump):
+        # Keeps the caller's frame loop running until the future resolves
+        while not future.done():
+            pump()
+            try:
+                future.result(timeout=1 / 60)
+            except Exception:
+                pass
+        return future.result()
+
+    def close(self, coroutine=None):
+        if self.loop is None:
+            if coroutine is not None:
+                coroutine.close()
+            return
+        # Requests still in flight are cancelled; the loop runs once more so they unwind
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+        try:
+            asyncio.run_coroutine_threadsafe(coroutine or asyncio.sleep(0), self.loop).result(timeout=2)
+        except Exception as e:
+            self.logger.debug(f"Error during async shutdown: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        self.loop = None
@@ -0,0 +1,98 @@
+from collections import deque
+import tcod
+import tcod.event
+
+# Display and input backends. The game only calls context.present() and
+# event_source.wait(), so a headless run swaps in the null/scripted versions.
+
+def is_input(event):
+    # What interrupts a rest, a walk or idle work; releases, typed text and mouse motion don't
+    return event.type in ("KEYDOWN", "MOUSEBUTTONDOWN", "QUIT")
+
+class TcodEventSource:
+    def __init__(self):
+        self.pending = deque()  # Collected by pump() while the game was busy
+
+    def pump(self):
+        # Keeps the window responsive during long waits without losing keystrokes
+        self.pending.extend(tcod.event.get())
+
+    def has_input(self):
+        # Cheap enough to call between steps of idle work
+        self.pump()
+        return any(is_input(event) for event in self.pending)
+
+    def wait(self, timeout=None):
+        if self.pending:
+            return self.get()
+        return list(tcod.event.wait(timeout))
+
+    def get(self):
+        events = list(self.pending)
+        self.pending.clear()
+        events.extend(tcod.event.get())
+        return events
+
+class NullContext:
+    # Stands in for tcod.context.Context without opening a window or loading a tileset
+    def __init__(self):
+        self.frames_presented = 0
+
+    def present(self, console, **kwargs):
+        self.frames_presented += 1
+
+    def convert_event(self, event):
+        return event
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class ScriptedEventSource:
+    # Replays queued events one per wait(); once empty it reports a quit so blocking loops end
+    def __init__(self, events=()):
+        self.events = deque(events)
+
+    def push(self, *events):
+        self.events.extend(events)
+
+    def pump(self):
+        pass
+
+    def has_input(self):
+        return bool(self.events)
+
+    def wait(self, timeout=None):
+        if self.events:
+            return [self.events.popleft()]
+        return [tcod.event.Quit()]
+
+    def get(self):
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+def key_down(sym, mod=tcod.event.Modifier.NONE):
+    return tcod.event.KeyDown(scancode=tcod.event.Scancode.UNKNOWN, sym=sym, mod=mod)
+
+def text_input(text):
+    return tcod.event.TextInput(text=text)
+
+def load_tileset(tileset_path):
+    return tcod.tileset.load_tilesheet(tileset_path, 16, 16, tcod.tileset.CHARMAP_CP437)
+
+def create_context(width, height, title, tileset, headless=False):
+    if headless:
+        return NullContext()
+    return tcod.context.new_terminal(
+        width,
+        height,
+        title=title,
+        vsync=True,
+        tileset=tileset
+    )
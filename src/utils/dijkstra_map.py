@@ -7,7 +7,13 @@ class DijkstraMap:
         self.map = [[float('inf')] * width for _ in range(height)]
 
     def compute(self, goals, is_walkable_func):
+        for _ in self.compute_steps(goals, is_walkable_func):
+            pass
+
+    def compute_steps(self, goals, is_walkable_func, batch=512):
+        # Same search, pausing every `batch` cells so idle-time callers can stop between steps
         heap = []
+        popped = 0
         for x, y in goals:
             if 0 <= x < self.width and 0 <= y < self.height:
                 self.map[y][x] = 0
@@ -15,6 +21,9 @@ class DijkstraMap:
 
         while heap:
             dist, x, y = heapq.heappop(heap)
+            popped += 1
+            if popped % batch == 0:
+                yield
 
             for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                 nx, ny = x + dx, y + dy
@@ -25,18 +34,26 @@ class DijkstraMap:
                         self.map[ny][nx] = new_dist
                         heapq.heappush(heap, (new_dist, nx, ny))
 
-    def get_direction(self, x, y):
+    def get_direction(self, x, y, penalty_func=None):
         if not (0 <= x < self.width and 0 <= y < self.height):
             return None
 
         best_dir = None
-        best_value = self.map[y][x]
+        current_value = self.map[y][x]
+        best_value = float('inf')
 
         for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
             nx, ny = x + dx, y + dy
-            if (0 <= nx < self.width and 0 <= ny < self.height and
-                self.map[ny][nx] < best_value):
+            if not (0 <= nx < self.width and 0 <= ny < self.height):
+                continue
+            value = self.map[ny][nx]
+            if value >= current_value:
+                continue
+            # Penalties steer away from occupied cells without leaving the downhill set
+            if penalty_func:
+                value += penalty_func(nx, ny)
+            if value < best_value:
                 best_dir = (dx, dy)
-                best_value = self.map[ny][nx]
+                best_value = value
 
-        return best_dir
\ No newline at end of file
+        return best_dir
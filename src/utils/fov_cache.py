@@ -0,0 +1,60 @@
+import tcod
+from components.ActorComponent import ActorComponent
+
+DEFAULT_FOV_RADIUS = 10
+
+class FovCache:
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.entries = {}  # entity -> (cache key, boolean FOV array indexed [y, x])
+        self.hits = 0
+        self.misses = 0
+
+    def get_radius(self, entity):
+        actor_component = entity.get_component(ActorComponent)
+        return getattr(actor_component, 'fov_radius', DEFAULT_FOV_RADIUS) if actor_component else DEFAULT_FOV_RADIUS
+
+    def get_key(self, entity):
+        return (int(entity.x), int(entity.y), self.get_radius(entity), self.game_map.version)
+
+    def compute(self, key):
+        x, y, radius, _ = key
+        return tcod.map.compute_fov(
+            self.game_map.fov_map.transparent,
+            (y, x),
+            radius,
+            light_walls=True,
+            algorithm=tcod.libtcodpy.FOV_BASIC
+        )
+
+    def get(self, entity):
+        key = self.get_key(entity)
+        entry = self.entries.get(entity)
+        if entry and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        fov = self.compute(key)
+        self.entries[entity] = (key, fov)
+        return fov
+
+    def update(self, entities):
+        # Recompute every stale entry in one pass and forget entities that left the world
+        live = set(entities)
+        for entity in list(self.entries):
+            if entity not in live:
+                del self.entries[entity]
+        for entity in entities:
+            self.get(entity)
+
+    def discard(self, entity):
+        self.entries.pop(entity, None)
+
+    def can_see(self, viewer, x, y):
+        x, y = int(x), int(y)
+        if not (0 <= x < self.game_map.width and 0 <= y < self.game_map.height):
+            return False
+        return bool(self.get(viewer)[y, x])
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,330 @@
+import heapq
+from collections import deque
+import numpy as np
+import tcod
+from utils.mapgen import TileType
+
+CARDINAL_COST = 2
+DIAGONAL_COST = 3
+UNREACHABLE = np.iinfo(np.int32).max
+# Boundary runs at least this long get portals at both ends and the middle instead of one in the middle
+LONG_ENTRANCE = 6
+# Rooms and corridors wider or taller than this are cut into chunks along a fixed grid,
+# so a cave that floods into one region doesn't make every query a full-map search
+REGION_CHUNK = 16
+
+def octile_distance(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return DIAGONAL_COST * min(dx, dy) + CARDINAL_COST * (max(dx, dy) - min(dx, dy))
+
+class Region:
+    def __init__(self, region_id, kind):
+        self.id = region_id
+        self.kind = kind  # "room", "corridor" or "door"
+        self.cells = []
+        self.portals = set()
+        self.bounds = None
+        self.cost = None  # Unit-cost array over the bounding box, blocked outside the region
+
+    def finalize(self, width, height):
+        # Bounding box padded by one blocked cell; tcod's pathfinder misbehaves on 1-wide arrays
+        xs = [x for x, _ in self.cells]
+        ys = [y for _, y in self.cells]
+        self.bounds = (max(0, min(xs) - 1), max(0, min(ys) - 1), min(width, max(xs) + 2), min(height, max(ys) + 2))
+
+# HPA*-style pathfinding: rooms, corridor segments and single doors become regions,
+# cells on region boundaries become portals, and portal-to-portal distances inside
+# each region are precomputed. Searches run over the portal graph and are only
+# refined into cells locally. Every abstract edge is costed on the static map; other
+# entities only weigh on the refined leg, where the actor can step around them.
+class HierarchicalPathfinder:
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.width = game_map.width
+        self.height = game_map.height
+        self.hits = 0  # Queries answered from the region graph
+        self.misses = 0  # Queries the region graph could not answer
+        self.build()
+
+    def build(self):
+        self.region_map = np.full((self.height, self.width), -1, dtype=np.int32)
+        self.regions = []
+        self.edges = {}
+        self.closed_doors = set()
+        self.label_regions()
+        self.find_portals()
+        for region in self.regions:
+            if region.cells:
+                self.compute_intra_region_edges(region)
+
+    def add_region(self, kind):
+        region = Region(len(self.regions), kind)
+        self.regions.append(region)
+        return region
+
+    def label_regions(self):
+        tiles = self.game_map.tiles
+        for room in self.game_map.rooms:
+            region = self.add_region("room")
+            for y in range(room.y, room.y + room.height):
+                for x in range(room.x, room.x + room.width):
+                    if tiles[y][x].tile_type == TileType.FLOOR and self.region_map[y, x] == -1:
+                        self.region_map[y, x] = region.id
+                        region.cells.append((x, y))
+
+        for y in range(self.height):
+            for x in range(self.width):
+                tile = tiles[y][x]
+                if self.region_map[y, x] != -1:
+                    continue
+                if tile.tile_type == TileType.DOOR:
+                    region = self.add_region("door")
+                    self.region_map[y, x] = region.id
+                    region.cells.append((x, y))
+                    if not tile.is_open:
+                        self.closed_doors.add((x, y))
+                elif tile.tile_type == TileType.FLOOR:
+                    self.flood_corridor(x, y)
+
+        for region in list(self.regions):
+            if region.cells and region.kind != "door":
+                xs = [x for x, _ in region.cells]
+                ys = [y for _, y in region.cells]
+                if max(xs) - min(xs) >= REGION_CHUNK or max(ys) - min(ys) >= REGION_CHUNK:
+                    self.split_region(region)
+
+        # Rooms can end up without floor cells; they keep their id but never match a cell
+        for region in self.regions:
+            if region.cells:
+                region.finalize(self.width, self.height)
+
+    def split_region(self, region):
+        # Each connected piece of the region within one chunk becomes a region of the same kind;
+        # the first piece keeps the original id
+        cells = set(region.cells)
+        region.cells = []
+        target = region
+        while cells:
+            start = min(cells)
+            cells.discard(start)
+            chunk = (start[0] // REGION_CHUNK, start[1] // REGION_CHUNK)
+            queue = deque([start])
+            while queue:
+                x, y = queue.popleft()
+                self.region_map[y, x] = target.id
+                target.cells.append((x, y))
+                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                    neighbor = (x + dx, y + dy)
+                    if neighbor in cells and (neighbor[0] // REGION_CHUNK, neighbor[1] // REGION_CHUNK) == chunk:
+                        cells.discard(neighbor)
+                        queue.append(neighbor)
+            if cells:
+                target = self.add_region(region.kind)
+
+    def flood_corridor(self, start_x, start_y):
+        tiles = self.game_map.tiles
+        region = self.add_region("corridor")
+        self.region_map[start_y, start_x] = region.id
+        queue = deque([(start_x, start_y)])
+        while queue:
+            x, y = queue.popleft()
+            region.cells.append((x, y))
+            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                nx, ny = x + dx, y + dy
+                if (0 <= nx < self.width and 0 <= ny < self.height and
+                    self.region_map[ny, nx] == -1 and tiles[ny][nx].tile_type == TileType.FLOOR):
+                    self.region_map[ny, nx] = region.id
+                    queue.append((nx, ny))
+
+    def find_portals(self):
+        # Group boundary crossings by region pair, then keep one crossing per contiguous run
+        crossings = {}
+        for y in range(self.height):
+            for x in range(self.width):
+                region_a = self.region_map[y, x]
+                if region_a == -1:
+                    continue
+                # Diagonal crossings matter too, since local searches move diagonally
+                for dx, dy in [(1, 0), (0, 1), (1, 1), (-1, 1)]:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < self.width and ny < self.height):
+                        continue
+                    region_b = self.region_map[ny, nx]
+                    if region_b == -1 or region_b == region_a:
+                        continue
+                    step_cost = CARDINAL_COST if dx == 0 or dy == 0 else DIAGONAL_COST
+                    crossings.setdefault((region_a, region_b), []).append(((x, y), (nx, ny), step_cost))
+
+        for (region_a, region_b), pairs in crossings.items():
+            for run in self.split_runs(pairs):
+                if len(run) >= LONG_ENTRANCE:
+                    entrances = [run[0], run[len(run) // 2], run[-1]]
+                else:
+                    entrances = [run[len(run) // 2]]
+                for a, b, step_cost in entrances:
+                    self.add_edge(a, b, step_cost)
+                    self.regions[region_a].portals.add(a)
+                    self.regions[region_b].portals.add(b)
+
+    @staticmethod
+    def split_runs(pairs):
+        runs = []
+        for pair in sorted(pairs, key=lambda p: (p[0][1], p[0][0], p[2])):
+            if runs:
+                last = runs[-1][-1][0]
+                if max(abs(pair[0][0] - last[0]), abs(pair[0][1] - last[1])) <= 1:
+                    runs[-1].append(pair)
+                    continue
+            runs.append([pair])
+        return runs
+
+    def add_edge(self, a, b, cost):
+        self.edges.setdefault(a, {})[b] = cost
+        self.edges.setdefault(b, {})[a] = cost
+
+    def region_cost(self, region):
+        # A copy of the region's cost array, built on first use. Region shapes never change;
+        # closed doors are handled by is_passable on the portal graph instead.
+        if region.cost is None:
+            x0, y0, x1, y1 = region.bounds
+            region.cost = (self.region_map[y0:y1, x0:x1] == region.id).astype(np.int32)
+        return region.cost.copy()
+
+    def region_distances(self, region, origin):
+        x0, y0, _, _ = region.bounds
+        local = self.region_cost(region)
+        distance = np.full(local.shape, UNREACHABLE, dtype=np.int32)
+        distance[origin[1] - y0, origin[0] - x0] = 0
+        local[origin[1] - y0, origin[0] - x0] = max(1, local[origin[1] - y0, origin[0] - x0])
+        tcod.path.dijkstra2d(distance, local, CARDINAL_COST, DIAGONAL_COST, out=distance)
+        return distance
+
+    def compute_intra_region_edges(self, region):
+        portals = sorted(region.portals)
+        x0, y0, _, _ = region.bounds
+        for i, portal in enumerate(portals[:-1]):
+            distance = self.region_distances(region, portal)
+            for other in portals[i + 1:]:
+                dist = int(distance[other[1] - y0, other[0] - x0])
+                if dist != UNREACHABLE:
+                    self.add_edge(portal, other, dist)
+
+    def on_door_toggled(self, x, y):
+        tile = self.game_map.tiles[y][x]
+        if tile.tile_type != TileType.DOOR:
+            return
+        if tile.is_open:
+            self.closed_doors.discard((x, y))
+        else:
+            self.closed_doors.add((x, y))
+
+    def region_at(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            region_id = self.region_map[y, x]
+            if region_id != -1:
+                return self.regions[region_id]
+        return None
+
+    def is_passable(self, cell):
+        return cell not in self.closed_doors
+
+    def find_abstract_path(self, start, goal):
+        start_region = self.region_at(*start)
+        goal_region = self.region_at(*goal)
+        if not start_region or not goal_region:
+            return None
+
+        # Temporary edges from the start and into the goal through their regions' portals,
+        # costed like the precomputed ones
+        start_edges = self.endpoint_edges(start_region, start)
+        goal_edges = self.endpoint_edges(goal_region, goal)
+        if start_region is goal_region:
+            x0, y0, _, _ = start_region.bounds
+            distance = self.region_distances(start_region, start)
+            direct = int(distance[goal[1] - y0, goal[0] - x0])
+            if direct != UNREACHABLE:
+                start_edges[goal] = direct
+
+        frontier = [(octile_distance(start, goal), 0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        while frontier:
+            _, current_cost, current = heapq.heappop(frontier)
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = came_from[current]
+                return path[::-1]
+            if current_cost > cost_so_far[current]:
+                continue
+
+            neighbors = start_edges if current == start else dict(self.edges.get(current, {}))
+            if current in goal_edges:
+                neighbors[goal] = goal_edges[current]
+            for neighbor, edge_cost in neighbors.items():
+                if neighbor != goal and not self.is_passable(neighbor):
+                    continue
+                new_cost = current_cost + edge_cost
+                if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    heapq.heappush(frontier, (new_cost + octile_distance(neighbor, goal), new_cost, neighbor))
+        return None
+
+    def endpoint_edges(self, region, cell):
+        if cell in region.portals:
+            return dict(self.edges.get(cell, {}))
+        x0, y0, _, _ = region.bounds
+        distance = self.region_distances(region, cell)
+        edges = {}
+        for portal in region.portals:
+            dist = int(distance[portal[1] - y0, portal[0] - x0])
+            if dist != UNREACHABLE:
+                edges[portal] = dist
+        return edges
+
+    def refine_leg(self, a, b, occupancy=None, penalty=None, ignore=()):
+        # Other entities are mixed into the leg's own window of the map, not the whole map
+        region_a = self.region_at(*a)
+        if region_a is not self.region_at(*b):
+            return [a, b]
+        x0, y0, _, _ = region_a.bounds
+        local = self.region_cost(region_a)
+        if occupancy is not None:
+            local = occupancy.apply_to_cost(local, penalty, ignore, origin=(x0, y0))
+        local[a[1] - y0, a[0] - x0] = max(1, local[a[1] - y0, a[0] - x0])
+        local[b[1] - y0, b[0] - x0] = max(1, local[b[1] - y0, b[0] - x0])
+        graph = tcod.path.SimpleGraph(cost=local, cardinal=CARDINAL_COST, diagonal=DIAGONAL_COST)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((a[1] - y0, a[0] - x0))
+        path = pathfinder.path_to((b[1] - y0, b[0] - x0)).tolist()
+        return [(x + x0, y + y0) for y, x in path]
+
+    def find_path(self, start, goal, occupancy=None, penalty=None, ignore=()):
+        start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+        abstract_path = self.find_abstract_path(start, goal)
+        if not abstract_path:
+            return None
+        path = [start]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            leg = self.refine_leg(a, b, occupancy, penalty, ignore)
+            if len(leg) < 2:
+                return None
+            path.extend(leg[1:])
+        return path
+
+    def get_next_step(self, start, goal, occupancy=None, penalty=None, ignore=()):
+        # Only the first abstract leg is refined; the rest of the route is never expanded
+        start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+        abstract_path = self.find_abstract_path(start, goal)
+        if not abstract_path or len(abstract_path) < 2:
+            self.misses += 1
+            return None
+        leg = self.refine_leg(abstract_path[0], abstract_path[1], occupancy, penalty, ignore)
+        if len(leg) < 2:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return leg[1]
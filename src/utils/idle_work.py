@@ -0,0 +1,76 @@
+import logging
+import time
+import traceback
+import types
+from utils.job_queue import JobQueue
+
+# Idle job priorities; lower runs first
+IDLE_PRIORITY_PATH = 0
+IDLE_PRIORITY_SUMMARY = 1
+IDLE_PRIORITY_COMPACT = 2
+
+# Low-priority work for the gaps while the game waits for a keypress. A job is a
+# callable; if it returns a generator, the generator is stepped one yield at a time
+# and the worker checks for input after every step. Input cancels the running job
+# outright (its generator is closed) so the keypress is handled at once; whoever
+# wanted the job queues it again the next time the game goes idle.
+class IdleWorker:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.jobs = JobQueue()
+        self.current = None  # Generator of the job in progress
+        self.current_key = None
+        self.completed = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return len(self.jobs) + (self.current is not None)
+
+    def add(self, job, priority=IDLE_PRIORITY_SUMMARY, key=None):
+        if key is not None and key == self.current_key:
+            return False
+        return self.jobs.add(job, priority, key)
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+            self.current_key = None
+            self.cancelled += 1
+
+    def clear(self):
+        self.cancel()
+        self.jobs.clear()
+
+    def finish_current(self):
+        self.current = None
+        self.current_key = None
+        self.completed += 1
+
+    def step(self):
+        # Runs one job or one step of the job in progress
+        try:
+            if self.current is None:
+                key, job = self.jobs.pop()
+                result = job()
+                if not isinstance(result, types.GeneratorType):
+                    self.completed += 1
+                    return
+                self.current, self.current_key = result, key
+            next(self.current)
+        except StopIteration:
+            self.finish_current()
+        except Exception as e:
+            self.logger.error(f"Idle job failed: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+            self.current = None
+            self.current_key = None
+
+    def run(self, deadline, input_pending=lambda: False):
+        # Returns True if input cut the work short
+        while len(self) and time.perf_counter() < deadline:
+            self.step()
+            if input_pending():
+                self.cancel()
+                return True
+        return False
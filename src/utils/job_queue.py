@@ -0,0 +1,62 @@
+import heapq
+import logging
+import time
+import traceback
+
+# Lower runs first
+PRIORITY_PATH = 0
+PRIORITY_KNOWLEDGE = 1
+PRIORITY_SUMMARY = 2
+
+# Deferrable per-turn work. Jobs are plain callables ordered by priority, then by
+# age; a key coalesces repeated requests for the same job until it has run. run()
+# drains the queue until a deadline and leaves the rest for later.
+class JobQueue:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.heap = []  # (priority, sequence, key, job)
+        self.keys = set()
+        self.sequence = 0
+        self.completed = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def add(self, job, priority=PRIORITY_KNOWLEDGE, key=None):
+        if key is not None:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+        self.sequence += 1
+        heapq.heappush(self.heap, (priority, self.sequence, key, job))
+        return True
+
+    def pop(self):
+        # Returns (key, job) without running it
+        _, _, key, job = heapq.heappop(self.heap)
+        self.keys.discard(key)
+        return key, job
+
+    def run_next(self):
+        _, job = self.pop()
+        try:
+            job()
+        except Exception as e:
+            self.logger.error(f"Deferred job failed: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+        self.completed += 1
+
+    def run(self, deadline, min_jobs=0):
+        # min_jobs guarantees progress on turns that are already over budget; no deadline runs everything
+        ran = 0
+        while self.heap and (ran < min_jobs or deadline is None or time.perf_counter() < deadline):
+            self.run_next()
+            ran += 1
+        return ran
+
+    def clear(self):
+        self.heap.clear()
+        self.keys.clear()
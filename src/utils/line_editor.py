@@ -0,0 +1,70 @@
+# Single-line text input hard-wrapped to a fixed width. Edits only mark the rows
+# they touch, so the renderer redraws a couple of rows per keystroke at most.
+class LineEditor:
+    def __init__(self, prompt, width, max_length, color=(0, 255, 0)):
+        self.prompt = prompt
+        self.width = width
+        self.max_length = max_length
+        self.color = color
+        self.buffer = []
+        self.cursor = 0
+        self.max_lines = (len(prompt) + max_length) // width + 1  # Room for the cursor past the last character
+        self.dirty_lines = set(range(self.max_lines))
+
+    @property
+    def text(self):
+        return "".join(self.buffer)
+
+    def line_of(self, index):
+        return min((len(self.prompt) + index) // self.width, self.max_lines - 1)
+
+    def mark_from(self, index):
+        # Everything after an insertion or deletion shifts, up to the old or new end of the text
+        end = max(len(self.buffer), self.cursor) + 1
+        self.dirty_lines.update(range(self.line_of(index), self.line_of(end) + 1))
+
+    def insert(self, text):
+        text = text[:self.max_length - len(self.buffer)]
+        if not text:
+            return
+        self.buffer[self.cursor:self.cursor] = text
+        self.mark_from(self.cursor)
+        self.cursor += len(text)
+
+    def backspace(self):
+        if self.cursor > 0:
+            self.mark_from(self.cursor - 1)
+            self.cursor -= 1
+            del self.buffer[self.cursor]
+
+    def delete(self):
+        if self.cursor < len(self.buffer):
+            self.mark_from(self.cursor)
+            del self.buffer[self.cursor]
+
+    def move_to(self, index):
+        index = max(0, min(index, len(self.buffer)))
+        self.dirty_lines.add(self.line_of(self.cursor))
+        self.dirty_lines.add(self.line_of(index))
+        self.cursor = index
+
+    def move(self, delta):
+        self.move_to(self.cursor + delta)
+
+    def line_text(self, line):
+        start = line * self.width - len(self.prompt)
+        prompt_part = self.prompt[line * self.width:(line + 1) * self.width]
+        buffer_part = "".join(self.buffer[max(0, start):max(0, start + self.width)])
+        return prompt_part + buffer_part
+
+    def cursor_cell(self):
+        position = len(self.prompt) + self.cursor
+        return position % self.width, position // self.width
+
+    def cursor_char(self):
+        return self.buffer[self.cursor] if self.cursor < len(self.buffer) else " "
+
+    def take_dirty_lines(self):
+        lines = sorted(self.dirty_lines)
+        self.dirty_lines.clear()
+        return lines
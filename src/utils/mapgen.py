@@ -3,6 +3,7 @@ from enum import Enum
 import tcod
 from tcod import libtcodpy
 import heapq
+import numpy as np
 
 class MapType(Enum):
     DUNGEON = 0
@@ -13,12 +14,17 @@ class TileType(Enum):
     WALL = '#'
     DOOR = '+'
 
+# Indices into the renderer's glyph and color lookup tables
+TILE_INDEX_WALL = 0
+TILE_INDEX_FLOOR = 1
+TILE_INDEX_DOOR_CLOSED = 2
+TILE_INDEX_DOOR_OPEN = 3
+
 class Tile:
     def __init__(self, tile_type):
         self.tile_type = tile_type
         self.blocked = tile_type in (TileType.WALL, TileType.DOOR)
         self.block_sight = tile_type in (TileType.WALL, TileType.DOOR)
-        self.explored = False
         self.walkable = tile_type == TileType.FLOOR
         self.is_open = False
 
@@ -29,6 +35,11 @@ class Tile:
             self.block_sight = not self.is_open
             self.walkable = self.is_open
 
+    def get_index(self):
+        if self.tile_type == TileType.DOOR:
+            return TILE_INDEX_DOOR_OPEN if self.is_open else TILE_INDEX_DOOR_CLOSED
+        return TILE_INDEX_FLOOR if self.tile_type == TileType.FLOOR else TILE_INDEX_WALL
+
 class Room:
     def __init__(self, x, y, width, height):
         self.x = x
@@ -58,10 +69,33 @@ class Map:
         self.map_type = map_type
         self.initialize_map()
         self.fov_map = None
+        self.version = 0
+        self.cost_array = None
+        self.cost_array_version = None  # Map version cost_array was built for
+        self.cost_cache_hits = 0
+        self.cost_cache_misses = 0
+
+    @classmethod
+    def from_tile_index(cls, tile_index, explored, rooms=(), map_type=MapType.DUNGEON):
+        # Rebuilds a saved map from its renderer tile indices without running the generator
+        height, width = tile_index.shape
+        game_map = cls(width, height, map_type)
+        shared = {TILE_INDEX_WALL: Tile(TileType.WALL), TILE_INDEX_FLOOR: Tile(TileType.FLOOR)}
+        game_map.tiles = [[shared.get(index) or Tile(TileType.DOOR) for index in row] for row in tile_index.tolist()]
+        for y, x in np.argwhere(tile_index == TILE_INDEX_DOOR_OPEN):
+            game_map.tiles[y][x].toggle_door()
+        game_map.explored = np.array(explored, dtype=bool)
+        game_map.rooms = [Room(*room) for room in rooms]
+        game_map.initialize_fov()
+        return game_map
 
     def initialize_map(self):
         self.rooms = []
-        self.tiles = [[Tile(TileType.WALL) for _ in range(self.width)] for _ in range(self.height)]
+        # Only doors change after generation, so every wall can share one tile
+        wall = Tile(TileType.WALL)
+        self.tiles = [[wall] * self.width for _ in range(self.height)]
+        self.explored = np.zeros((self.height, self.width), dtype=bool)
+        self.tile_index = np.full((self.height, self.width), TILE_INDEX_WALL, dtype=np.uint8)
 
     def split_node(self, node, min_size, remaining_rooms):
         if remaining_rooms <= 0 or node.width <= min_size * 2 or node.height <= min_size * 2:
@@ -213,13 +247,24 @@ class Map:
 
     def initialize_fov(self):
         self.fov_map = tcod.map.Map(self.width, self.height)
-        for y in range(self.height):
-            for x in range(self.width):
-                tile = self.tiles[y][x]
-                self.fov_map.transparent[y, x] = not tile.block_sight
-                self.fov_map.walkable[y, x] = tile.walkable
-                if tile.tile_type == TileType.DOOR and not tile.is_open:
-                    self.fov_map.transparent[y, x] = False
+        self.tile_index = np.array([[tile.get_index() for tile in row] for row in self.tiles], dtype=np.uint8)
+        # Floors and open doors are the only cells that can be seen through or walked on
+        open_cells = (self.tile_index == TILE_INDEX_FLOOR) | (self.tile_index == TILE_INDEX_DOOR_OPEN)
+        self.fov_map.transparent[:] = open_cells
+        self.fov_map.walkable[:] = open_cells
+        self.version += 1
+
+    def toggle_door(self, x, y):
+        tile = self.tiles[y][x]
+        if tile.tile_type != TileType.DOOR:
+            return False
+        tile.toggle_door()
+        self.tile_index[y, x] = tile.get_index()
+        if self.fov_map is not None:
+            self.fov_map.transparent[y, x] = not tile.block_sight
+            self.fov_map.walkable[y, x] = tile.walkable
+        self.version += 1
+        return True
 
     def compute_fov(self, x, y, radius, light_walls=True, algorithm=0):
         self.fov_map.compute_fov(x, y, radius, light_walls, algorithm)
@@ -234,6 +279,17 @@ class Map:
             return self.tiles[y][x].walkable
         return False
 
+    def get_cost_array(self):
+        # tcod-style movement costs: 1 for walkable cells, 0 for blocked ones.
+        # Cached per map version, so callers must copy before modifying it.
+        if self.cost_array_version != self.version:
+            self.cost_array = np.array([[tile.walkable for tile in row] for row in self.tiles], dtype=np.int8)
+            self.cost_array_version = self.version
+            self.cost_cache_misses += 1
+        else:
+            self.cost_cache_hits += 1
+        return self.cost_array
+
     def get_random_walkable_position(self):
         attempts = 0
         max_attempts = 1000
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Extra movement cost added to a cell for each entity standing on it
+DEFAULT_OCCUPIED_PENALTY = 10
+
+class OccupancyGrid:
+    def __init__(self, width, height, occupied_penalty=DEFAULT_OCCUPIED_PENALTY):
+        self.width = width
+        self.height = height
+        self.occupied_penalty = occupied_penalty
+        self.counts = np.zeros((height, width), dtype=np.int16)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def add(self, x, y):
+        x, y = int(x), int(y)
+        if self.in_bounds(x, y):
+            self.counts[y, x] += 1
+
+    def remove(self, x, y):
+        x, y = int(x), int(y)
+        if self.in_bounds(x, y) and self.counts[y, x] > 0:
+            self.counts[y, x] -= 1
+
+    def move(self, old_x, old_y, new_x, new_y):
+        self.remove(old_x, old_y)
+        self.add(new_x, new_y)
+
+    def rebuild(self, entities):
+        self.counts[:] = 0
+        for entity in entities:
+            self.add(entity.x, entity.y)
+
+    def is_occupied(self, x, y):
+        x, y = int(x), int(y)
+        return self.in_bounds(x, y) and self.counts[y, x] > 0
+
+    def apply_to_cost(self, cost, penalty=None, ignore=(), block=False, origin=(0, 0)):
+        # Mix occupancy into a tcod-style cost array (0 = blocked, >0 = cost to enter).
+        # Occupied cells either get a per-entity penalty or are blocked outright.
+        # The array may be a window of the map whose top-left cell is origin.
+        if penalty is None:
+            penalty = self.occupied_penalty
+        x0, y0 = origin
+        height, width = cost.shape
+        counts = self.counts[y0:y0 + height, x0:x0 + width]
+        occupied = counts > 0
+        for x, y in ignore:
+            x, y = int(x) - x0, int(y) - y0
+            if 0 <= x < width and 0 <= y < height:
+                occupied[y, x] = False
+        result = cost.astype(np.int32, copy=True)
+        if block:
+            result[occupied] = 0
+        else:
+            occupied &= result > 0
+            result[occupied] += penalty * counts[occupied]
+        return result
+
+    def penalty_at(self, x, y, penalty=None):
+        if penalty is None:
+            penalty = self.occupied_penalty
+        x, y = int(x), int(y)
+        if not self.in_bounds(x, y):
+            return 0
+        return penalty * int(self.counts[y, x])
@@ -0,0 +1,99 @@
+import inspect
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_WINDOW = 120
+
+class RollingStats:
+    def __init__(self, size=DEFAULT_WINDOW):
+        self.samples = deque(maxlen=size)
+        self.total = 0.0  # Over every sample, not just the window
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.total += value
+        self.count += 1
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def __len__(self):
+        return len(self.samples)
+
+class PerfMonitor:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.timings = {}  # name -> RollingStats of durations in seconds
+        self.llm_latency = RollingStats(window)
+        self.llm_in_flight = 0
+        self.llm_calls = 0
+        self.llm_errors = 0
+
+    def record(self, name, seconds):
+        stats = self.timings.get(name)
+        if stats is None:
+            stats = self.timings[name] = RollingStats(self.window)
+        stats.add(seconds)
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def get(self, name):
+        return self.timings.get(name)
+
+    def llm_started(self):
+        self.llm_in_flight += 1
+        self.llm_calls += 1
+        return time.perf_counter()
+
+    def llm_finished(self, start, failed=False):
+        self.llm_in_flight -= 1
+        self.llm_latency.add(time.perf_counter() - start)
+        if failed:
+            self.llm_errors += 1
+
+class InstrumentedMessages:
+    def __init__(self, messages, monitor):
+        self.messages = messages
+        self.monitor = monitor
+
+    def create(self, **kwargs):
+        start = self.monitor.llm_started()
+        try:
+            result = self.messages.create(**kwargs)
+        except Exception:
+            self.monitor.llm_finished(start, failed=True)
+            raise
+        if inspect.isawaitable(result):
+            return self.finish_async(result, start)
+        self.monitor.llm_finished(start)
+        return result
+
+    async def finish_async(self, awaitable, start):
+        # Async clients return a coroutine; the call stays in flight until it is awaited
+        try:
+            result = await awaitable
+        except BaseException:  # Includes cancellation at shutdown
+            self.monitor.llm_finished(start, failed=True)
+            raise
+        self.monitor.llm_finished(start)
+        return result
+
+class InstrumentedClient:
+    # Wraps an Anthropic client (sync or async) so every messages.create call is timed
+    def __init__(self, client, monitor):
+        self.client = client
+        self.messages = InstrumentedMessages(client.messages, monitor)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL = 1 / 60  # Longest wait for a completion before on_wait runs again
+
+class Stage:
+    def __init__(self, name, label, func, after=(), critical=True, apply=None):
+        self.name = name
+        self.label = label  # Shown on the loading screen
+        self.func = func
+        self.after = tuple(after)
+        self.critical = critical  # The game cannot start until critical stages finish
+        self.apply = apply  # Optional main-thread callback receiving the stage's result
+
+# Runs setup stages on a thread pool as soon as their dependencies finish.
+# wait_for_critical() holds the caller until the critical stages are done, calling
+# on_wait between polls; the rest keep running, and their results are applied on the
+# main thread by poll().
+class Pipeline:
+    def __init__(self, max_workers=4):
+        self.logger = logging.getLogger(__name__)
+        self.stages = {}
+        self.pending = {}
+        self.done = {}  # name -> exception or None
+        self.results = {}
+        self.lock = threading.RLock()
+        self.completions = queue.SimpleQueue()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+
+    def add(self, name, label, func, after=(), critical=True, apply=None):
+        stage = Stage(name, label, func, after, critical, apply)
+        self.stages[name] = stage
+        self.pending[name] = stage
+        return stage
+
+    def start(self):
+        with self.lock:
+            self.submit_ready()
+
+    def submit_ready(self):
+        for name, stage in list(self.pending.items()):
+            if not all(dependency in self.done for dependency in stage.after):
+                continue
+            del self.pending[name]
+            failed = [dependency for dependency in stage.after if self.done[dependency] is not None]
+            if failed:
+                self.finish(name, None, RuntimeError(f"Skipped because {', '.join(failed)} failed"))
+            else:
+                self.executor.submit(self.run_stage, stage)
+
+    def run_stage(self, stage):
+        try:
+            result = stage.func()
+        except Exception as e:
+            self.logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+            self.finish(stage.name, None, e)
+            return
+        self.finish(stage.name, result, None)
+
+    def finish(self, name, result, error):
+        with self.lock:
+            self.done[name] = error
+            self.results[name] = result
+            self.completions.put(name)
+            self.submit_ready()
+            if not self.pending and len(self.done) == len(self.stages):
+                self.executor.shutdown(wait=False)
+
+    def critical_done(self):
+        return all(name in self.done for name, stage in self.stages.items() if stage.critical)
+
+    def is_done(self, name):
+        return name in self.done
+
+    def wait_for_critical(self, on_progress=None, on_wait=None):
+        # Applies completions on the calling thread and reports each one until the critical stages are done
+        while not self.critical_done():
+            if on_wait:
+                on_wait()
+            try:
+                name = self.completions.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            self.complete(name, on_progress)
+        for name, stage in self.stages.items():
+            if stage.critical and self.done[name] is not None:
+                raise self.done[name]
+        self.poll(on_progress)
+
+    def poll(self, on_progress=None):
+        while True:
+            try:
+                name = self.completions.get_nowait()
+            except queue.Empty:
+                return
+            self.complete(name, on_progress)
+
+    def complete(self, name, on_progress=None):
+        stage = self.stages[name]
+        if stage.apply and self.done[name] is None:
+            stage.apply(self.results[name])
+        if on_progress:
+            on_progress(stage, len(self.done), len(self.stages))
@@ -0,0 +1,277 @@
+import json
+import math
+import os
+import numpy as np
+from components.ActorComponent import ActorComponent, ActorState, EmotionalState
+from components.FighterComponent import FighterComponent
+from entities.Actor import Actor
+from entities.Player import Player
+from utils.mapgen import Map, MapType
+from world import World
+
+# Saved games: one compressed .npz archive of plain arrays, loaded without pickle.
+#   header      JSON: format name, version, map size and type, game time, player index
+#   strings     JSON list every text column indexes into (-1 is None)
+#   tiles       renderer tile indices (uint8, height x width); explored (bool); rooms (n x 4)
+#   entities    one flat record per entity, in world order
+#   relations   hostile_towards / aggressive_targets as (owner, other, kind) rows
+#   known_actors, relationships, relationship_history, memories, defeated
+#               knowledge tables, one row per entry, keyed by owning entity index
+# Conversations and path maps in flight are not saved; actors pick them up again. References
+# to actors that have died and left the world are dropped (known_actors keeps the entry).
+
+SAVE_FORMAT = "sanguine-host-save"
+SAVE_VERSION = 1
+
+ENTITY_PLAYER = 0
+ENTITY_ACTOR = 1
+
+RELATION_HOSTILE = 0
+RELATION_AGGRESSIVE = 1
+
+MEMORY_CONVERSATION = 0
+MEMORY_COMBAT = 1
+MEMORY_LOCATION = 2
+
+NO_TICK = -1  # Actors off the scheduler (frozen by the simulation LOD)
+
+ENTITY_DTYPE = np.dtype([
+    ("kind", "u1"), ("card", "i4"), ("name", "i4"),
+    ("x", "i4"), ("y", "i4"), ("color", "u1", 3),
+    ("hp", "i4"), ("max_hp", "i4"), ("defense", "i4"), ("power", "i4"),
+    ("state", "u1"), ("aggression", "i4"), ("component_aggression", "i4"),
+    ("target", "i4"), ("target_x", "i4"), ("target_y", "i4"),
+    ("emotion", "u1"), ("emotion_intensity", "f8"),
+    ("last_conversation", "i8"), ("speed", "i4"), ("fov_radius", "i4"),
+    ("next_tick", "i8"),
+])
+RELATION_DTYPE = np.dtype([("owner", "i4"), ("other", "i4"), ("kind", "u1")])
+
+# known_actors entries are built up piecemeal, so each row records which keys it has
+KNOWN_ACTOR_KEYS = ["entity", "relationship", "story", "is_aggressive", "is_targeting", "last_seen_position", "proximity", "direction", "is_dead", "alive"]
+KNOWN_ACTOR_DTYPE = np.dtype([
+    ("owner", "i4"), ("name", "i4"), ("keys", "u2"),
+    ("relationship", "i4"), ("story", "i4"), ("direction", "i4"),
+    ("is_aggressive", "i1"), ("is_targeting", "i1"), ("is_dead", "i1"), ("alive", "i1"),
+    ("last_seen_x", "f8"), ("last_seen_y", "f8"), ("proximity", "f8"),
+])
+RELATIONSHIP_DTYPE = np.dtype([("owner", "i4"), ("name", "i4"), ("type", "i4"), ("value", "f8")])
+HISTORY_DTYPE = np.dtype([("owner", "i4"), ("name", "i4"), ("type", "i4"), ("value", "f8"), ("timestamp", "f8")])
+MEMORY_DTYPE = np.dtype([("owner", "i4"), ("kind", "u1"), ("text", "i4")])
+DEFEATED_DTYPE = np.dtype([("name", "i4"), ("x", "f8"), ("y", "f8")])
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, text):
+        if text is None:
+            return -1
+        text = str(text)
+        if text not in self.index:
+            self.index[text] = len(self.strings)
+            self.strings.append(text)
+        return self.index[text]
+
+def encode_json(data):
+    return np.frombuffer(json.dumps(data).encode("utf-8"), dtype=np.uint8)
+
+def decode_json(array):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+def encode_flag(value):
+    return -1 if value is None else int(bool(value))
+
+def decode_flag(value):
+    return None if value < 0 else bool(value)
+
+def encode_number(value):
+    return math.nan if value is None else value
+
+def decode_number(value):
+    if math.isnan(value):
+        return None
+    # Relationship values start out as ints; keep them that way so messages read the same
+    return int(value) if float(value).is_integer() else float(value)
+
+def save_world(world, path):
+    strings = StringTable()
+    entities = world.entities
+    index_of = {entity: i for i, entity in enumerate(entities)}
+    scheduler = world.scheduler
+
+    records = np.zeros(len(entities), dtype=ENTITY_DTYPE)
+    relations = []
+    known_actors = []
+    relationships = []
+    history = []
+    memories = []
+    for i, entity in enumerate(entities):
+        record = records[i]
+        actor_component = entity.get_component(ActorComponent)
+        fighter = entity.get_component(FighterComponent)
+        is_actor = isinstance(entity, Actor)
+        record["kind"] = ENTITY_ACTOR if is_actor else ENTITY_PLAYER
+        record["card"] = strings.add(entity.character_card_key if is_actor else None)
+        record["name"] = strings.add(entity.name)
+        record["x"], record["y"] = int(entity.x), int(entity.y)
+        record["color"] = getattr(entity, "color", (255, 255, 255))
+        record["hp"], record["max_hp"] = fighter.hp, fighter.max_hp
+        record["defense"], record["power"] = fighter.defense, fighter.power
+        record["state"] = actor_component.state.value
+        record["aggression"] = strings.add(entity.aggression_type)
+        record["component_aggression"] = strings.add(actor_component.aggression_type)
+        target = actor_component.target
+        record["target"] = index_of.get(target, -1) if not isinstance(target, tuple) else -1
+        record["target_x"], record["target_y"] = target if isinstance(target, tuple) else (-1, -1)
+        record["emotion"] = actor_component.emotional_state.value
+        record["emotion_intensity"] = actor_component.emotional_intensity
+        record["last_conversation"] = actor_component.last_conversation_time
+        record["speed"] = actor_component.speed
+        record["fov_radius"] = actor_component.fov_radius
+        record["next_tick"] = scheduler.entries.get(entity, NO_TICK)
+
+        for kind, others in ((RELATION_HOSTILE, actor_component.hostile_towards), (RELATION_AGGRESSIVE, actor_component.aggressive_targets)):
+            relations.extend((i, index_of[other], kind) for other in others if other in index_of)
+
+        knowledge = entity.knowledge
+        for name, info in knowledge.known_actors.items():
+            keys = sum(1 << bit for bit, key in enumerate(KNOWN_ACTOR_KEYS) if key in info)
+            last_seen = info.get("last_seen_position") or (math.nan, math.nan)
+            known_actors.append((
+                i, strings.add(name), keys,
+                strings.add(info.get("relationship")), strings.add(info.get("story")), strings.add(info.get("direction")),
+                encode_flag(info.get("is_aggressive")), encode_flag(info.get("is_targeting")),
+                encode_flag(info.get("is_dead")), encode_flag(info.get("alive")),
+                last_seen[0], last_seen[1], encode_number(info.get("proximity")),
+            ))
+        for name, relationship in knowledge.relationships.items():
+            relationships.append((i, strings.add(name), strings.add(relationship["type"]), relationship["value"]))
+        for name, entries in knowledge.long_term_relationship_memory.items():
+            history.extend((i, strings.add(name), strings.add(entry["type"]), entry["value"], entry["timestamp"]) for entry in entries)
+        memories.extend((i, MEMORY_CONVERSATION, strings.add(text)) for text in knowledge.conversation_memories)
+        memories.extend((i, MEMORY_COMBAT, strings.add(text)) for text in knowledge.combat_memories)
+        memories.extend((i, MEMORY_LOCATION, strings.add(text)) for text in knowledge.known_locations)
+
+    defeated = [(strings.add(name), x, y) for name, (x, y) in world.actor_knowledge_system.defeated_entity_positions.items()]
+    game_map = world.game_map
+    header = {
+        "format": SAVE_FORMAT,
+        "version": SAVE_VERSION,
+        "width": world.width,
+        "height": world.height,
+        "map_type": world.map_type.name,
+        "time": scheduler.time,
+        "player": index_of.get(world.player, -1),
+    }
+    # Written beside the old save and swapped in, so a failed save never loses the last one
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        np.savez_compressed(
+            file,
+            header=encode_json(header),
+            strings=encode_json(strings.strings),
+            tiles=game_map.tile_index,
+            explored=game_map.explored,
+            rooms=np.array([(room.x, room.y, room.width, room.height) for room in game_map.rooms], dtype=np.int32).reshape(-1, 4),
+            entities=records,
+            relations=np.array(relations, dtype=RELATION_DTYPE),
+            known_actors=np.array(known_actors, dtype=KNOWN_ACTOR_DTYPE),
+            relationships=np.array(relationships, dtype=RELATIONSHIP_DTYPE),
+            relationship_history=np.array(history, dtype=HISTORY_DTYPE),
+            memories=np.array(memories, dtype=MEMORY_DTYPE),
+            defeated=np.array(defeated, dtype=DEFEATED_DTYPE),
+        )
+    os.replace(temp_path, path)
+
+def read_header(archive):
+    header = decode_json(archive["header"])
+    if header.get("format") != SAVE_FORMAT:
+        raise ValueError("Not a saved game")
+    if header.get("version") != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version: {header.get('version')}")
+    return header
+
+def load_world(path, game):
+    with np.load(path, allow_pickle=False) as archive:
+        header = read_header(archive)
+        strings = decode_json(archive["strings"])
+        text = lambda index: None if index < 0 else strings[index]
+        map_type = MapType[header["map_type"]]
+        game_map = Map.from_tile_index(archive["tiles"], archive["explored"], archive["rooms"].tolist(), map_type)
+        world = World(header["width"], header["height"], game, map_type, game_map=game_map)
+
+        records = archive["entities"]
+        entities = []
+        for record in records:
+            x, y = int(record["x"]), int(record["y"])
+            if record["kind"] == ENTITY_ACTOR:
+                entity = Actor(x, y, text(record["name"]), text(record["card"]))
+                entity.color = tuple(int(channel) for channel in record["color"])
+            else:
+                entity = Player(x, y)
+            entity.aggression_type = text(record["aggression"])
+            fighter = entity.get_component(FighterComponent)
+            fighter.hp, fighter.max_hp = int(record["hp"]), int(record["max_hp"])
+            fighter.defense, fighter.power = int(record["defense"]), int(record["power"])
+            actor_component = entity.get_component(ActorComponent)
+            actor_component.state = ActorState(int(record["state"]))
+            actor_component.aggression_type = text(record["component_aggression"])
+            actor_component.emotional_state = EmotionalState(int(record["emotion"]))
+            actor_component.emotional_intensity = float(record["emotion_intensity"])
+            actor_component.last_conversation_time = int(record["last_conversation"])
+            actor_component.speed = int(record["speed"])
+            actor_component.fov_radius = int(record["fov_radius"])
+            entities.append(entity)
+
+        # References between entities are resolved once they all exist
+        for entity, record in zip(entities, records):
+            actor_component = entity.get_component(ActorComponent)
+            if record["target"] >= 0:
+                actor_component.target = entities[record["target"]]
+            elif record["target_x"] >= 0:
+                actor_component.target = (int(record["target_x"]), int(record["target_y"]))
+        for owner, other, kind in archive["relations"].tolist():
+            actor_component = entities[owner].get_component(ActorComponent)
+            (actor_component.hostile_towards if kind == RELATION_HOSTILE else actor_component.aggressive_targets).add(entities[other])
+
+        by_name = {entity.name: entity for entity in entities}
+        for row in archive["known_actors"].tolist():
+            owner, name, keys, relationship, story, direction, is_aggressive, is_targeting, is_dead, alive, last_seen_x, last_seen_y, proximity = row
+            values = {
+                "entity": by_name.get(text(name)),
+                "relationship": text(relationship),
+                "story": text(story),
+                "is_aggressive": decode_flag(is_aggressive),
+                "is_targeting": decode_flag(is_targeting),
+                "last_seen_position": None if math.isnan(last_seen_x) else (decode_number(last_seen_x), decode_number(last_seen_y)),
+                "proximity": None if math.isnan(proximity) else proximity,
+                "direction": text(direction),
+                "is_dead": decode_flag(is_dead),
+                "alive": decode_flag(alive),
+            }
+            entities[owner].knowledge.known_actors[text(name)] = {key: values[key] for bit, key in enumerate(KNOWN_ACTOR_KEYS) if keys & (1 << bit)}
+        for owner, name, relationship_type, value in archive["relationships"].tolist():
+            entities[owner].knowledge.relationships[text(name)] = {"type": text(relationship_type), "value": decode_number(value)}
+        for owner, name, relationship_type, value, timestamp in archive["relationship_history"].tolist():
+            entities[owner].knowledge.long_term_relationship_memory.setdefault(text(name), []).append({"type": text(relationship_type), "value": decode_number(value), "timestamp": timestamp})
+        for owner, kind, memory in archive["memories"].tolist():
+            knowledge = entities[owner].knowledge
+            if kind == MEMORY_LOCATION:
+                knowledge.known_locations.add(text(memory))
+            else:
+                (knowledge.conversation_memories if kind == MEMORY_CONVERSATION else knowledge.combat_memories).append(text(memory))
+        world.actor_knowledge_system.defeated_entity_positions = {
+            text(name): (decode_number(x), decode_number(y)) for name, x, y in archive["defeated"].tolist()
+        }
+
+        for entity in entities:
+            world.add_entity(entity)
+        if header["player"] >= 0:
+            world.player = entities[header["player"]]
+        # Actors resume in the order they were queued; frozen ones settle into their tier on their first turn
+        ticks = [(entity, int(record["next_tick"])) for entity, record in zip(entities, records) if isinstance(entity, Actor)]
+        ticks.sort(key=lambda item: (item[1] == NO_TICK, item[1]))
+        world.restore_schedule(header["time"], [(actor, None if tick == NO_TICK else tick) for actor, tick in ticks])
+    return world
@@ -0,0 +1,54 @@
+import heapq
+from bisect import bisect_right
+import json
+import tempfile
+from array import array
+from itertools import islice
+
+# Unbounded message history kept in a temporary file. Only byte offsets and
+# per-channel record numbers stay in memory; records are read back on demand.
+class Scrollback:
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.offsets = array('q')
+        self.channel_records = {}  # channel name -> array of record numbers, ascending
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, text, channel_name, color):
+        record = len(self.offsets)
+        self.file.seek(0, 2)
+        self.offsets.append(self.file.tell())
+        self.file.write(json.dumps([text, channel_name, list(color)]).encode('utf-8') + b'\n')
+        self.channel_records.setdefault(channel_name, array('q')).append(record)
+        return record
+
+    def read(self, record):
+        self.file.seek(self.offsets[record])
+        text, channel_name, color = json.loads(self.file.readline())
+        return text, channel_name, tuple(color)
+
+    def newest_records(self, channel_names, limit, at_or_before=None):
+        # Tail of each channel up to the anchor, merged newest first; cost depends on limit, not history size
+        tails = []
+        for name in channel_names:
+            records = self.channel_records.get(name)
+            if not records:
+                continue
+            end = len(records) if at_or_before is None else bisect_right(records, at_or_before)
+            tails.append(reversed(records[max(0, end - limit):end]))
+        return list(islice(heapq.merge(*tails, reverse=True), limit))
+
+    def records_after(self, channel_names, limit, after):
+        heads = []
+        for name in channel_names:
+            records = self.channel_records.get(name)
+            if not records:
+                continue
+            start = bisect_right(records, after)
+            heads.append(records[start:start + limit])
+        return list(islice(heapq.merge(*heads), limit))
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,402 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+import tcod.event
+from components.ActorComponent import ActorComponent
+from components.FighterComponent import FighterComponent
+from utils.async_tasks import AsyncTaskRunner
+from utils.stub_llm import StubBlock, StubResponse
+
+# Deterministic record/replay of whole sessions. A recording holds the RNG seed, every
+# input batch the game consumed, the result of every "is a key waiting?" check, every
+# LLM request with its response, and the logical position at which each background
+# LLM reply was applied. Positions are counted in input batches, turns and modal
+# waits, so a replay applies each reply at the same point in the game regardless of
+# how fast the model (or the machine) is. Periodic world digests detect divergence.
+#
+# Sessions run in deterministic mode: wall-clock turn budgets and idle-time work are
+# off, and replies are applied only while waiting for input or at the start of a turn.
+
+SESSION_VERSION = 1
+CHECKPOINT_INTERVAL = 50  # Turns between world digests
+
+EVENT_TYPES = {"KEYDOWN", "KEYUP", "TEXTINPUT", "MOUSEBUTTONDOWN", "QUIT"}
+
+def serialize_event(event, context):
+    if event.type in ("KEYDOWN", "KEYUP"):
+        return {"type": event.type, "sym": int(event.sym), "mod": int(event.mod), "repeat": bool(getattr(event, "repeat", False))}
+    if event.type == "TEXTINPUT":
+        return {"type": event.type, "text": event.text}
+    if event.type == "MOUSEBUTTONDOWN":
+        # Stored in tile coordinates, which is what the game reads after convert_event()
+        x, y = context.convert_event(event).position
+        return {"type": event.type, "position": [x, y], "button": int(event.button)}
+    return {"type": event.type}
+
+def deserialize_event(data):
+    event_type = data["type"]
+    if event_type in ("KEYDOWN", "KEYUP"):
+        event_class = tcod.event.KeyDown if event_type == "KEYDOWN" else tcod.event.KeyUp
+        event = event_class(scancode=tcod.event.Scancode.UNKNOWN, sym=tcod.event.KeySym(data["sym"]), mod=tcod.event.Modifier(data["mod"]))
+        event.repeat = data["repeat"]
+        return event
+    if event_type == "TEXTINPUT":
+        return tcod.event.TextInput(data["text"])
+    if event_type == "MOUSEBUTTONDOWN":
+        x, y = data["position"]
+        return tcod.event.MouseButtonDown(position=(x, y), tile=(int(x), int(y)), button=tcod.event.MouseButton(data["button"]))
+    return tcod.event.Quit()
+
+def world_digest(world):
+    # Everything a divergence would show up in: positions, health, game time, the RNG, and
+    # what LLM replies change (conversations, memories, relationships and the message log)
+    state = [world.scheduler.time, repr(random.getstate())]
+    for entity in world.entities:
+        fighter = entity.get_component(FighterComponent)
+        actor_component = entity.get_component(ActorComponent)
+        knowledge = getattr(entity, "knowledge", None)
+        state.append([
+            getattr(entity, "name", ""), entity.x, entity.y, fighter.hp if fighter else None,
+            [actor_component.current_conversation, actor_component.conversation_turns, actor_component.awaiting_reply, actor_component.last_conversation_time] if actor_component else None,
+            [knowledge.conversation_memories, knowledge.combat_memories, knowledge.relationships] if knowledge else None,
+        ])
+    message_system = world.game.message_system if world.game else None
+    if message_system:
+        state.append([message.text for message in message_system.message_log])
+    return hashlib.sha1(json.dumps(state, default=str).encode()).hexdigest()
+
+def request_key(request):
+    return json.dumps(request, sort_keys=True, default=str)
+
+def response_from_dump(data):
+    response = StubResponse("", data.get("model"))
+    response.content = [StubBlock(block.get("text", "")) for block in data.get("content", []) if block.get("type") == "text"]
+    return response
+
+class SessionRecorder:
+    offline = False
+
+    def __init__(self, path, seed=None):
+        self.logger = logging.getLogger(__name__)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.file = open(path, "w")
+        self.lock = threading.Lock()  # LLM responses are written from the task loop's thread
+        self.batches = 0
+        self.turns = 0
+        self.awaits = 0
+        self.checks = 0
+        self.world = None  # Last world to take a turn, digested once more on close
+        self.write({"session": SESSION_VERSION, "seed": self.seed})
+
+    def write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, default=str) + "\n")
+
+    def position(self):
+        return [self.batches, self.turns, self.awaits]
+
+    def seed_random(self):
+        random.seed(self.seed)
+
+    def record_events(self, events, context):
+        # Batches of nothing but mouse motion and window events don't affect the game
+        events = [serialize_event(event, context) for event in events if event.type in EVENT_TYPES]
+        if events:
+            self.batches += 1
+            self.write({"events": events, "at": self.position()})
+
+    def record_check(self, result):
+        self.checks += 1
+        if result:
+            self.write({"check": self.checks})
+
+    def record_llm(self, request, response=None, error=None):
+        record = {"request": request}
+        if error is not None:
+            record["error"] = str(error)
+        else:
+            record["response"] = response.model_dump()
+        self.write(record)
+
+    def record_delivery(self, task_id):
+        self.write({"done": task_id, "at": self.position()})
+
+    def next_turn(self, world):
+        self.turns += 1
+        self.world = world
+        if self.turns % CHECKPOINT_INTERVAL == 0:
+            self.write({"checkpoint": self.turns, "digest": world_digest(world)})
+
+    def wrap_event_source(self, source, context):
+        return RecordingEventSource(source, self, context)
+
+    def create_task_runner(self):
+        return RecordingTaskRunner(self)
+
+    def wrap_client(self, client):
+        return RecordingClient(client, self)
+
+    def close(self):
+        # A final digest, so sessions shorter than a checkpoint interval are checked too
+        if self.world is not None and not self.file.closed:
+            self.write({"final": self.turns, "digest": world_digest(self.world)})
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+class SessionReplayer:
+    offline = True  # Responses come from the recording; no API key needed
+
+    def __init__(self, path):
+        self.logger = logging.getLogger(__name__)
+        self.batches_recorded = []
+        self.checks_recorded = set()
+        self.responses = {}  # request key -> recorded results, in order
+        self.results = []  # Every recorded result, for requests whose text differs on replay
+        self.deliveries = []  # (task id, position)
+        self.checkpoints = {}
+        self.final = None  # Digest of the last world when recording stopped
+        with open(path) as file:
+            header = json.loads(file.readline())
+            if header.get("session") != SESSION_VERSION:
+                raise ValueError(f"Unsupported session version: {header.get('session')}")
+            self.seed = header["seed"]
+            for line in file:
+                record = json.loads(line)
+                if "events" in record:
+                    self.batches_recorded.append(record["events"])
+                elif "check" in record:
+                    self.checks_recorded.add(record["check"])
+                elif "request" in record:
+                    self.responses.setdefault(request_key(record["request"]), []).append(record)
+                    self.results.append(record)
+                elif "done" in record:
+                    self.deliveries.append((record["done"], record["at"]))
+                elif "checkpoint" in record:
+                    self.checkpoints[record["checkpoint"]] = record["digest"]
+                elif "final" in record:
+                    self.final = record["digest"]
+        self.batches = 0
+        self.turns = 0
+        self.awaits = 0
+        self.checks = 0
+        self.checkpoints_matched = 0
+        self.final_matched = None
+        self.divergence = None  # First turn whose digest differs from the recording
+        self.world = None
+
+    def position(self):
+        return [self.batches, self.turns, self.awaits]
+
+    def seed_random(self):
+        random.seed(self.seed)
+
+    @property
+    def finished(self):
+        return self.batches >= len(self.batches_recorded)
+
+    def next_batch(self):
+        if self.finished:
+            return [tcod.event.Quit()]  # Ends the session like closing the window did
+        events = [deserialize_event(data) for data in self.batches_recorded[self.batches]]
+        self.batches += 1
+        return events
+
+    def next_check(self):
+        self.checks += 1
+        return self.checks in self.checks_recorded
+
+    def take_result(self, request):
+        # Same request text first; otherwise the oldest result not yet used
+        queue = self.responses.get(request_key(request), [])
+        while queue and queue[0].get("used"):
+            queue.pop(0)
+        record = queue.pop(0) if queue else next((record for record in self.results if not record.get("used")), None)
+        if record is None:
+            raise RuntimeError("Replay has no recorded response left for this request")
+        record["used"] = True
+        if "error" in record:
+            raise RuntimeError(record["error"])
+        return response_from_dump(record["response"])
+
+    def next_turn(self, world):
+        self.turns += 1
+        self.world = world
+        expected = self.checkpoints.get(self.turns)
+        if expected is None:
+            return
+        if world_digest(world) == expected:
+            self.checkpoints_matched += 1
+        else:
+            self.diverged()
+
+    def diverged(self):
+        if self.divergence is None:
+            self.divergence = self.turns
+            self.logger.error(f"Replay diverged from the recording by turn {self.turns}")
+
+    def wrap_event_source(self, source, context):
+        return ReplayEventSource(self)
+
+    def create_task_runner(self):
+        return ReplayTaskRunner(self)
+
+    def wrap_client(self, client):
+        return ReplayClient(self)
+
+    def close(self):
+        # Mirrors the recorder's final digest
+        if self.final is None or self.world is None or self.final_matched is not None:
+            return
+        self.final_matched = world_digest(self.world) == self.final
+        if not self.final_matched:
+            self.diverged()
+
+class RecordingEventSource:
+    def __init__(self, source, recorder, context):
+        self.source = source
+        self.recorder = recorder
+        self.context = context
+
+    def pump(self):
+        self.source.pump()
+
+    def has_input(self):
+        result = self.source.has_input()
+        self.recorder.record_check(result)
+        return result
+
+    def wait(self, timeout=None):
+        events = self.source.wait(timeout)
+        if events:
+            self.recorder.record_events(events, self.context)
+        return events
+
+class ReplayEventSource:
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    def pump(self):
+        pass
+
+    def has_input(self):
+        return self.replayer.next_check()
+
+    def wait(self, timeout=None):
+        return self.replayer.next_batch()
+
+class RecordingTaskRunner(AsyncTaskRunner):
+    # Numbers the tasks whose callbacks the game waits for and logs where each was applied
+    def __init__(self, recorder):
+        super().__init__()
+        self.recorder = recorder
+        self.submitted = 0
+
+    def submit(self, coroutine, on_done=None, on_error=None):
+        if not (on_done or on_error):
+            return super().submit(coroutine)
+        self.submitted += 1
+        task_id = self.submitted
+
+        def deliver(callback):
+            if callback is None:
+                return None
+            def run(value):
+                self.recorder.record_delivery(task_id)
+                callback(value)
+            return run
+        return super().submit(coroutine, deliver(on_done), deliver(on_error))
+
+    def wait(self, future, pump):
+        try:
+            return super().wait(future, pump)
+        finally:
+            self.recorder.awaits += 1
+
+class ReplayTaskRunner(AsyncTaskRunner):
+    # Coroutines still run (against the replay client), but their callbacks are held
+    # back until the replay reaches the position where the recording applied them
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+        self.submitted = 0
+        self.tasks = {}  # task id -> (future, on_done, on_error)
+        self.delivered = 0  # Recorded deliveries consumed, in order
+        self.applied = 0  # Of those, replies whose callback actually ran
+
+    def submit(self, coroutine, on_done=None, on_error=None):
+        if not (on_done or on_error):
+            return super().submit(coroutine)
+        self.submitted += 1
+        future = super().submit(coroutine)
+        self.tasks[self.submitted] = (future, on_done, on_error)
+        return future
+
+    def poll(self):
+        replayer = self.replayer
+        position = replayer.position()
+        while self.delivered < len(replayer.deliveries):
+            task_id, at = replayer.deliveries[self.delivered]
+            if at > position:
+                return
+            if task_id > self.submitted:
+                # Requested later in the same turn it was applied; wait for the submit
+                return
+            self.delivered += 1
+            if task_id not in self.tasks:
+                self.logger.error(f"Replay diverged: reply {task_id} was already applied")
+                continue
+            future, on_done, on_error = self.tasks.pop(task_id)
+            self.applied += 1
+            try:
+                result = future.result()
+            except Exception as error:
+                if on_error:
+                    on_error(error)
+                continue
+            if on_done:
+                on_done(result)
+
+    def wait(self, future, pump):
+        try:
+            return super().wait(future, pump)
+        finally:
+            self.replayer.awaits += 1
+
+class RecordingMessages:
+    def __init__(self, messages, recorder):
+        self.messages = messages
+        self.recorder = recorder
+
+    async def create(self, **kwargs):
+        try:
+            response = await self.messages.create(**kwargs)
+        except Exception as e:
+            self.recorder.record_llm(kwargs, error=e)
+            raise
+        self.recorder.record_llm(kwargs, response=response)
+        return response
+
+class RecordingClient:
+    def __init__(self, client, recorder):
+        self.client = client
+        self.messages = RecordingMessages(client.messages, recorder)
+
+    async def close(self):
+        await self.client.close()
+
+class ReplayMessages:
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    async def create(self, **kwargs):
+        return self.replayer.take_result(kwargs)
+
+class ReplayClient:
+    def __init__(self, replayer):
+        self.messages = ReplayMessages(replayer)
+
+    async def close(self):
+        pass
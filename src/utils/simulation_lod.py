@@ -0,0 +1,148 @@
+import random
+from enum import Enum, auto
+from components.ActorComponent import ActorComponent, ActorState
+from utils.hierarchical_pathfinder import octile_distance, CARDINAL_COST
+from utils.turn_scheduler import ACTION_COST
+
+class LodTier(Enum):
+    FULL = auto()  # Regular AI every action
+    ABSTRACT = auto()  # Region-to-region moves on the pathfinder's room graph, at reduced frequency
+    FROZEN = auto()  # Parked off the scheduler until the player comes close
+
+FULL_RADIUS = 20
+ABSTRACT_RADIUS = 48
+HYSTERESIS = 4  # Extra distance before demoting, so actors on a boundary don't flip every turn
+CHUNK_SIZE = 16
+ABSTRACT_MIN_ACTIONS = 3  # Abstract actors act at most once every this many normal actions
+
+# Simulation level of detail by distance from the player. Actors are bucketed in
+# chunks so each turn only the chunks around the player are examined: frozen actors
+# there are woken and abstract ones promoted. Demotion is applied lazily when an
+# actor's turn comes up, so per-turn cost follows the player's neighbourhood rather
+# than the world population.
+class SimulationLod:
+    def __init__(self, world, full_radius=FULL_RADIUS, abstract_radius=ABSTRACT_RADIUS):
+        self.world = world
+        self.full_radius = full_radius
+        self.abstract_radius = abstract_radius
+        self.tiers = {}  # actor -> LodTier
+        self.chunks = {}  # (chunk x, chunk y) -> actors, as an insertion-ordered dict so replays iterate alike
+        self.chunk_of = {}  # actor -> chunk key
+
+    def chunk_key(self, x, y):
+        return int(x) // CHUNK_SIZE, int(y) // CHUNK_SIZE
+
+    def add(self, actor):
+        self.tiers[actor] = LodTier.FULL
+        key = self.chunk_key(actor.x, actor.y)
+        self.chunks.setdefault(key, {})[actor] = None
+        self.chunk_of[actor] = key
+
+    def remove(self, actor):
+        self.tiers.pop(actor, None)
+        key = self.chunk_of.pop(actor, None)
+        if key is not None:
+            self.chunks[key].pop(actor, None)
+
+    def moved(self, actor):
+        key = self.chunk_key(actor.x, actor.y)
+        old_key = self.chunk_of.get(actor)
+        if old_key is None or old_key == key:
+            return
+        self.chunks[old_key].pop(actor, None)
+        self.chunks.setdefault(key, {})[actor] = None
+        self.chunk_of[actor] = key
+
+    def rebuild(self, actors):
+        self.tiers.clear()
+        self.chunks.clear()
+        self.chunk_of.clear()
+        for actor in actors:
+            self.add(actor)
+
+    def tier_of(self, actor):
+        return self.tiers.get(actor, LodTier.FULL)
+
+    def is_active(self, entity):
+        # Entities that are not tracked (the player) are always active
+        return self.tiers.get(entity, LodTier.FULL) == LodTier.FULL
+
+    def classify(self, actor):
+        player = self.world.player
+        if player is None:
+            return LodTier.FULL
+        current = self.tier_of(actor)
+        distance = max(abs(actor.x - player.x), abs(actor.y - player.y))
+        if distance <= self.full_radius + (HYSTERESIS if current == LodTier.FULL else 0):
+            return LodTier.FULL
+        if distance <= self.abstract_radius + (HYSTERESIS if current != LodTier.FROZEN else 0):
+            return LodTier.ABSTRACT
+        return LodTier.FROZEN
+
+    def set_tier(self, actor, tier):
+        previous = self.tier_of(actor)
+        self.tiers[actor] = tier
+        if tier == previous:
+            return
+        scheduler = self.world.scheduler
+        if tier == LodTier.FROZEN:
+            scheduler.remove(actor)
+        elif previous != LodTier.FULL:
+            # Woken or promoted actors act on their regular cadence from now on
+            scheduler.schedule(actor)
+
+    def refresh(self):
+        # Wake and promote everything in the chunks around the player
+        player = self.world.player
+        if player is None:
+            return
+        reach = self.abstract_radius
+        min_x, min_y = self.chunk_key(max(0, player.x - reach), max(0, player.y - reach))
+        max_x, max_y = self.chunk_key(player.x + reach, player.y + reach)
+        for chunk_y in range(min_y, max_y + 1):
+            for chunk_x in range(min_x, max_x + 1):
+                for actor in list(self.chunks.get((chunk_x, chunk_y), ())):
+                    tier = self.classify(actor)
+                    if tier != LodTier.FROZEN and tier.value < self.tier_of(actor).value:
+                        self.set_tier(actor, tier)
+
+    def abstract_goal(self, actor):
+        actor_component = actor.get_component(ActorComponent)
+        target = actor_component.target
+        if actor_component.state == ActorState.PATROL and isinstance(target, tuple):
+            return target
+        if target is not None and not isinstance(target, tuple) and actor.is_valid_target(target):
+            return int(target.x), int(target.y)
+        # Nothing this far away perceives the player, so untargeted actors just wander
+        if actor_component.state == ActorState.IDLE and random.random() < 0.1:
+            actor_component.state = ActorState.PATROL
+            actor_component.target = self.world.game_map.get_random_walkable_position()
+            actor_component.dijkstra_map = None  # Queued by the full AI if the actor is promoted mid-patrol
+            return actor_component.target
+        return None
+
+    def abstract_step(self, actor):
+        # Crosses into the next region on the way to the actor's goal in a single move;
+        # returns the ticks until its next action, proportional to the distance covered
+        delay = ACTION_COST * ABSTRACT_MIN_ACTIONS
+        goal = self.abstract_goal(actor)
+        if goal is None:
+            return delay
+        world = self.world
+        pathfinder = world.pathfinder
+        start = (int(actor.x), int(actor.y))
+        path = pathfinder.find_abstract_path(start, goal)
+        if not path or len(path) < 2:
+            return delay
+        start_region = pathfinder.region_at(*start)
+        destination = next((cell for cell in path[1:] if pathfinder.region_at(*cell) is not start_region), path[-1])
+        if destination != start and not world.is_occupied(*destination):
+            world.move_entity(actor, *destination)
+            delay = max(delay, ACTION_COST * octile_distance(start, destination) // CARDINAL_COST)
+
+        actor_component = actor.get_component(ActorComponent)
+        if actor_component.state == ActorState.PATROL and destination == goal:
+            actor_component.state = ActorState.IDLE
+            actor_component.target = None
+            actor_component.dijkstra_map = None
+        return delay
@@ -0,0 +1,103 @@
+import importlib.abc
+import logging
+import sys
+import threading
+import time
+
+# Process-wide startup timings: module imports, runtime and system construction,
+# and milestones measured from process start (first frame, time to interactive).
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = {}  # module -> seconds, including nested imports
+        self.timings = {}  # label -> seconds
+        self.milestones = {}  # label -> seconds since start
+        self.reported = False
+        self.lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self.lock:
+            self.timings[label] = self.timings.get(label, 0.0) + seconds
+
+    def measure(self, label):
+        return TimedBlock(self, label)
+
+    def mark(self, milestone):
+        # Only the first occurrence counts
+        with self.lock:
+            self.milestones.setdefault(milestone, time.perf_counter() - self.start)
+
+    def report(self, top=15):
+        if self.reported:
+            return
+        self.reported = True
+        logger = logging.getLogger(__name__)
+        logger.info("Startup profile:")
+        for milestone, seconds in sorted(self.milestones.items(), key=lambda item: item[1]):
+            logger.info(f"  {milestone:<40}{seconds * 1000:9.1f}ms since start")
+        for label, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            logger.info(f"  {label:<40}{seconds * 1000:9.1f}ms")
+        for module, seconds in sorted(self.imports.items(), key=lambda item: -item[1])[:top]:
+            logger.info(f"  import {module:<33}{seconds * 1000:9.1f}ms")
+
+class TimedBlock:
+    def __init__(self, profile, label):
+        self.profile = profile
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profile.record(self.label, time.perf_counter() - self.started)
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    # Wraps each loader found by the other finders so module execution time is recorded
+    def __init__(self, profile):
+        self.profile = profile
+        self.finding = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self.finding, 'active', False):
+            return None
+        self.finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.finding.active = False
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = TimedLoader(spec.loader, self.profile)
+        return spec
+
+class TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, profile):
+        self.loader = loader
+        self.profile = profile
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profile.imports[module.__name__] = time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+startup_profile = StartupProfile()
+
+def install_import_timer():
+    if not any(isinstance(finder, ImportTimer) for finder in sys.meta_path):
+        sys.meta_path.insert(0, ImportTimer(startup_profile))
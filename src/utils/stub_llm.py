@@ -0,0 +1,46 @@
+import asyncio
+import random
+
+# Offline stand-in for the Anthropic client, used by the simulation runner so the
+# dialogue systems run their full code paths without network calls or API costs.
+
+STUB_REPLIES = [
+    "They traded rumours about the lower halls.",
+    "Well met, traveller. The torches burn low tonight.",
+    "They argued over who should keep watch.",
+    "Keep your voice down; something stirs below.",
+    "They agreed to share what they had found.",
+]
+
+class StubBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+class StubResponse:
+    def __init__(self, text, model):
+        self.content = [StubBlock(text)]
+        self.model = model
+
+    def model_dump(self):
+        return {"model": self.model, "content": [{"type": "text", "text": block.text} for block in self.content]}
+
+class StubMessages:
+    def __init__(self, latency=0.0, seed=None):
+        self.latency = latency  # Seconds each call pretends to take
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        return StubResponse(self.random.choice(STUB_REPLIES), kwargs.get("model", "stub"))
+
+class StubClient:
+    # Mirrors anthropic.AsyncAnthropic
+    def __init__(self, latency=0.0, seed=None):
+        self.messages = StubMessages(latency, seed)
+
+    async def close(self):
+        pass
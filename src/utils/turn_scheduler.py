@@ -0,0 +1,69 @@
+import heapq
+import time
+from components.ActorComponent import ActorComponent
+
+# Game time is measured in ticks; an action at normal speed takes ACTION_COST ticks
+ACTION_COST = 100
+NORMAL_SPEED = 100
+
+# Priority queue of actors keyed by the tick of their next action. Advancing the
+# clock only touches actors that are due, and ties resolve in scheduling order.
+class TurnScheduler:
+    def __init__(self):
+        self.time = 0
+        self.queue = []  # (tick, sequence, entity)
+        self.entries = {}  # entity -> tick of its live queue entry
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entity):
+        return entity in self.entries
+
+    def get_delay(self, entity):
+        actor_component = entity.get_component(ActorComponent)
+        speed = getattr(actor_component, 'speed', NORMAL_SPEED) if actor_component else NORMAL_SPEED
+        return max(1, ACTION_COST * NORMAL_SPEED // max(1, speed))
+
+    def schedule(self, entity, delay=None, start=None):
+        # start defaults to now; actors carried over from a turn that ran out of budget pass their own tick
+        if delay is None:
+            delay = self.get_delay(entity)
+        tick = (self.time if start is None else start) + delay
+        self.entries[entity] = tick
+        self.sequence += 1
+        heapq.heappush(self.queue, (tick, self.sequence, entity))
+
+    def remove(self, entity):
+        # The heap entry goes stale and is skipped when popped
+        self.entries.pop(entity, None)
+
+    def clear(self):
+        self.queue.clear()
+        self.entries.clear()
+
+    def next_tick(self):
+        while self.queue and self.entries.get(self.queue[0][2]) != self.queue[0][0]:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def advance(self, elapsed=ACTION_COST, deadline=None):
+        # Yields each due actor in order; after it acts it is rescheduled from the tick it acted on.
+        # Past the wall-clock deadline the remaining due actors stay queued and go first next time.
+        target = self.time + elapsed
+        ran = 0
+        while True:
+            tick = self.next_tick()
+            if tick is None or tick > target:
+                break
+            if deadline is not None and ran and time.perf_counter() > deadline:
+                break
+            ran += 1
+            _, _, entity = heapq.heappop(self.queue)
+            # Actors carried over from an earlier turn are behind the clock; it never runs backwards
+            self.time = max(self.time, tick)
+            yield entity
+            if self.entries.get(entity) == tick:
+                self.schedule(entity, start=tick)
+        self.time = max(self.time, target)
@@ -1,58 +1,166 @@
+import time
 from utils.mapgen import generate_map, MapType
 from entities.Player import Player
 from entities.Actor import Actor
 from systems.ActorKnowledgeSystem import ActorKnowledgeSystem
 from components.ActorComponent import ActorComponent
+from utils.occupancy_grid import OccupancyGrid
+from utils.hierarchical_pathfinder import HierarchicalPathfinder
+from utils.fov_cache import FovCache
+from utils.turn_scheduler import TurnScheduler, ACTION_COST
+from utils.simulation_lod import SimulationLod, LodTier
+from utils.job_queue import JobQueue
+from utils.idle_work import IdleWorker
+from utils.dijkstra_map import DijkstraMap
+from systems.VisibilitySystem import VisibilitySystem
+
+GOAL_MAP_LIMIT = 8
 
 class World:
-    def __init__(self, width, height, game, map_type=MapType.DUNGEON, single_room=False):
+    def __init__(self, width, height, game, map_type=MapType.DUNGEON, single_room=False, game_map=None):
         self.width = width
         self.height = height
-        self.game_map = generate_map(width, height, num_rooms=3, map_type=map_type, single_room=single_room)
+        # Loaded games pass their saved map in rather than generating one to throw away
+        self.game_map = game_map or generate_map(width, height, num_rooms=3, map_type=map_type, single_room=single_room)
         self.entities = []
         self.player = None
         self.game = game
         self.actor_knowledge_system = ActorKnowledgeSystem(game)
         self.map_type = map_type
+        self.occupancy = OccupancyGrid(width, height)
+        self.pathfinder = HierarchicalPathfinder(self.game_map)
+        self.fov_cache = FovCache(self.game_map)
+        self.visibility = VisibilitySystem(self)
+        self.scheduler = TurnScheduler()
+        self.lod = SimulationLod(self)
+        self.jobs = JobQueue()  # Deferred per-turn work, drained within the turn's time budget
+        self.idle = IdleWorker()  # Speculative work run while the game waits for input
+        self.goal_maps = {}  # (x, y) goal -> DijkstraMap, shared by every actor heading there
+
+    def set_game_map(self, game_map):
+        self.game_map = game_map
+        self.pathfinder = HierarchicalPathfinder(game_map)
+        self.fov_cache = FovCache(game_map)
+        self.goal_maps.clear()
+
+    def toggle_door(self, x, y):
+        if self.game_map.toggle_door(x, y):
+            self.pathfinder.on_door_toggled(x, y)
+            self.goal_maps.clear()
+            return True
+        return False
 
     def add_entity(self, entity):
         if isinstance(entity, Player):
             self.player = entity
         self.entities.append(entity)
+        self.occupancy.add(entity.x, entity.y)
+        if isinstance(entity, Actor):
+            self.scheduler.schedule(entity)
+            self.lod.add(entity)
+
+    def remove_entity(self, entity):
+        self.entities.remove(entity)
+        self.occupancy.remove(entity.x, entity.y)
+        self.fov_cache.discard(entity)
+        self.visibility.discard(entity)
+        self.scheduler.remove(entity)
+        self.lod.remove(entity)
+
+    def move_entity(self, entity, x, y):
+        self.occupancy.move(entity.x, entity.y, x, y)
+        entity.x, entity.y = x, y
+        self.lod.moved(entity)
+        self.visibility.moved(entity)
+
+    def rebuild_occupancy(self):
+        self.occupancy = OccupancyGrid(self.width, self.height)
+        self.occupancy.rebuild(self.entities)
+
+    def rebuild_schedule(self):
+        # Everyone starts at full detail and settles into their tier on their first turn
+        actors = [entity for entity in self.entities if isinstance(entity, Actor)]
+        self.scheduler.clear()
+        for actor in actors:
+            self.scheduler.schedule(actor)
+        self.lod.rebuild(actors)
+
+    def restore_schedule(self, time, next_ticks):
+        # next_ticks: (actor, tick) in queue order; a None tick (frozen actors) means a regular delay
+        self.scheduler.clear()
+        self.scheduler.time = time
+        for actor, tick in next_ticks:
+            self.scheduler.schedule(actor, None if tick is None else max(1, tick - time))
+        self.lod.rebuild([actor for actor, _ in next_ticks])
+
+    def active_entities(self):
+        # The player and actors simulated at full detail; only these perceive each other
+        return [entity for entity in self.entities if self.lod.is_active(entity)]
+
+    def store_goal_map(self, goal, dijkstra_map):
+        # Maps are read-only once computed; keep the most recent few
+        self.goal_maps.pop(goal, None)
+        self.goal_maps[goal] = dijkstra_map
+        while len(self.goal_maps) > GOAL_MAP_LIMIT:
+            del self.goal_maps[next(iter(self.goal_maps))]
+
+    def warm_goal_map(self, goal):
+        # Idle job: computes in steps so a keypress can cancel it part way
+        dijkstra_map = DijkstraMap(self.game_map.width, self.game_map.height)
+        yield from dijkstra_map.compute_steps([goal], self.game_map.is_walkable)
+        self.store_goal_map(goal, dijkstra_map)
+
+    def run_idle_work(self, deadline, input_pending=lambda: False):
+        # Deferred turn work left over from the budget goes first, then speculative jobs;
+        # returns True if input cut it short
+        while self.jobs and time.perf_counter() < deadline:
+            self.jobs.run_next()
+            if input_pending():
+                return True
+        return self.idle.run(deadline, input_pending)
 
     def get_entity_at(self, x, y):
+        if not self.occupancy.is_occupied(x, y):
+            return None
         return next((e for e in self.entities if int(e.x) == int(x) and int(e.y) == int(y)), None)
 
+    def is_occupied(self, x, y):
+        return self.occupancy.is_occupied(x, y)
+
+    def get_cost_array(self, penalty=None, ignore=(), block_occupied=False):
+        return self.occupancy.apply_to_cost(self.game_map.get_cost_array(), penalty, ignore, block_occupied)
+
     def is_walkable(self, x, y):
         return self.game_map.is_walkable(x, y)
 
-    def update_actors(self):
-        for entity in self.entities:
-            if isinstance(entity, Actor):
+    def can_see(self, viewer, target):
+        return self.visibility.can_see(viewer, target)
+
+    def update_fov(self):
+        active = self.active_entities()
+        self.fov_cache.update(active)
+        self.visibility.update(active)
+
+    def update_actors(self, elapsed=ACTION_COST, deadline=None):
+        # Advance game time by the player's action; only actors whose next action falls within it run
+        self.lod.refresh()
+        for entity in self.scheduler.advance(elapsed, deadline):
+            tier = self.lod.classify(entity)
+            self.lod.set_tier(entity, tier)
+            if tier == LodTier.FULL:
                 entity.update(self.game_map, self.player, self.game)
+            elif tier == LodTier.ABSTRACT:
+                self.scheduler.schedule(entity, self.lod.abstract_step(entity))
 
     def get_potential_actor_interactions(self):
-        actor_entities = [entity for entity in self.entities if isinstance(entity, Actor)]
-        potential_interactions = []
-        for actor1 in actor_entities:
-            for actor2 in actor_entities:
-                if actor1 != actor2 and self.game_map.is_in_fov(int(actor1.x), int(actor1.y)) and self.game_map.is_in_fov(int(actor2.x), int(actor2.y)):
-                    potential_interactions.append((actor1, actor2))
-        return potential_interactions
-
-    def to_picklable(self):
-        picklable_world = World(self.width, self.height, None, self.map_type)
-        picklable_world.game_map = self.game_map
-        picklable_world.entities = [entity for entity in self.entities if not isinstance(entity, Player)]
-        picklable_world.player = self.player
-        return picklable_world
+        return self.visibility.get_pairs(Actor)
 
     def create_actor(self, name, x, y, appearance, personality, background, knowledge, goals, speech_style, health, defense, power, aggression_type, target_preference):
         actor = Actor(name, x, y)
         actor_component = ActorComponent(name, appearance, personality, background, knowledge, goals, speech_style, health, defense, power, aggression_type, target_preference)
         actor.add_component(actor_component)
-        self.entities.append(actor)
+        self.add_entity(actor)
         return actor
 
     def initialize_systems(self):
-        self.actor_knowledge_system.initialize()
+        self.actor_knowledge_system.initialize(self.entities)